@@ -5,6 +5,9 @@ import sys
 import shutil
 import argparse
 import stat
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 from pathlib import Path
 from collections import OrderedDict
@@ -34,17 +37,24 @@ LOAD_ORDER        = LOCAL_DIR/"manifest"/"loadorders"/"loadorder.txt"
 PRESET_DIR        = LOCAL_DIR/"manifest"/"loadorders"
 INI_DIR           = LOCAL_DIR/"inis"
 SOURCE_DIR        = LOCAL_DIR/"mods"
+STORE_DIR         = LOCAL_DIR/"store"
 TARGET_DIR        = LOCAL_DIR/"target"
 COMPAT_DIR        = TARGET_DIR/"compat"
 RELOAD_ON_INSTALL = False
 UPDATE_ON_CLOSE   = True
 LINK_ON_LAUNCH    = True
+DEDUPE_ON_INSTALL = False
+CONTENT_CONFLICTS = False
 EXECUTABLES       = dict()
 INSTANCES         = dict()
 
 BACKUP_DIR        = LOCAL_DIR/"manifest"
 COPY_MANIFEST     = BACKUP_DIR/"copy_manifest.txt"
 BACKUP_MANIFEST   = BACKUP_DIR/"backup_manifest.txt"
+ARCHIVE_REGISTRY  = BACKUP_DIR/"archive_registry.yaml"
+DEPLOY_STATE      = BACKUP_DIR/"deploy_state.pkl"
+
+REGISTRY_LOCK     = threading.Lock() # parallel installs share the archive registry
 
 VERBOSITY         = False
 OPERATION_TIMEOUT = 500 # 0.5s
@@ -93,6 +103,7 @@ def create_cfg(path=None, gui=False, is_global=False, instance_path=None):
             if Path(target).parent.name in game_specific.GAME_IDS.keys(): instance_path=Path(target).parent/"bdsm_instance"
             else: instance_path=Path(target)/"bdsm_instance"
         f.write("SOURCE_DIR: "+str(instance_path/"mods")+"\n")
+        f.write("STORE_DIR: "+str(instance_path/"store")+"\n")
         f.write("TARGET_DIR: "+str(target)+"\n")
         f.write("COMPAT_DIR: "+str(compat)+"\n")
         f.write("PRESET_DIR: "+str(instance_path/"manifest"/"loadorders")+"\n")
@@ -102,6 +113,8 @@ def create_cfg(path=None, gui=False, is_global=False, instance_path=None):
         f.write("UPDATE_ON_CLOSE: true\n")
         f.write("LINK_ON_LAUNCH: true\n")
         f.write("DO_REQUESTS: true\n")
+        f.write("DEDUPE_ON_INSTALL: false\n")
+        f.write("CONTENT_CONFLICTS: false\n")
         f.write("STYLESHEET: dark_round.qss\n")
         launchers=game_specific.get_launchers(target,compat)
         f.write("EXECUTABLES:\n")
@@ -119,7 +132,7 @@ def create_cfg(path=None, gui=False, is_global=False, instance_path=None):
 def read_cfg(sync=True, gui=False, update=True):
     # if portable instance cfg will be parent and child
     global CONFIG_FILE
-    global BACKUP_DIR, COPY_MANIFEST, BACKUP_MANIFEST
+    global BACKUP_DIR, COPY_MANIFEST, BACKUP_MANIFEST, ARCHIVE_REGISTRY, DEPLOY_STATE
 
     global_cfg = read_parent_cfg(gui=gui, update=update)
     if GLOBAL_INSTANCE: 
@@ -133,6 +146,8 @@ def read_cfg(sync=True, gui=False, update=True):
         BACKUP_DIR        = child_instance/"manifest"
         COPY_MANIFEST     = BACKUP_DIR/"copy_manifest.txt"
         BACKUP_MANIFEST   = BACKUP_DIR/"backup_manifest.txt"
+        ARCHIVE_REGISTRY  = BACKUP_DIR/"archive_registry.yaml"
+        DEPLOY_STATE      = BACKUP_DIR/"deploy_state.pkl"
     
     cfg = read_child_cfg(gui=gui, update=update)
 
@@ -170,7 +185,7 @@ def read_parent_cfg(gui=False, update=True):
 def read_child_cfg(gui=False, path=None, update=True):
     global SOURCE_DIR, TARGET_DIR, COMPAT_DIR, PRESET_DIR, LOAD_ORDER
     global INI_DIR, RELOAD_ON_INSTALL, UPDATE_ON_CLOSE, LINK_ON_LAUNCH
-    global DO_REQUESTS, EXECUTABLES
+    global DO_REQUESTS, EXECUTABLES, STORE_DIR, DEDUPE_ON_INSTALL, CONTENT_CONFLICTS
 
     if not path: path=CONFIG_FILE
     # child config doesnt exist
@@ -187,8 +202,9 @@ def read_child_cfg(gui=False, path=None, update=True):
         cfg=create_cfg(path=path, gui=gui);
         with open(global_cfg_file, "r") as f: cfg = OrderedDict(yaml.safe_load(f)) 
     if update:
-        cfg=fix_cfg(cfg)
+        cfg=fix_cfg(cfg, path=path)
         SOURCE_DIR        = Path(cfg["SOURCE_DIR"])
+        STORE_DIR         = Path(cfg["STORE_DIR"])
         TARGET_DIR        = Path(cfg["TARGET_DIR"])
         COMPAT_DIR        = Path(cfg["COMPAT_DIR"])
         PRESET_DIR        = Path(cfg["PRESET_DIR"])
@@ -198,11 +214,13 @@ def read_child_cfg(gui=False, path=None, update=True):
         UPDATE_ON_CLOSE   = bool(cfg["UPDATE_ON_CLOSE"])
         LINK_ON_LAUNCH    = bool(cfg["LINK_ON_LAUNCH"])
         DO_REQUESTS       = bool(cfg["DO_REQUESTS"])
+        DEDUPE_ON_INSTALL = bool(cfg["DEDUPE_ON_INSTALL"])
+        CONTENT_CONFLICTS = bool(cfg["CONTENT_CONFLICTS"])
         EXECUTABLES       = cfg["EXECUTABLES"]
     return cfg
 
 
-def fix_cfg(cfg, is_global=False):
+def fix_cfg(cfg, is_global=False, path=None):
     added=False
     if is_global:
         if "GLOBAL_INSTANCE"   not in cfg.keys(): cfg["GLOBAL_INSTANCE"]=True;         added=True
@@ -211,6 +229,7 @@ def fix_cfg(cfg, is_global=False):
         if "SOURCE_DIR"        not in cfg.keys(): create_cfg(gui=True);                
         if "TARGET_DIR"        not in cfg.keys(): create_cfg(gui=True);                
         if "COMPAT_DIR"        not in cfg.keys(): create_cfg(gui=True);                
+        if "STORE_DIR"         not in cfg.keys(): cfg["STORE_DIR"]=str(Path(cfg["SOURCE_DIR"]).parent/"store"); added=True
         if "PRESET_DIR"        not in cfg.keys(): cfg["PRESET_DIR"]=str(PRESET_DIR);   added=True
         #if "GLOBAL_INSTANCE"   not in cfg.keys(): cfg["GLOBAL_INSTANCE"]=False;        added=True
         if "LOAD_ORDER"        not in cfg.keys(): cfg["LOAD_ORDER"]=str(LOAD_ORDER);   added=True
@@ -219,11 +238,13 @@ def fix_cfg(cfg, is_global=False):
         if "UPDATE_ON_CLOSE"   not in cfg.keys(): cfg["UPDATE_ON_CLOSE"]=True;         added=True
         if "LINK_ON_LAUNCH"    not in cfg.keys(): cfg["LINK_ON_LAUNCH"]=True;          added=True
         if "DO_REQUESTS"       not in cfg.keys(): cfg["DO_REQUESTS"]=True;             added=True
+        if "DEDUPE_ON_INSTALL" not in cfg.keys(): cfg["DEDUPE_ON_INSTALL"]=False;      added=True
+        if "CONTENT_CONFLICTS" not in cfg.keys(): cfg["CONTENT_CONFLICTS"]=False;      added=True
         if "STYLESHEET"        not in cfg.keys(): cfg["STYLESHEET"]="dark.qss";        added=True
         if "EXECUTABLES"       not in cfg.keys(): 
             cfg_dict["EXECUTABLES"]=game_specific.get_launchers(cfg["TARGET_DIR"],cfg["COMPAT_DIR"]);
             added=True
-    if added: write_cfg(cfg)
+    if added: write_cfg(cfg, path=path)
     return cfg
 
 
@@ -280,7 +301,27 @@ def copy_with_backup(src, dst, backup_dir, copied_manifest, backedup_manifest, t
     copied_manifest.append(rel_path)
 
 
-def perform_copy():
+def deployed_mods(load_order):
+    return [m for m in load_order if not m.startswith(('*', '#', '>#', 'v#', '~'))]
+
+
+def deploy_is_current():
+    # the last deploy is still on disk and nothing it linked from changed since, stats dirs only
+    read_cfg(sync=False)
+    try:
+        with open(DEPLOY_STATE, 'rb') as f: state=pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError): return False
+    try: manifest_mtime=os.stat(COPY_MANIFEST).st_mtime_ns
+    except OSError: return False
+    if state.get("source")!=str(SOURCE_DIR) or state.get("target")!=str(TARGET_DIR) \
+    or state.get("manifest")!=manifest_mtime or state.get("mods")!=deployed_mods(load_list()): 
+        return False
+    return all(dir_signature(os.path.join(SOURCE_DIR, mod), dirs)==mtime for mod,(dirs,mtime) in state["signatures"].items())
+
+
+def perform_copy(progress=None, cancel=None):
+    # progress(files done, files planned) is called per file, cancel() stops linking between files
+    # returns False when cancelled, whatever was linked so far is in the manifests and can be restored
     read_cfg(sync=False)
     ensure_dir(SOURCE_DIR)
     ensure_dir(TARGET_DIR)
@@ -307,22 +348,30 @@ def perform_copy():
     remove_symlink_rec(TARGET_DIR)
     remove_empty_dirs_rec(TARGET_DIR)
 
-    for dirname in load_order:
-        if dirname.startswith('*') \
-        or dirname.startswith('#') \
-        or dirname.startswith('>#') \
-        or dirname.startswith('v#') \
-        or dirname.startswith('~'): # skip mods
-            continue
+    # walk every mod first so progress knows the total, dir mtimes make the deploy fingerprint
+    plan = []
+    signatures = dict()
+    for dirname in deployed_mods(load_order):
         source_path = os.path.join(SOURCE_DIR, dirname)
         if not os.path.isdir(source_path):
             print("warning, source directory does not exist: "+source_path)
             continue
-
-        # copy files AND subdirectories recursively
-        for root, dirs, files in os.walk(source_path):
-            # calculate relative path within the source directory
+        walk = []
+        dirs = []
+        for root, _, files in os.walk(source_path):
             rel = os.path.relpath(root, source_path)
+            try: dirs.append((rel if rel != "." else "", os.stat(root).st_mtime_ns))
+            except OSError: pass
+            walk.append((root, rel, files))
+        plan.append((dirname, walk))
+        signatures[dirname] = (tuple(d for d,_ in dirs), max((m for _,m in dirs), default=None))
+    total = sum(len(files) for _, walk in plan for _, _, files in walk)
+
+    done = 0
+    cancelled = False
+    for dirname, walk in plan:
+        # copy files AND subdirectories recursively
+        for root, rel, files in walk:
             #if rel.startswith("Data"): rel = rel.replace("Data/","",1) # might be broken
             dest_root = os.path.join(TARGET_DIR, rel) if rel != "." else TARGET_DIR
             
@@ -341,6 +390,7 @@ def perform_copy():
 
             # copy all files
             for file in files:
+                if cancel and cancel(): cancelled = True; break
                 if VERBOSITY: print("linking: "+file) # status
                 if file.endswith('.esm') \
                 or file.endswith('.esl') \
@@ -355,6 +405,10 @@ def perform_copy():
                     )
                 except Exception as e:
                     print(f"encountered exception {str(e)} when restoring {file}")
+                done += 1
+                if progress: progress(done, total)
+            if cancelled: break
+        if cancelled: break
                 
     # only get latest copies
     copied_manifest = list(dict.fromkeys(copied_manifest))
@@ -368,11 +422,20 @@ def perform_copy():
     # write plugins
     try: game_specific.write_plugins(COMPAT_DIR, BACKUP_DIR, plugins)
     except Exception as e: print(f"warning: could not find plugins dir ({e})")
+    # fingerprint of a complete deploy, lets a launch skip relinking when nothing changed
+    if not cancelled:
+        try:
+            with open(str(DEPLOY_STATE)+".tmp", 'wb') as f:
+                pickle.dump({"source":str(SOURCE_DIR), "target":str(TARGET_DIR), "manifest":os.stat(COPY_MANIFEST).st_mtime_ns,
+                             "mods":deployed_mods(load_order), "signatures":signatures}, f)
+            os.replace(str(DEPLOY_STATE)+".tmp", DEPLOY_STATE)
+        except OSError as e: print(f"warning: could not write deploy state: {e}")
      
     print('-'*40)
-    print("load complete!")
+    print("load cancelled!" if cancelled else "load complete!")
     print("backed up files: "+str(len(backedup_manifest)))
     print("linked new files: "+str(len(copied_manifest)))
+    return not cancelled
 
 
 def restore():
@@ -410,6 +473,7 @@ def restore():
     # remove manifests
     os.unlink(COPY_MANIFEST)
     os.unlink(BACKUP_MANIFEST)
+    if os.path.exists(DEPLOY_STATE): os.unlink(DEPLOY_STATE)
     print("deleted manifests...")
     # clean all symlinks (if install broke) (maybe risky idk)
     remove_symlink_rec(TARGET_DIR)
@@ -445,22 +509,157 @@ def sync_loadorder():
     if additions!=[] or exclusions!=[]: save_to_loadorder(loadorder+additions, verbose=False)
 
 
-def install_mod(archive_path=None, temp_dir=None, gui=False, parent=None, write=True):  
-    read_cfg(sync=False)
+def read_archive_registry():
+    # archive hash -> installed mod, used to catch repeat installs before extracting
+    if not os.path.exists(ARCHIVE_REGISTRY): return dict()
+    try:
+        with open(ARCHIVE_REGISTRY, "r", encoding="utf-8") as f: return yaml.safe_load(f) or dict()
+    except Exception as e: print(f"warning: could not read archive registry ({e})"); return dict()
+
+
+def write_archive_registry(registry):
+    ensure_dir(ARCHIVE_REGISTRY.parent)
+    with open(ARCHIVE_REGISTRY, "w", encoding="utf-8") as f:
+        yaml.dump(registry, f, sort_keys=False, default_flow_style=False)
+
+
+def find_installed_archive(archive_path, digest):
+    # returns (mod, identical) for an already installed copy of this archive,
+    # matched by content first and by archive name second
+    registry = read_archive_registry()
+    entry = registry.get(digest)
+    if entry and os.path.isdir(SOURCE_DIR/entry["NAME"]): return entry["NAME"], True
+    archive_name = Path(archive_path).name if os.path.isdir(archive_path) else Path(archive_path).stem
+    for entry in registry.values():
+        if entry["ARCHIVE"]==archive_name and os.path.isdir(SOURCE_DIR/entry["NAME"]): return entry["NAME"], False
+    if os.path.isdir(SOURCE_DIR/archive_name): return archive_name, False # installed before the registry existed
+    return None, False
+
+
+def register_archive(archive_path, digest, name):
+    archive_name = Path(archive_path).name if os.path.isdir(archive_path) else Path(archive_path).stem
+    with REGISTRY_LOCK:
+        registry = read_archive_registry()
+        registry = {k:v for k,v in registry.items() if v["NAME"]!=name} # one archive per mod
+        registry[digest] = {"NAME": name, "ARCHIVE": archive_name}
+        write_archive_registry(registry)
+
+
+def prompt_duplicate_install(archive_path, name, identical):
+    if identical: prompt=f"{Path(archive_path).name} is already installed as {name}\n"
+    else: prompt=f"{Path(archive_path).name} looks like a different version of {name}\n"
+    prompt+="[s]kip, [r]eplace, [u]pdate (install over) or install as [c]opy? [S/r/u/c] "
+    choice=input(prompt).strip().lower()
+    return {"r":"replace", "u":"update", "c":"copy"}.get(choice[:1], "skip")
+
+
+def fomod_context():
+    # what FOMOD file/game dependencies are checked against: enabled mods, vanilla data, the plugins file, game exe
+    enabled = [SOURCE_DIR/m for m in load_list() if not m.startswith(('*','#','>#','v#','~'))]
+    game = game_specific.determine_game(COMPAT_DIR)
+    if not isinstance(game, str) or game not in game_specific.GAME_PLUGINS: game = "Default"
+    return DependencyContext(mod_dirs=enabled, data_dir=TARGET_DIR,
+                             default_plugins=game_specific.GAME_PLUGINS[game].split(),
+                             game_exe=game_specific.get_game_exe(COMPAT_DIR, TARGET_DIR),
+                             active_plugins=game_specific.read_plugins(COMPAT_DIR, BACKUP_DIR, game))
+
+
+def swap_mod_dir(name, mod_name, keep_choices=False):
+    # move a finished install in place of the mod it replaces and drop what only the old copy used
+    old_dir = SOURCE_DIR/f".{mod_name}.replaced"
+    if os.path.isdir(old_dir): remove_tree(old_dir) # left by an interrupted swap
+    os.rename(SOURCE_DIR/mod_name, old_dir)
+    os.rename(SOURCE_DIR/name, SOURCE_DIR/mod_name)
+    try: remove_tree(old_dir)
+    except Exception as e: print(f"warning: could not remove {old_dir} ({str(e)})")
+    if os.path.isdir(STORE_DIR): prune_store(STORE_DIR)
+    choices_dir = BACKUP_DIR/"fomod_choices"
+    if os.path.exists(choices_dir/f"{name}.yaml"): os.replace(choices_dir/f"{name}.yaml", choices_dir/f"{mod_name}.yaml")
+    elif not keep_choices and os.path.exists(choices_dir/f"{mod_name}.yaml"): os.unlink(choices_dir/f"{mod_name}.yaml")
+    return mod_name
+
+
+def install_mod(archive_path=None, temp_dir=None, gui=False, parent=None, write=True, digest=None, mod_name=None, mode=None, read=True, replay=False, context=None, choices_index=None):  
+    # mode is one of skip/replace/update/copy for archives that are already installed as mod_name,
+    # replay installs FOMODs from their saved choices and never opens a dialog,
+    # context and choices_index are the DependencyContext and saved FOMOD choices shared by a batch of installs
+    if read: read_cfg(sync=False)
     if not gui:
+        if not digest: digest = hash_archive(archive_path)
+        mod_name, identical = find_installed_archive(archive_path, digest)
+        if not mod_name: mode = None
+        elif not mode: mode = prompt_duplicate_install(archive_path, mod_name, identical)
+        if mode=="skip": print(f"skipped mod {Path(archive_path).stem}"); return None
         temp_dir = Path(tempfile.mkdtemp())
         result=extract_archive(archive_path, temp_dir)
         if not result: print(f"failed to install mod {Path(archive_path).stem}"); return None
-    name = installer_run(archive_path=archive_path, output_dir=SOURCE_DIR, temp_dir=temp_dir, gui=gui, parent=parent)
+    if mode not in ("replace", "update"): mod_name=None
+    # a replacement is installed under a new name first, the old copy goes only once it succeeded
+    replaced = mod_name if mode=="replace" and os.path.isdir(SOURCE_DIR/mod_name) else None
+    store_dir = STORE_DIR if DEDUPE_ON_INSTALL else None
+    choices_dir = BACKUP_DIR/"fomod_choices"
+    choices = find_fomod_choices(choices_dir, archive_path, mod_name, index=choices_index) if replay else None
+    if context is None: context = fomod_context()
+    name = installer_run(archive_path=archive_path, output_dir=SOURCE_DIR, temp_dir=temp_dir, gui=gui, parent=parent, store_dir=store_dir,
+                         mod_name=None if replaced else mod_name, cache_dir=BACKUP_DIR/"fomod_cache", context=context, choices_dir=choices_dir, choices=choices, headless=replay)
     if not name: print(f"failed to install mod {Path(archive_path).stem}"); return None
+    if replaced: name = swap_mod_dir(name, replaced, keep_choices=choices is not None)
+    if digest: register_archive(archive_path, digest, name)
+    if not mod_name: context.add_mod_dir(SOURCE_DIR/name)
+    if mod_name: # already in load order
+        if RELOAD_ON_INSTALL and write: perform_copy()
+        print(f"{mode}d mod: "+name)
+        return name
     if write:
         with open(LOAD_ORDER, "a", encoding="utf-8") as f:
             f.write(name+'\n')
-    if RELOAD_ON_INSTALL: perform_copy() #restore(); perform_copy()
-    print("wrote mod: "+name+" to load order!")
+        if RELOAD_ON_INSTALL: perform_copy() #restore(); perform_copy()
+        print("wrote mod: "+name+" to load order!")
     return name
 
 
+def install_mods(archives, jobs=1, replay=False, on_duplicate=None):
+    # bulk install, with jobs>1 archives are installed by a worker pool which
+    # can neither prompt nor show FOMOD dialogs, so it replays saved choices
+    read_cfg(sync=False)
+    if jobs>1:
+        replay = True
+        if not on_duplicate: on_duplicate = "skip"
+    installed = {m.lstrip('~*') for m in load_list()}
+    context = fomod_context()
+    choices_index = index_fomod_choices(BACKUP_DIR/"fomod_choices") if replay else None
+    def digest(archive_path):
+        try: return hash_archive(archive_path)
+        except Exception as e: print(f"error: encountered exception {str(e)} when reading {archive_path}"); return None
+    def install(i):
+        try: return install_mod(archives[i], write=False, mode=on_duplicate, read=False, replay=replay, digest=digests[i], context=context, choices_index=choices_index)
+        except Exception as e: print(f"error: encountered exception {str(e)} when installing {archives[i]}"); return None
+    if jobs>1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool: digests = list(pool.map(digest, archives))
+    else: digests = [digest(a) for a in archives]
+    # copies of one archive would all pass find_installed_archive at once, install each content once
+    first = {}
+    for i, d in enumerate(digests):
+        if d is None: continue
+        if d in first: print(f"skipped {archives[i]}, same archive as {archives[first[d]]}")
+        else: first[d] = i
+    names = [None]*len(archives)
+    todo = list(first.values())
+    if jobs>1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool: results = list(pool.map(install, todo))
+    else: results = [install(i) for i in todo]
+    for i, name in zip(todo, results): names[i] = name
+    new_mods = [n for n in dict.fromkeys(n for n in names if n) if n not in installed]
+    install_mod_write(new_mods)
+    if RELOAD_ON_INSTALL and any(names): perform_copy()
+    print('-'*40)
+    print("install complete!")
+    print(f"installed: {sum(1 for n in names if n)}/{len(archives)} ({len(new_mods)} new)")
+    for archive_path, name in zip(archives, names):
+        if not name: print(f"not installed: {archive_path}")
+    return names
+
+
 def install_mod_write(mods):
     # to avoid multiple usage of resource
     with open(LOAD_ORDER, "a", encoding="utf-8") as f:
@@ -468,7 +667,7 @@ def install_mod_write(mods):
             f.write(name+'\n')
 
 
-def delete_mod(mod_name, gui=False, write=True):
+def delete_mod(mod_name, gui=False, write=True, prune=True):
     read_cfg(sync=False)
     matches = [mod for mod in load_list() if mod_name.lower() in mod.lower()]
     if matches==[]: print("error: could not find mod "+mod_name); return
@@ -483,9 +682,12 @@ def delete_mod(mod_name, gui=False, write=True):
             for line in lines:
                 if line.strip() != mod: f.write(line)
     # delete dir
-    set_full_perms_dir(SOURCE_DIR/mod)
-    try: shutil.rmtree(SOURCE_DIR/mod)
+    try: remove_tree(SOURCE_DIR/mod)
     except Exception as e: print(f"error: encountered exception {str(e)} during deleting of mod {mod}")
+    if prune and os.path.isdir(STORE_DIR): prune_store(STORE_DIR) # drop now unreferenced blobs
+    registry = read_archive_registry()
+    if any(v["NAME"]==mod for v in registry.values()): write_archive_registry({k:v for k,v in registry.items() if v["NAME"]!=mod})
+    if os.path.exists(BACKUP_DIR/"fomod_choices"/f"{mod}.yaml"): os.unlink(BACKUP_DIR/"fomod_choices"/f"{mod}.yaml")
     if RELOAD_ON_INSTALL: perform_copy() #restore(); perform_copy()
     print("deleted mod "+mod+"!")
 
@@ -511,9 +713,26 @@ def rename_mod(old_name, new_name):
         try: llist[llist.index(old_name)] = new_name
         except: continue # this loadorder was not synced
         loadorder.write_text("\n".join(llist), encoding="utf-8")
+    registry = read_archive_registry()
+    for entry in registry.values():
+        if entry["NAME"]==old_name: entry["NAME"]=new_name
+    if registry: write_archive_registry(registry)
+    choices_file = BACKUP_DIR/"fomod_choices"/f"{old_name}.yaml"
+    if os.path.exists(choices_file): os.rename(choices_file, choices_file.with_name(f"{new_name}.yaml"))
     print("successfully renamed mod "+old_name+" to "+new_name)
 
 
+def dedupe_mods():
+    read_cfg(sync=False)
+    print("deduplicating "+str(SOURCE_DIR)+" into "+str(STORE_DIR)+"...")
+    files, reclaimed = dedupe_dir(SOURCE_DIR, STORE_DIR)
+    freed = prune_store(STORE_DIR)
+    print('-'*40)
+    print("dedupe complete!")
+    print("checked files: "+str(files))
+    print("reclaimed: "+format_size(reclaimed+freed))
+
+
 def main():
     parser = argparse.ArgumentParser(description="mod your bethesda games with ease")
     parser.add_argument("-l", "--load", action="store_true", help="perform load/copy operation")
@@ -523,8 +742,12 @@ def main():
     parser.add_argument("--switch-launcher", action="store_true", help="switch between script extender and vanilla launcher")
     parser.add_argument("--backup-ini", action="store_true", help="create a backup of ini files")
     parser.add_argument("--restore-ini", action="store_true", help="restore ini files from backup")
-    parser.add_argument("-i", "--install", help="install a mod") 
+    parser.add_argument("-i", "--install", nargs="+", metavar="ARCHIVE", help="install mod(s)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="install archives in parallel (implies --replay)")
+    parser.add_argument("--replay", action="store_true", help="install FOMODs from their saved choices without dialogs")
+    parser.add_argument("--on-duplicate", choices=["skip","replace","update","copy"], help="what to do with already installed archives instead of asking")
     parser.add_argument("-d", "--delete", help="delete a mod")
+    parser.add_argument("--dedupe", action="store_true", help="hardlink identical staged files into the content store")
     args = parser.parse_args()
 
     if len(sys.argv)>1: read_cfg() 
@@ -532,9 +755,10 @@ def main():
     if args.load: perform_copy()
     elif args.unload: restore()
     elif args.reload: restore(); perform_copy()
-    elif args.install: install_mod(args.install) # TODO: handle mutliple
+    elif args.install: install_mods(args.install, args.jobs, args.replay, args.on_duplicate)
     elif args.delete: delete_mod(args.delete) # TODO: handle multiple
     elif args.rename: rename_mod(*tuple(args.rename))
+    elif args.dedupe: dedupe_mods()
     elif args.switch_launcher: game_specific.switch_launcher(COMPAT_DIR, TARGET_DIR) 
     elif args.backup_ini: game_specific.backup_ini(COMPAT_DIR, INI_DIR)
     elif args.restore_ini: game_specific.restore_ini(COMPAT_DIR, INI_DIR)
@@ -3,25 +3,30 @@ import sys
 import platform
 import yaml
 import tempfile
+import pickle
+import multiprocessing
 import random
+from array import array
+from collections import OrderedDict
 from pathlib import Path
 from copy import deepcopy
 from time import sleep
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QTreeWidget, QTreeWidgetItem, QTableWidget, QTableWidgetItem, 
+    QTreeWidget, QTreeWidgetItem, 
     QPushButton, QSplitter, QLabel, QLineEdit, QMenu, QMessageBox, 
     QComboBox, QFileDialog, QInputDialog, QTextEdit, QToolButton, 
     QSplashScreen, QToolTip, QStyledItemDelegate, QHeaderView,
     QGraphicsOpacityEffect, QStyle, QScrollArea, QFrame, QCheckBox,
     QDialog, QListWidget, QListWidgetItem, QFormLayout, QTreeView,
-    QDialogButtonBox
+    QDialogButtonBox, QProgressBar, QTableView
 )
 from PyQt6.QtCore import ( Qt, QItemSelectionModel, QObject, QThread, 
     QWaitCondition, pyqtSignal, QMutex, QMutexLocker, QTimer, QPoint, 
     QSize, QFile, QTextStream, QMetaObject, pyqtSlot, QItemSelection,
-    QPointF, Qt, QPropertyAnimation, QDir, QEvent, QUrl
+    QPointF, Qt, QPropertyAnimation, QDir, QEvent, QUrl,
+    QAbstractTableModel, QSortFilterProxyModel, QModelIndex
 )
 from PyQt6.QtGui import ( QIcon, QFont, QTextCursor, QCursor, QPixmap, 
     QTextDocument, QPainter, QRadialGradient, QColor, QSyntaxHighlighter,
@@ -38,6 +43,20 @@ OVERRIDING_COLOR = "#053005"
 OVERRIDDEN_COLOR = "#300505"
 ALPHA   = 20
 OPACITY = ALPHA/255
+MOD_TABLE_HEADERS  = ["#", "", "Mod Name", "Conflicts", "Files"]
+MOD_TABLE_TOOLTIPS = ["Click to sort by priority", "", "Click to sort by name", "Overwritten and overriding mods", "Deployed files out of total, click to sort"]
+ROW_SEPARATOR = 1
+ROW_ENABLED   = 2
+ROW_COLLAPSED = 4
+HIGHLIGHT_NONE, HIGHLIGHT_OVERRIDING, HIGHLIGHT_OVERRIDDEN = range(3)
+CONFLICT_OVERRIDING = 1
+CONFLICT_OVERRIDDEN = 2
+CONFLICT_FULL       = 4
+CONFLICT_IDENTICAL  = 8
+CONFLICT_MARKERS = [(CONFLICT_OVERRIDING, "▲", "#99ff99"), (CONFLICT_OVERRIDDEN, "▼", "#ff9999"), (CONFLICT_FULL, "▽", "#ff9999"), (CONFLICT_IDENTICAL, "=", "#aaaaaa")]
+CONFLICT_ROLE = Qt.ItemDataRole.UserRole
+SEARCH_ROLE   = Qt.ItemDataRole.UserRole+1
+RICH_TEXT_CACHE_SIZE = 512 # laid out documents, a few screens of separators
 DIALOGUE_WIDTH   = 60
 
 class StdoutRedirector(QObject):
@@ -68,7 +87,12 @@ class CommandExecutorThread(QThread):
         self.mutex = QMutex()
         self.timer = None
         self.is_running = True
+        self.current = None
         
+    def pending(self, *command_ids):
+        # queued or running right now
+        with QMutexLocker(self.mutex): return self.current in command_ids or any(c in self.commands for c in command_ids)
+
     def add_command(self, command_id, command_data):
         with QMutexLocker(self.mutex):
             # store/update the latest version of this command
@@ -87,7 +111,9 @@ class CommandExecutorThread(QThread):
             commands_to_execute = self.commands.copy()
             self.commands.clear()
         for command_id, command_data in commands_to_execute.items():
-            result = self.process_command(command_id, command_data)
+            self.current = command_id
+            try: result = self.process_command(command_id, command_data)
+            finally: self.current = None
         self.commands_finished.emit()
             
     def process_command(self, command_id, command_data):
@@ -108,7 +134,8 @@ class CommandExecutorThread(QThread):
 
 
 class ExtractorThread(QThread):
-    call_handle_mod_install = pyqtSignal(str, str)
+    call_handle_mod_install = pyqtSignal(str, str, str, str, str)
+    call_resolve_duplicate = pyqtSignal(str, str, bool)
     progress = pyqtSignal(str)
     complete = pyqtSignal()
     temp_complete = pyqtSignal()
@@ -122,10 +149,24 @@ class ExtractorThread(QThread):
             parent.handle_mod_install,
             Qt.ConnectionType.BlockingQueuedConnection
         )
+        self.call_resolve_duplicate.connect(
+            parent.resolve_duplicate_install,
+            Qt.ConnectionType.BlockingQueuedConnection
+        )
 
     def run(self): # this is dumb
+        from bdsm import find_installed_archive
         for archive_path in self.file_paths:
             self.progress.emit(str(Path(archive_path)))
+            # catch repeat installs before paying for the extraction
+            digest = hash_archive(archive_path)
+            mod_name, identical = find_installed_archive(archive_path, digest)
+            mode = "copy"
+            if mod_name:
+                self.call_resolve_duplicate.emit(str(archive_path), mod_name, identical)
+                mode = self.parent._duplicate_choice
+                if mode=="skip": print(f"skipped {Path(archive_path).name}, already installed as {mod_name}"); continue
+            else: mod_name = ""
             archive_name = Path(archive_path).stem
             output_dir = Path(self.output_dir) / f"{archive_name}"
             output_dir = next(
@@ -138,8 +179,8 @@ class ExtractorThread(QThread):
                 result=True
             else: result=extract_archive(archive_path, temp_dir)
             self.temp_complete.emit()
-            if result: self.call_handle_mod_install.emit(str(temp_dir), str(archive_path))
-            else: self.call_handle_mod_install.emit(None, str(archive_path))
+            if result: self.call_handle_mod_install.emit(str(temp_dir), str(archive_path), digest, mod_name, mode)
+            else: self.call_handle_mod_install.emit(None, str(archive_path), digest, mod_name, mode)
                
         self.parent._extracting=False 
         self.complete.emit()
@@ -234,76 +275,282 @@ class ExeStatusThread(QThread):
         #self.status.setText("")
 
 
+class InstanceCloneThread(QThread):
+    progress = pyqtSignal(int, int, int, int) # files done, files total, bytes done, bytes total
+    done = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, src, dst, link_dirs):
+        super().__init__()
+        self.src=src
+        self.dst=dst
+        self.link_dirs=link_dirs
+
+    def run(self):
+        try: stats=clone_tree(self.src, self.dst, self.link_dirs, progress=self._report)
+        except Exception as e:
+            print(f"error: cloning {self.src} failed: {e}")
+            self.failed.emit(str(e))
+        else: self.done.emit(stats)
+
+    def _report(self, files, total_files, done_bytes, total_bytes):
+        # keep signal traffic down on instances with huge file counts
+        if files==total_files or files%200==0: self.progress.emit(files, total_files, done_bytes, total_bytes)
+
+
+class DeployThread(QThread):
+    progress = pyqtSignal(int, int) # files linked, files planned
+    done = pyqtSignal(bool)         # True when the game can launch
+
+    def __init__(self):
+        super().__init__()
+        self.cancelled=False
+        self.up_to_date=False
+
+    def run(self):
+        from bdsm import perform_copy, deploy_is_current
+        try:
+            self.up_to_date=deploy_is_current()
+            ok=self.up_to_date or perform_copy(progress=self._report, cancel=lambda: self.cancelled)
+        except Exception as e:
+            print(f"error: deploy failed: {e}")
+            ok=False
+        self.done.emit(ok)
+
+    def cancel(self):
+        self.cancelled=True
+
+    def _report(self, files, total_files):
+        if files==total_files or files%200==0: self.progress.emit(files, total_files)
+
+
 class ConflictThread(QThread):
-    conflict_update=pyqtSignal(int,str,str)
+    conflict_flags=pyqtSignal(object)
+    conflict_data=pyqtSignal(object)
+    search_results=pyqtSignal(str,object)
     
     def __init__(self, parent):
         super().__init__()
         self.parent=parent
-        self.mod_table=parent.mod_table
+        self.mutex=QMutex()
+        self.condition=QWaitCondition()
+        self.pending=None
+        self.stale=set()
+        self.full=False
+        self.running=True
         self.load_order=[]
+        self.emitted=[]
+        self.worker=None
+        self.conn=None
+        self.src_dir=None
+        self.cache_dir=""
+        self.content=False
+        self.seq=0
+        self.hashing=False
+        self.query=None
+        self.search_seq=0
+        self.clear_tables()
+
+    def clear_tables(self):
+        # mirror of the worker's conflict index, keyed by mod name
+        self.overriders=dict()
+        self.overriddens=dict()
+        self.overriddens_full=dict()
+        self.identical=dict()
+        self.effective=dict()
+
+    def request(self, mods, src_dir, cache_dir="", content=False):
+        # newest snapshot wins, bursts collapse into one update
+        with QMutexLocker(self.mutex):
+            self.pending=(list(mods), src_dir, cache_dir, content)
+            self.condition.wakeOne()
+
+    def search(self, query):
+        # staged file paths are indexed in the worker, only the newest query is sent
+        with QMutexLocker(self.mutex):
+            self.query=query
+            self.condition.wakeOne()
+
+    def reset(self):
+        # table rows were rebuilt, emit every row on next update
+        with QMutexLocker(self.mutex): self.full=True
+
+    def invalidate(self, mod):
+        # rescan a mod whose files changed without a load order change
+        with QMutexLocker(self.mutex): self.stale.add(mod)
+
+    def start_worker(self):
+        ctx=multiprocessing.get_context("spawn")
+        self.conn, child_conn=ctx.Pipe()
+        self.worker=ctx.Process(target=conflict_worker, args=(child_conn,))
+        self.worker.start()
+        child_conn.close()
+        self.clear_tables()
+
+    def stop(self):
+        if not self.isRunning(): return
+        with QMutexLocker(self.mutex):
+            self.running=False
+            self.condition.wakeOne()
+        if self.worker is not None:
+            # the worker finishes its current update first, don't wait on a long scan
+            try: self.conn.send(("stop",))
+            except OSError: pass
+            self.worker.join(2)
+            if self.worker.is_alive(): self.worker.terminate()
+        self.wait()
+        self.save_results()
+
+    def save_results(self):
+        # what the table showed at exit, shown again on the next start before the worker is up
+        if not self.cache_dir or not self.load_order: return
+        cache_file=Path(self.cache_dir)/"results.pkl"
+        try:
+            ensure_dir(cache_file.parent)
+            with open(str(cache_file)+".tmp", 'wb') as f:
+                pickle.dump({"version":CONFLICT_CACHE_VERSION, "src_dir":self.src_dir, "load_order":self.load_order,
+                             "overriders":self.overriders, "overriddens":self.overriddens,
+                             "overriddens_full":self.overriddens_full, "identical":self.identical, "effective":self.effective}, f)
+            os.replace(str(cache_file)+".tmp", cache_file)
+        except OSError as e: print(f"warning: could not write conflict cache: {e}")
+
+    def load_results(self, mods, src_dir):
+        try:
+            with open(Path(self.cache_dir)/"results.pkl", 'rb') as f: cache=pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError): return False
+        if cache.get("version")!=CONFLICT_CACHE_VERSION or cache.get("src_dir")!=src_dir or cache.get("load_order")!=mods: return False
+        self.overriders=cache["overriders"]
+        self.overriddens=cache["overriddens"]
+        self.overriddens_full=cache["overriddens_full"]
+        self.identical=cache.get("identical", dict())
+        self.effective=cache["effective"]
+        return True
    
     def run(self):
-        while 1:
-            # this is retarded but i am at my wits end
-            if (not self.parent._is_sorted_alphabetically) \
-            and (not self.parent._loading) \
-            and (not self.parent._extracting):
-                try: updated_mods=self.parent._collect_load_order()
-                except: continue
-                if self.load_order!=updated_mods:
-                    self.load_order=updated_mods
-                    try: self.update_conflict_data(self.load_order)
-                    except Exception as e: print(e); self.load_order=[]
-            elif self.parent._is_sorted_alphabetically: self.load_order=[]
-            QThread.msleep(80)
-        
-    def set_mod_conflict_flags(self, name, row):
-        over_text=""
-        tooltip_text_er=""
-        tooltip_text_en=""
-        tooltip_text_fu=""
-        if name in self.mod_table.overriders.keys(): 
-            if tooltip_text_er=="": tooltip_text_er+="<span style=\"color: #99ff99; font-weight: bold;\">Overriding:</span><br>  "
-            over_text+=" <span style=\"color: #99ff99; font-size: 14px;\">▲</span>"
-            tooltip_text_er+="\n  ".join(self.mod_table.overriders[name])
-        if name in self.mod_table.overriddens.keys(): 
-            if tooltip_text_en=="": tooltip_text_en+="<span style=\"color: #ff9999; font-weight: bold;\">Overridden By:</span><br>  "
-            over_text+=" <span style=\"color: #ff9999; font-size: 14px;\">▼</span>"
-            tooltip_text_en+="\n  ".join(self.mod_table.overriddens[name])
-        if name in self.mod_table.overriddens_full.keys(): 
-            if tooltip_text_fu=="": tooltip_text_fu+="<span style=\"color: #ff9999; font-weight: bold;\">Fully Overridden By:</span><br>  "
-            over_text+=" <span style=\"color: #ff9999; font-size: 14px;\">▽</span>"
-            tooltip_text_fu+="\n  ".join(self.mod_table.overriddens_full[name])
-    
-        if tooltip_text_fu and tooltip_text_fu.replace("Fully ",'')==tooltip_text_en: 
-            tooltip_text_en=""
-            over_text=over_text.replace("<span style=\"color: #ff9999; font-size: 14px;\">▼</span>",'')
-
-        over_text=f'<div style="text-align: center;">{over_text}</div>'
-
-        if tooltip_text_er and tooltip_text_en and tooltip_text_fu: 
-            tooltip_text=tooltip_text_fu+'<br><br>'+tooltip_text_en+'<br><br>'+tooltip_text_er
-        elif tooltip_text_er and tooltip_text_en: tooltip_text=tooltip_text_er+'<br><br>'+tooltip_text_en
-        elif tooltip_text_fu and tooltip_text_en: tooltip_text=tooltip_text_fu+'<br><br>'+tooltip_text_en
-        elif tooltip_text_fu and tooltip_text_er: tooltip_text=tooltip_text_fu+'<br><br>'+tooltip_text_er
-        elif tooltip_text_er: tooltip_text=tooltip_text_er
-        elif tooltip_text_en: tooltip_text=tooltip_text_en
-        elif tooltip_text_fu: tooltip_text=tooltip_text_fu
-        else: tooltip_text=""
-    
-        self.conflict_update.emit(row,over_text,tooltip_text)
-        
-    def update_conflict_data(self, mods=[]):
-        er,en,fu,mf=scan_mod_overrides(self.parent.cfg["SOURCE_DIR"],mods)
-        self.mod_table.overriders=er
-        self.mod_table.overriddens=en
-        self.mod_table.overriddens_full=fu
-        self.mod_table.mod_files=mf
-
+        while True:
+            with QMutexLocker(self.mutex):
+                while self.running and self.pending is None and self.query is None:
+                    # content results arrive unasked, poll for them while the worker hashes
+                    if self.hashing and self.conn.poll(): break
+                    if self.hashing: self.condition.wait(self.mutex, CONFLICT_POLL_MS)
+                    else: self.condition.wait(self.mutex)
+                if not self.running: return
+                request, self.pending=self.pending, None
+                stale, self.stale=self.stale, set()
+                full, self.full=self.full, False
+                query, self.query=self.query, None
+            try:
+                if request is not None:
+                    mods, src_dir, self.cache_dir, content=request
+                    self.update_conflict_data(mods, src_dir, stale, full, content)
+                if query is not None: self.run_search(query)
+                if request is None and query is None: self.receive_content()
+            except Exception as e:
+                if not self.running: return
+                print(f"error: conflict update failed: {e}")
+                self.load_order=[]
+                self.src_dir=None
+                self.hashing=False
+
+    def receive_content(self, msg=None):
+        status, seq, result=msg or self.conn.recv()
+        if status!="content" or seq!=self.seq: return # answers an update that was already superseded
+        self.hashing=False
+        self.emit_rows(self.load_order, self.unpack(self.load_order, result))
+
+    def run_search(self, query):
+        if self.worker is None or not self.worker.is_alive() or not self.load_order:
+            self.search_results.emit(query, dict())
+            return
+        self.search_seq+=1
+        self.conn.send(("search", self.search_seq, query))
+        while True:
+            msg=self.conn.recv()
+            if msg[0]=="search" and msg[1]==self.search_seq: break
+            if msg[0]=="content": self.receive_content(msg)
+        self.search_results.emit(query, msg[2])
+
+    def mod_conflict_flags(self, name):
+        flags=0
+        overriddens=self.conflicting(self.overriddens, name)
+        if self.conflicting(self.overriders, name): flags|=CONFLICT_OVERRIDING
+        if overriddens: flags|=CONFLICT_OVERRIDDEN
+        if name in self.overriddens_full:
+            flags|=CONFLICT_FULL
+            if self.overriddens_full[name]==overriddens: flags&=~CONFLICT_OVERRIDDEN # fully overridden says it all
+        if name in self.identical: flags|=CONFLICT_IDENTICAL
+        return flags, self.effective.get(name)
+
+    def update_conflict_data(self, mods, src_dir, stale=(), full=False, content=False):
+        if self.worker is None or not self.worker.is_alive():
+            self.start_worker()
+            full=True
+            if self.cache_dir and self.load_results(mods, src_dir):
+                # cached markers right away, the worker corrects whatever changed
+                self.src_dir=src_dir
+                self.emit_rows(mods, set(), full=True)
+                full=False
+        if self.src_dir!=src_dir:
+            self.src_dir=src_dir
+            self.clear_tables()
+            full=True
+        if full: self.emitted=[]
+        elif mods==self.load_order and not stale and content==self.content: return
+        self.load_order=mods
+        self.content=content
+        # blocking here only parks this thread, the worker does the scanning
+        self.seq+=1
+        self.conn.send(("update", self.seq, src_dir, mods, list(stale), self.cache_dir, content))
+        while True:
+            status, seq, result=self.conn.recv()
+            if status in ("result", "error") and seq==self.seq: break
+        if status=="error": raise RuntimeError(result)
+        result, self.hashing=result
+        dirty=self.unpack(mods, result)
+        self.emit_rows(mods, dirty)
+
+    def emit_rows(self, mods, dirty, full=False):
+        # identical overlaps are benign, keep them out of the conflict highlighting
+        overriders={mod:self.conflicting(self.overriders, mod) for mod in self.overriders}
+        overriddens={mod:self.conflicting(self.overriddens, mod) for mod in self.overriddens}
+        self.conflict_data.emit(({k:v for k,v in overriders.items() if v}, {k:v for k,v in overriddens.items() if v},
+                                 dict(self.overriddens_full), dict(self.identical)))
+        if full: self.emitted=[]
+        # only rows that moved or whose conflicts changed, all in one batch, tooltips are built on hover
+        batch=[]
         for i in range(len(mods)):
             if mods[i].startswith(">#") or mods[i].startswith("v#"): continue # skip seps
-            self.set_mod_conflict_flags(mods[i],i)
+            if i<len(self.emitted) and self.emitted[i]==mods[i] and mods[i] not in dirty: continue
+            batch.append((i,)+self.mod_conflict_flags(mods[i]))
+        if batch: self.conflict_flags.emit(batch)
+        self.emitted=list(mods)
+
+    def conflicting(self, table, mod):
+        same=self.identical.get(mod, ())
+        return [m for m in table.get(mod, ()) if m not in same]
+
+    def unpack(self, mods, packed):
+        # inverse of ConflictIndex.pack, returns the mods whose entries actually changed
+        ids, overriders, overriddens, identical, full, counts=packed
+        names=[m.removeprefix("~") for m in mods]
+        current=set(names)
+        tables=(self.overriders, self.overriddens, self.identical, self.overriddens_full, self.effective)
+        for table in tables:
+            for mod in [m for m in table if m not in current]: del table[mod]
+        dirty=set()
+        for k,i in enumerate(ids):
+            mod=names[i]
+            before=[table.get(mod) for table in tables]
+            for table,row in ((self.overriders, overriders[k]), (self.overriddens, overriddens[k]), (self.identical, identical[k])):
+                if row: table[mod]=[names[j] for j in row]
+                else: table.pop(mod, None)
+            if full[k]: self.overriddens_full[mod]=self.overriddens[mod]
+            else: self.overriddens_full.pop(mod, None)
+            won,loose,shadowed=counts[3*k:3*k+3]
+            if won<0: self.effective.pop(mod, None)
+            else: self.effective[mod]=(won,loose,shadowed)
+            if before!=[table.get(mod) for table in tables]: dirty.add(mod)
+        return dirty
 
 
 class EditableComboBox(QComboBox):
@@ -334,6 +581,29 @@ class EditableComboBox(QComboBox):
 
 
 class RichTextDelegate(QStyledItemDelegate):
+    # lives as long as the table, _init_ui builds a new one (and cache) whenever the stylesheet changes
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.docs = OrderedDict() # (html, width, font) -> QTextDocument, least recently used first
+        self.margin = int(QTextDocument().documentMargin())
+
+    def clear_cache(self):
+        self.docs.clear()
+
+    def document(self, html, width, font):
+        key = (html, width, font.key())
+        doc = self.docs.get(key)
+        if doc is not None:
+            self.docs.move_to_end(key)
+            return doc
+        doc = QTextDocument()
+        doc.setDefaultFont(font)
+        doc.setHtml(html)
+        if width >= 0: doc.setTextWidth(width)
+        self.docs[key] = doc
+        while len(self.docs) > RICH_TEXT_CACHE_SIZE: self.docs.popitem(last=False)
+        return doc
+
     def paint(self, painter, option, index):
         bg = index.data(Qt.ItemDataRole.BackgroundRole)
         if bg: option.backgroundBrush = bg
@@ -345,15 +615,29 @@ class RichTextDelegate(QStyledItemDelegate):
                 color = option.palette.highlightedText().color().name()
             else:
                 color = option.palette.text().color().name()
-            if not Qt.mightBeRichText(text):
-                text = f"<span style='font-weight: 600;'>{text}</span>"
-            text = f"<span style='color: {color};'>{text}</span>"
-            doc = QTextDocument()
-            doc.setHtml(text)
             painter.save()
-            painter.translate(option.rect.topLeft())
-            doc.setTextWidth(option.rect.width())
-            doc.drawContents(painter)
+            if not Qt.mightBeRichText(text):
+                # plain names skip html, drawn where the document margin would put them
+                font = QFont(option.font)
+                font.setWeight(QFont.Weight.DemiBold)
+                painter.setFont(font)
+                painter.setPen(QColor(color))
+                rect = option.rect.adjusted(self.margin, self.margin, -self.margin, 0)
+                hit = index.data(SEARCH_ROLE)
+                if hit:
+                    # the staged file that matched the search, after the name
+                    painter.drawText(rect, Qt.AlignmentFlag.AlignLeft|Qt.AlignmentFlag.AlignTop, text)
+                    rect.setLeft(rect.left()+painter.fontMetrics().horizontalAdvance(text+"  "))
+                    painter.setFont(option.font)
+                    painter.setPen(option.palette.placeholderText().color())
+                    painter.drawText(rect, Qt.AlignmentFlag.AlignLeft|Qt.AlignmentFlag.AlignTop,
+                                     painter.fontMetrics().elidedText(hit, Qt.TextElideMode.ElideLeft, rect.width()))
+                else:
+                    painter.drawText(rect, Qt.AlignmentFlag.AlignLeft|Qt.AlignmentFlag.AlignTop|Qt.TextFlag.TextWordWrap, text)
+            else:
+                doc = self.document(f"<span style='color: {color};'>{text}</span>", option.rect.width(), option.font)
+                painter.translate(option.rect.topLeft())
+                doc.drawContents(painter)
             painter.restore()
         else:
             super().paint(painter, option, index)
@@ -361,12 +645,40 @@ class RichTextDelegate(QStyledItemDelegate):
     def sizeHint(self, option, index):
         text = index.data(Qt.ItemDataRole.DisplayRole)
         if text:
-            doc = QTextDocument()
-            doc.setHtml(text)
+            doc = self.document(text, -1, option.font)
             return QSize(int(doc.idealWidth()), int(doc.size().height()))
         return super().sizeHint(option, index)
 
 
+class ConflictDelegate(QStyledItemDelegate):
+    # paints the conflict markers straight from the row's CONFLICT_* flags, no html per cell
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font=QFont()
+        self.font.setPixelSize(14)
+
+    def paint(self, painter, option, index):
+        bg = index.data(Qt.ItemDataRole.BackgroundRole)
+        if bg: option.backgroundBrush = bg
+        style = option.widget.style()
+        style.drawControl(style.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+        flags = index.data(CONFLICT_ROLE)
+        if not flags: return
+        markers = [(marker, color) for bit,marker,color in CONFLICT_MARKERS if flags&bit]
+        painter.save()
+        painter.setFont(self.font)
+        metrics = painter.fontMetrics()
+        space = metrics.horizontalAdvance(" ")
+        width = sum(metrics.horizontalAdvance(marker) for marker,color in markers)+space*(len(markers)-1)
+        x = option.rect.left()+(option.rect.width()-width)//2
+        for marker,color in markers:
+            painter.setPen(QColor(color))
+            advance = metrics.horizontalAdvance(marker)
+            painter.drawText(x, option.rect.top(), advance, option.rect.height(), Qt.AlignmentFlag.AlignCenter, marker)
+            x += advance+space
+        painter.restore()
+
+
 class FadingBg:
     def __init__(self, table, paths, interval_ms=20000): # 20000 - 20s
         global OVERRIDING_COLOR, OVERRIDDEN_COLOR
@@ -489,7 +801,346 @@ class FadingBg:
         self.fx1, self.fx2 = self.fx2, self.fx1
 
 
-class ModTable(QTableWidget):
+class ModTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.headers=list(MOD_TABLE_HEADERS)
+        self.colors=[None, None, None] # HIGHLIGHT_NONE keeps the view's own background
+        self.separator_font=QFont()
+        self.separator_font.setBold(True)
+        self.separator_font.setUnderline(True)
+        self.conflict_tables=({}, {}, {}, {}) # overriders, overriddens, fully overridden, identical by mod name
+        self.search_hits={}           # mod name -> staged file matching the search box
+        self.clear_rows()
+
+    def clear_rows(self):
+        # one slot per row in flat arrays, a few thousand rows stay cheap to move around
+        self.names=[]                 # mod name, or the raw separator entry (v#/>#)
+        self.row_flags=bytearray()    # ROW_* bits
+        self.priorities=array('i')    # mod priority, 0 for separators
+        self.owners=array('i')        # row of the separator above, -1 for none
+        self.ends=array('i')          # separators: row after their last child
+        self.rows_by_name={}          # displayed name -> row
+        self.rows_by_priority=array('i', [-1]) # priority -> row
+        self.highlights=bytearray()   # HIGHLIGHT_* per row
+        self.highlighted=set()        # rows whose highlight is not HIGHLIGHT_NONE
+        self.conflict_flags=bytearray() # CONFLICT_* bits
+        self.counts=[]                # (won, loose, shadowed) deployed file counts, None when not deployed
+
+    def set_colors(self, alpha):
+        for i,color in ((HIGHLIGHT_OVERRIDING, QColor(OVERRIDING_COLOR)), (HIGHLIGHT_OVERRIDDEN, QColor(OVERRIDDEN_COLOR))):
+            color.setAlpha(alpha)
+            self.colors[i]=color
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(MOD_TABLE_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation!=Qt.Orientation.Horizontal: return None
+        if role==Qt.ItemDataRole.DisplayRole: return self.headers[section]
+        if role==Qt.ItemDataRole.ToolTipRole: return MOD_TABLE_TOOLTIPS[section] or None
+        return None
+
+    def set_headers(self, labels):
+        self.headers=list(labels)
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, len(labels)-1)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        row, col=index.row(), index.column()
+        sep=self.row_flags[row]&ROW_SEPARATOR
+        if role==Qt.ItemDataRole.DisplayRole:
+            if col==0:
+                if sep: return "▶" if self.row_flags[row]&ROW_COLLAPSED else "▼"
+                return str(self.priorities[row])
+            if col==2: return self.display_name(row) if sep else self.names[row]
+            if col==3: return " ".join(marker for bit,marker,color in CONFLICT_MARKERS if self.conflict_flags[row]&bit)
+            if col==4:
+                counts=self.counts[row]
+                return f"{counts[0]}/{counts[0]+counts[2]}" if counts else ""
+            return ""
+        if role==Qt.ItemDataRole.CheckStateRole:
+            if col!=1 or sep: return None
+            return Qt.CheckState.Checked if self.row_flags[row]&ROW_ENABLED else Qt.CheckState.Unchecked
+        if role==Qt.ItemDataRole.BackgroundRole: return self.colors[self.highlights[row]]
+        if role==Qt.ItemDataRole.ToolTipRole:
+            if col==0 and sep: return "Collapse/expand separator"
+            if col==2 and not sep: return self.search_hits.get(self.names[row])
+            if col==3: return self.conflict_tooltip(row)
+            if col==4: return self.files_tooltip(row)
+            return None
+        if role==Qt.ItemDataRole.TextAlignmentRole:
+            if col in (0,3): return Qt.AlignmentFlag.AlignCenter
+            if col==4 and not sep: return Qt.AlignmentFlag.AlignRight|Qt.AlignmentFlag.AlignVCenter
+            return Qt.AlignmentFlag.AlignLeft|Qt.AlignmentFlag.AlignVCenter
+        if role==Qt.ItemDataRole.FontRole:
+            if col==2 and sep: return self.separator_font
+            return None
+        if role==CONFLICT_ROLE and col==3: return self.conflict_flags[row]
+        if role==SEARCH_ROLE and col==2 and not sep: return self.search_hits.get(self.names[row])
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role!=Qt.ItemDataRole.CheckStateRole or index.column()!=1: return False
+        self.set_enabled([index.row()], Qt.CheckState(value)==Qt.CheckState.Checked)
+        return True
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.ItemIsDropEnabled
+        flags=Qt.ItemFlag.ItemIsEnabled|Qt.ItemFlag.ItemIsSelectable|Qt.ItemFlag.ItemIsDragEnabled
+        if index.column()==1 and not self.row_flags[index.row()]&ROW_SEPARATOR: flags|=Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def display_name(self, row):
+        name=self.names[row]
+        if not self.row_flags[row]&ROW_SEPARATOR: return name
+        clean_name=name[2:] if name.startswith("v#") or name.startswith(">#") else name
+        if not Qt.mightBeRichText(name): clean_name=f"<b><u>{clean_name}</u></b>"
+        return clean_name
+
+    def conflict_tooltip(self, row):
+        # built on hover, most rows are never hovered
+        flags=self.conflict_flags[row]
+        if not flags: return None
+        name=self.names[row]
+        sections=[]
+        for bit,title,color,table in ((CONFLICT_FULL, "Fully Overridden By:", "#ff9999", self.conflict_tables[2]),
+                                      (CONFLICT_OVERRIDING, "Overriding:", "#99ff99", self.conflict_tables[0]),
+                                      (CONFLICT_OVERRIDDEN, "Overridden By:", "#ff9999", self.conflict_tables[1]),
+                                      (CONFLICT_IDENTICAL, "Identical Files:", "#aaaaaa", self.conflict_tables[3])):
+            if flags&bit and table.get(name):
+                sections.append(f"<span style=\"color: {color}; font-weight: bold;\">{title}</span><br>  "+"\n  ".join(table[name]))
+        return "<br><br>".join(sections) or None
+
+    def files_tooltip(self, row):
+        counts=self.counts[row]
+        if not counts: return None
+        won,loose,shadowed=counts
+        return f"{won} of {won+shadowed} files deployed<br>  {loose} loose, {won-loose} overriding<br>  {shadowed} shadowed"
+
+    def _parse(self, entries):
+        names=[]
+        flags=bytearray()
+        for entry in entries:
+            if entry.startswith('>#') or entry.startswith('v#') or entry.startswith('#'):
+                names.append(entry)
+                flags.append(ROW_SEPARATOR|(ROW_COLLAPSED if entry.startswith(">") else 0))
+            elif entry.startswith('*') or entry.startswith('~'):
+                names.append(entry.lstrip("*~"))
+                flags.append(0)
+            else:
+                names.append(entry)
+                flags.append(ROW_ENABLED)
+        return names, flags
+
+    def _reindex(self):
+        # priorities, separator membership and lookup indexes in one pass
+        n=len(self.names)
+        priority=0
+        owner=-1
+        priorities=array('i', bytes(4*n))
+        owners=array('i', bytes(4*n))
+        ends=array('i', bytes(4*n))
+        rows_by_name={}
+        rows_by_priority=array('i', [-1])
+        for row,flag in enumerate(self.row_flags):
+            if flag&ROW_SEPARATOR:
+                if owner>=0: ends[owner]=row
+                owners[row]=owner
+                owner=row
+                rows_by_name.setdefault(self.display_name(row), row)
+            else:
+                priority+=1
+                priorities[row]=priority
+                owners[row]=owner
+                rows_by_priority.append(row)
+                rows_by_name.setdefault(self.names[row], row)
+        if owner>=0: ends[owner]=n
+        self.priorities, self.owners, self.ends=priorities, owners, ends
+        self.rows_by_name, self.rows_by_priority=rows_by_name, rows_by_priority
+
+    def _touch(self, first, last=None, columns=(0,0), roles=None):
+        if last is None: last=len(self.names)-1
+        if first>last: return
+        if roles is None: self.dataChanged.emit(self.index(first, columns[0]), self.index(last, columns[1]))
+        else: self.dataChanged.emit(self.index(first, columns[0]), self.index(last, columns[1]), roles)
+
+    def load(self, entries):
+        # whole load order in one reset
+        self.beginResetModel()
+        self.clear_rows()
+        self.names, self.row_flags=self._parse(entries)
+        n=len(self.names)
+        self.highlights=bytearray(n)
+        self.conflict_flags=bytearray(n)
+        self.counts=[None]*n
+        self._reindex()
+        self.endResetModel()
+
+    def insert_entries(self, row, entries):
+        names, flags=self._parse(entries)
+        if not names: return
+        n=len(names)
+        self.beginInsertRows(QModelIndex(), row, row+n-1)
+        self.names[row:row]=names
+        self.row_flags[row:row]=flags
+        self.highlights[row:row]=bytearray(n)
+        self.highlighted={r if r<row else r+n for r in self.highlighted}
+        self.conflict_flags[row:row]=bytearray(n)
+        self.counts[row:row]=[None]*n
+        self._reindex()
+        self.endInsertRows()
+        self._touch(row+n) # priorities and membership below shifted
+
+    def remove_rows(self, rows):
+        rows=sorted(set(rows))
+        if not rows: return
+        contiguous=rows[-1]-rows[0]+1==len(rows)
+        if contiguous: self.beginRemoveRows(QModelIndex(), rows[0], rows[-1])
+        else: self.beginResetModel()
+        keep=set(range(len(self.names))).difference(rows)
+        self._take(sorted(keep))
+        if contiguous:
+            self.endRemoveRows()
+            self._touch(rows[0])
+        else: self.endResetModel()
+
+    def _take(self, order):
+        self.names=[self.names[i] for i in order]
+        self.row_flags=bytearray(self.row_flags[i] for i in order)
+        self.highlights=bytearray(self.highlights[i] for i in order)
+        self.conflict_flags=bytearray(self.conflict_flags[i] for i in order)
+        self.counts=[self.counts[i] for i in order]
+        self.highlighted={row for row,highlight in enumerate(self.highlights) if highlight}
+        self._reindex()
+
+    def reorder(self, order):
+        # order lists the old rows in their new order, any number of moves is one layout change
+        if order==list(range(len(order))): return
+        self.layoutAboutToBeChanged.emit()
+        position=array('i', bytes(4*len(order)))
+        for new_row,old_row in enumerate(order): position[old_row]=new_row
+        self._take(order)
+        persistent=self.persistentIndexList()
+        self.changePersistentIndexList(persistent, [self.index(position[i.row()], i.column()) for i in persistent])
+        self.layoutChanged.emit()
+
+    def set_enabled(self, rows, enabled):
+        changed=[]
+        for row in rows:
+            flag=self.row_flags[row]
+            if flag&ROW_SEPARATOR or bool(flag&ROW_ENABLED)==enabled: continue
+            self.row_flags[row]=flag^ROW_ENABLED
+            changed.append(row)
+        if changed: self._touch(min(changed), max(changed), (1,1), [Qt.ItemDataRole.CheckStateRole])
+
+    def set_collapsed(self, row, collapsed):
+        if bool(self.row_flags[row]&ROW_COLLAPSED)==collapsed: return
+        self.row_flags[row]^=ROW_COLLAPSED
+        children=self.separator_children(row)
+        self._touch(row, children[-1] if children else row) # children too, the filter hides them
+
+    def set_name(self, row, name):
+        self.names[row]=name
+        self._reindex()
+        self._touch(row, row, (2,2))
+
+    def set_conflicts(self, batch):
+        # batch of (row, CONFLICT_* flags, file counts) from one conflict update
+        rows=[]
+        for row,flags,counts in batch:
+            if row>=len(self.names): continue
+            self.conflict_flags[row]=flags
+            self.counts[row]=counts
+            rows.append(row)
+        if rows: self._touch(min(rows), max(rows), (3,4))
+
+    def set_search_hits(self, hits):
+        self.search_hits=hits
+        self._touch(0, None, (2,2), [SEARCH_ROLE])
+
+    def set_conflict_tables(self, overriders, overriddens, overriddens_full, identical):
+        self.conflict_tables=(overriders, overriddens, overriddens_full, identical)
+
+    def set_highlights(self, highlights):
+        # highlights maps row -> HIGHLIGHT_*, only rows entering or leaving a highlight repaint
+        changed=[]
+        for row in self.highlighted.union(highlights):
+            highlight=highlights.get(row, HIGHLIGHT_NONE)
+            if self.highlights[row]==highlight: continue
+            self.highlights[row]=highlight
+            changed.append(row)
+        self.highlighted={row for row,highlight in highlights.items() if highlight}
+        changed.sort()
+        first=0
+        for i in range(1, len(changed)+1):
+            if i<len(changed) and changed[i]==changed[i-1]+1: continue
+            self._touch(changed[first], changed[i-1], (0,len(MOD_TABLE_HEADERS)-1), [Qt.ItemDataRole.BackgroundRole])
+            first=i
+
+    def is_separator(self, row):
+        return bool(self.row_flags[row]&ROW_SEPARATOR)
+
+    def is_collapsed(self, row):
+        return bool(self.row_flags[row]&ROW_COLLAPSED)
+
+    def is_enabled(self, row):
+        return bool(self.row_flags[row]&ROW_ENABLED)
+
+    def separator_children(self, row):
+        if not self.row_flags[row]&ROW_SEPARATOR: return []
+        return list(range(row+1, self.ends[row]))
+
+    def row_from_name(self, name):
+        return self.rows_by_name.get(name)
+
+    def row_from_priority(self, priority):
+        if 0<priority<len(self.rows_by_priority): return self.rows_by_priority[priority]
+        return None
+
+    def load_order(self):
+        mods=[]
+        for name,flag in zip(self.names, self.row_flags):
+            if flag&ROW_SEPARATOR: mods.append((">#" if flag&ROW_COLLAPSED else "v#")+name.lstrip(">v#"))
+            elif flag&ROW_ENABLED: mods.append(name)
+            else: mods.append("~"+name)
+        return mods
+
+
+class ModTableProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text=""
+
+    def set_filter_text(self, text):
+        self.text=text.lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        model=self.sourceModel()
+        if self.text: return self.text in model.data(model.index(row,2)).lower() or (not model.row_flags[row]&ROW_SEPARATOR and model.names[row] in model.search_hits)
+        if self.sortColumn()>=0 or model.row_flags[row]&ROW_SEPARATOR: return True # sorted views show every row
+        owner=model.owners[row]
+        return owner<0 or not model.row_flags[owner]&ROW_COLLAPSED
+
+    def lessThan(self, left, right):
+        model=self.sourceModel()
+        if left.column()!=4: return model.names[left.row()].lower()<model.names[right.row()].lower()
+        # deployed files, disabled mods and separators last in either direction
+        def key(row):
+            counts=model.counts[row]
+            return (not counts, counts[0] if counts else 0)
+        a,b=key(left.row()),key(right.row())
+        if self.sortOrder()==Qt.SortOrder.DescendingOrder: return (a[0],-a[1])>(b[0],-b[1])
+        return a<b
+
+
+class ModTable(QTableView):
     def __init__(self, parent, *args, **kwargs):
         super().__init__(*args, **kwargs)
         global OVERRIDING_COLOR, OVERRIDDEN_COLOR
@@ -498,237 +1149,132 @@ class ModTable(QTableWidget):
         self.parent=parent
         self.alpha=255
         self.opacity=1
+        self.table_model=ModTableModel(self)
+        self.proxy=ModTableProxy(self)
+        self.proxy.setSourceModel(self.table_model)
+        self.setModel(self.proxy)
         if self.parent.cfg["DO_REQUESTS"]:
             bg_paths=get_game_bgs(self.parent.cfg)
             if bg_paths:
                 self.alpha=ALPHA
                 self.opacity=OPACITY
                 self.background=FadingBg(self,bg_paths)
+        self.table_model.set_colors(self.alpha)
+
+    # rows below are always load order (source) rows, the proxy only decides what is shown where
+    def rowCount(self):
+        return self.table_model.rowCount()
+
+    def columnCount(self):
+        return self.table_model.columnCount()
+
+    def source_row(self, index):
+        return self.proxy.mapToSource(index).row()
+
+    def selected_rows(self):
+        return sorted(set(self.source_row(index) for index in self.selectionModel().selectedIndexes()))
+
+    def select_rows(self, rows):
+        self.clearSelection()
+        selection = QItemSelection()
+        for row in rows:
+            index=self.proxy.mapFromSource(self.table_model.index(row, 0))
+            if not index.isValid(): continue
+            selection.select(index, index.siblingAtColumn(self.columnCount()-1))
+        self.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.Select)
+
+    def is_row_hidden(self, row):
+        return not self.proxy.mapFromSource(self.table_model.index(row, 0)).isValid()
 
     def is_separator_row(self, row):
-        name_item = self.item(row, 2)
-        return name_item and name_item.data(Qt.ItemDataRole.UserRole) == "separator"
+        return row is not None and 0<=row<self.rowCount() and self.table_model.is_separator(row)
 
     def is_separator_collapsed(self, row):
         if not self.is_separator_row(row): return None
-        if self.item(row, 0).text()=="▶": return True
-        else: return False
+        return self.table_model.is_collapsed(row)
+
+    def get_name(self, row):
+        return self.table_model.data(self.table_model.index(row, 2))
 
     def get_row_from_name(self,name):
-        for row in range(self.rowCount()):
-            item = self.item(row, 2)
-            if item and item.text() == name: return row
-        return None
+        return self.table_model.row_from_name(name)
 
     def get_row_from_priority(self,priority):
-        for row in range(self.rowCount()):
-            item = self.item(row, 0)
-            if item and item.text() == str(priority): return row
-        return None
+        return self.table_model.row_from_priority(priority)
 
     def get_all_separators(self):
-        seps=[]
-        for row in range(self.rowCount()):
-            name_item=self.item(row,2)
-            if name_item and name_item.data(Qt.ItemDataRole.UserRole) == "separator":
-                seps.append(name_item.text())
-        return seps
+        return [self.get_name(row) for row,flag in enumerate(self.table_model.row_flags) if flag&ROW_SEPARATOR]
 
     def get_priorities(self):
-        priorities=[]
-        for row in range(self.rowCount()):
-            if self.is_separator_row(row): continue
-            priorities.append(int(self.item(row,0).text()))
-        return priorities
-
-    def update_priority_numbers(self):
-        priority = 1
-        for row in range(self.rowCount()):
-            if self.is_separator_row(row): continue
-            priority_item = self.item(row, 0)
-            if priority_item:
-                priority_item.setText(str(priority))
-                priority += 1
-    
+        return [p for row,p in enumerate(self.table_model.priorities) if not self.table_model.is_separator(row)]
+
     def get_separator_children(self, separator_row):
-        children = []
-        for r in range(separator_row + 1, self.rowCount()):
-            if self.is_separator_row(r): break
-            children.append(r)
-        return children
+        return self.table_model.separator_children(separator_row)
 
     def get_item_separator_row(self, row):
         if self.is_separator_row(row): return None
-        for i in range(row,-1,-1):
-            if self.is_separator_row(i): return i
-        return None
-       
-    def collect_row_data(self, row):
-        is_sep = self.is_separator_row(row)
-        if is_sep:
-            return { 'priority_num': "",
-                     'is_separator': True,
-                     'name': self.item(row, 2).data(Qt.ItemDataRole.UserRole + 1),
-                     'collapse_state': self.item(row, 0).text(),
-                     'hidden': self.isRowHidden(row),
-                     'conflicts': "",
-                     'conflict_tooltip':"" }
-
-        return { 'priority_num': self.item(row,0).text(),
-                 'is_separator': False,
-                 'name': self.item(row, 2).text(),
-                 'checkbox': self.item(row, 1).checkState(),
-                 'hidden': self.isRowHidden(row),
-                 'conflicts': self.item(row,3).text(),
-                 'conflict_tooltip': self.item(row,3).toolTip() }
-
-    def create_row_from_data(self, row, data, hidden=False):
-        if data['is_separator']:
-            self._create_separator_items(row, data['name'], collapse_state=data["collapse_state"])
-        else:
-            self._create_mod_items(row, data['name'], data['checkbox'], data['conflicts'], hidden=hidden)
-        
-        if data['hidden']:
-            self.setRowHidden(row, True)
-    
-    def _create_separator_items(self, row, name, collapse_state=False, conflicts="", tooltip=""):
-        self.parent._loading=True
-        if collapse_state or name[0]==">": collapse_state="▶"
-        else: collapse_state="▼"
-        priority_item = QTableWidgetItem(collapse_state)
-        priority_item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsDragEnabled)
-        priority_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        priority_item.setToolTip("Collapse/expand separator")
-        self.setItem(row, 0, priority_item)
-        
-        checkbox_item = QTableWidgetItem("")
-        checkbox_item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsDragEnabled)
-        self.setItem(row, 1, checkbox_item)
-        
-        if name.startswith("v#") \
-        or name.startswith(">#"): clean_name=name[2:]
-        else: clean_name=name
-        if not Qt.mightBeRichText(name): clean_name=f"<b><u>{clean_name}</u></b>"
-        name_item = QTableWidgetItem(clean_name)
-        name_item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsDragEnabled)
-        font = name_item.font()
-        font.setBold(True)
-        font.setUnderline(True)
-        name_item.setFont(font)
-        name_item.setData(Qt.ItemDataRole.UserRole, "separator")
-        name_item.setData(Qt.ItemDataRole.UserRole + 1, name)
-        self.setItem(row, 2, name_item)
-
-        conflict_item = QTableWidgetItem("")
-        conflict_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        conflict_item.setFlags(conflict_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-        self.setItem(row,3, conflict_item)
-        self.parent._loading=False
-
-    def _create_mod_items(self, row, name, checkbox_state=None, conflicts="", tooltip="", hidden=False):
-        self.parent._loading=True
-        priority_item = QTableWidgetItem("")
-        priority_item.setFlags(priority_item.flags() | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable & ~Qt.ItemFlag.ItemIsDragEnabled)
-        priority_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.setItem(row, 0, priority_item)
-        
-        checkbox_item = QTableWidgetItem()
-        checkbox_item.setFlags(checkbox_item.flags() | Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
-        if checkbox_state is not None:
-            checkbox_item.setCheckState(checkbox_state)
-        self.setItem(row, 1, checkbox_item)
-        
-        name_item = QTableWidgetItem(name)
-        name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-        name_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-        self.setItem(row, 2, name_item)
-        
-        conflict_item = QTableWidgetItem(conflicts)
-        conflict_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        conflict_item.setToolTip(tooltip)
-        self.setItem(row, 3, conflict_item)
-        conflict_item.setFlags(conflict_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-
-        if hidden: self.setRowHidden(row,True)
-        self.parent._loading=False
-
-    def highlight_row(self, row, overriding=False, overridden=False):
-        for col in range(self.columnCount()):
-            if self.item(row, col):
-                if   overriding: color=QColor(OVERRIDING_COLOR)
-                elif overridden: color=QColor(OVERRIDDEN_COLOR)
-                else: color=QColor(0,0,0) # TODO: will need to be theme adaptive
-                color.setAlpha(self.alpha)
-                self.item(row, col).setBackground(color)
- 
+        owner=self.table_model.owners[row]
+        return None if owner<0 else owner
+
+    def move_rows(self, moves):
+        # replay (from, to) single row moves on an index list, then apply them as one reorder
+        order=list(range(self.rowCount()))
+        for from_row,to_row in moves: order.insert(to_row, order.pop(from_row))
+        self.table_model.reorder(order)
+
+    def move_rows_to(self, rows, target_row):
+        # rows are inserted before target_row, returns where they ended up
+        moving=set(rows)
+        order=[r for r in range(self.rowCount()) if r not in moving]
+        adjusted_target=target_row-sum(1 for r in rows if r<target_row)
+        # dropped into a collapsed separator, land below its children
+        if adjusted_target>0 and self.is_separator_collapsed(order[adjusted_target-1]):
+            while adjusted_target<len(order) and not self.is_separator_row(order[adjusted_target]): adjusted_target+=1
+        order[adjusted_target:adjusted_target]=rows
+        self.table_model.reorder(order)
+        return list(range(adjusted_target, adjusted_target+len(rows)))
+
+    def highlight_rows(self, overriding=(), overridden=()):
+        highlights={}
+        for row in overriding: highlights[row]=HIGHLIGHT_OVERRIDING
+        for row in overridden: highlights[row]=HIGHLIGHT_OVERRIDDEN
+        self.table_model.set_highlights(highlights)
+
     def dropEvent(self, event):
         # this is the worst
         drop_pos = event.position().toPoint()
         index = self.indexAt(drop_pos)
-        selected = self.selectedItems()
-        if not selected:
+        selected_rows = self.selected_rows()
+        if not selected_rows:
             event.ignore()
             return
-      
-        # selected separator, get all child items 
-        selected_rows = sorted(set(item.row() for item in selected))
+
+        # selected separator, get all child items
         more_selected_rows=[]
         for row in selected_rows:
             if self.is_separator_row(row) and self.is_separator_collapsed(row):
                 more_selected_rows+=self.get_separator_children(row)
-        selected_rows+=more_selected_rows
-        
+        selected_rows=sorted(set(selected_rows+more_selected_rows))
+
         if not index.isValid(): target_row = self.rowCount()
         else:
-            drop_row = index.row()
+            drop_row = self.source_row(index)
             rect = self.visualRect(index)
-            y = drop_pos.y()
             mid_point = rect.top() + rect.height() / 2
-            target_row = drop_row if y < mid_point else drop_row + 1
-        
+            target_row = drop_row if drop_pos.y() < mid_point else drop_row + 1
+
         event.ignore()
-        
-        if len(selected_rows) > 0:
-            min_sel = min(selected_rows)
-            max_sel = max(selected_rows)
-            if selected_rows == list(range(min_sel, max_sel + 1)):
-                if min_sel <= target_row <= max_sel + 1: return
-        rows_data = [self.collect_row_data(row) for row in selected_rows]
-
-        for row in reversed(selected_rows):
-            self.removeRow(row)
-        
-        rows_removed_before_target = sum(1 for r in selected_rows if r < target_row)
-        adjusted_target = target_row - rows_removed_before_target
-
-        # determine if we dragged into collapsed separator
-        hidden=False
-        if self.is_separator_row(adjusted_target-1) \
-        and self.is_separator_collapsed(adjusted_target-1):
-            children=self.get_separator_children(adjusted_target-1)
-            if children: adjusted_target=max(children)+1
-            hidden=True
-
-        new_selection_rows = []
-        for i, data in enumerate(rows_data):
-            insert_row = adjusted_target + i
-            self.insertRow(insert_row)
-            self.create_row_from_data(insert_row, data, hidden=hidden)
-            new_selection_rows.append(insert_row)
-        
-        self.clearSelection()
-        selection = QItemSelection()
-        for row in new_selection_rows:
-            left = self.model().index(row, 0)
-            right = self.model().index(row, self.columnCount() - 1)
-            selection.select(left, right)
-        self.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.Select)
-        
-        self.update_priority_numbers()
-        
+
+        min_sel = min(selected_rows)
+        max_sel = max(selected_rows)
+        if selected_rows == list(range(min_sel, max_sel + 1)):
+            if min_sel <= target_row <= max_sel + 1: return
+
+        new_selection_rows=self.move_rows_to(selected_rows, target_row)
+        self.select_rows(new_selection_rows)
+
         QTimer.singleShot(100,lambda: self.parent.highlight_conflicts(new_selection_rows))
-        if self.selectedItems():
-            self.itemChanged.emit(self.selectedItems()[0])
+        self.parent.auto_save_load_order()
 
 
 class ConfigManager(QMainWindow):
@@ -768,15 +1314,18 @@ class ConfigManager(QMainWindow):
         longest = max((len(k) for k in self.config.keys()), default=10)
         label_width = longest * 8 + 8  # rough char width
         
-        BOOL_KEYS         = {"RELOAD_ON_INSTALL", "UPDATE_ON_CLOSE", "LINK_ON_LAUNCH", "DO_REQUESTS"}
-        PATH_KEYS         = {"SOURCE_DIR", "TARGET_DIR", "COMPAT_DIR", "PRESET_DIR", "LOAD_ORDER", "INI_DIR"}
+        BOOL_KEYS         = {"RELOAD_ON_INSTALL", "UPDATE_ON_CLOSE", "LINK_ON_LAUNCH", "DO_REQUESTS", "DEDUPE_ON_INSTALL", "CONTENT_CONFLICTS"}
+        PATH_KEYS         = {"SOURCE_DIR", "STORE_DIR", "TARGET_DIR", "COMPAT_DIR", "PRESET_DIR", "LOAD_ORDER", "INI_DIR"}
         STYLESHEET_KEY    = "STYLESHEET"
         
         tooltips = {"RELOAD_ON_INSTALL":"Reload all mods upon change to loadorder (priority changes, mod install, mod deletion, etc.)",
                     "UPDATE_ON_CLOSE"  :"Save loadorder on close of application",
                     "LINK_ON_LAUNCH"   :"Link all mods upon launching executable",
                     "DO_REQUESTS"      :"Request assets (background and icon images) from Steam API\n(Disabling will not render default background and icons)",
+                    "DEDUPE_ON_INSTALL":"Hardlink identical mod files into a shared content store on install\n(Store must be on the same drive as the mod install directory)",
+                    "CONTENT_CONFLICTS":"Compare the contents of overlapping mod files in the background\n(Overlaps with identical files are marked = instead of as conflicts)",
                     "SOURCE_DIR"       :"Mod install directory (location mods are linked from)",
+                    "STORE_DIR"        :"Content store directory (deduplicated mod files, see DEDUPE ON INSTALL)",
                     "TARGET_DIR"       :"Mod load target directory (location mods are linked to)",
                     "COMPAT_DIR"       :"Steam game compatability data directory (necessarily the 'AppData/Local' directory)",
                     "PRESET_DIR"       :"Preset directory location (location loadorder files are stored)",
@@ -1115,15 +1664,17 @@ class InstanceManager(QDialog):
         if os.path.exists(path) and os.listdir(path)!=[]: QMessageBox.warning(self, 'Move Error',
                       'Target path is non-empty (choose an empty directory)'); self.dup_instance(name,path); return
 
-        def copy_dirs():
-            for item in os.listdir(old_path):
-                s = os.path.join(old_path, item)
-                d = os.path.join(path, item)
-                if os.path.isdir(s): print(f"copying file: {d}"); shutil.copytree(s, d);
-                else: print(f"copying file: {d}"); shutil.copy2(s, d);
+        # mod files never change after install so they can be shared with the clone
+        child_cfg=read_child_cfg(path=Path(old_path)/"config.yaml", update=False)
+        link_dirs=[]
+        for key in ["SOURCE_DIR","STORE_DIR"]:
+            if key not in child_cfg: continue
+            rel=os.path.relpath(child_cfg[key], old_path)
+            if not rel.startswith(".."): link_dirs.append(rel)
 
+        def on_done(stats):
             child_cfg=read_child_cfg(path=Path(path)/"config.yaml") 
-            for i in ["SOURCE_DIR","PRESET_DIR","LOAD_ORDER","INI_DIR"]: child_cfg[i]=child_cfg[i].replace(old_path,path)
+            for i in ["SOURCE_DIR","STORE_DIR","PRESET_DIR","LOAD_ORDER","INI_DIR"]: child_cfg[i]=child_cfg[i].replace(old_path,path)
             write_cfg(child_cfg, path=Path(path)/"config.yaml")
             # update global config
             if "ICON" in cfg["INSTANCES"][old_name].keys(): icon=cfg["INSTANCES"][old_name]["ICON"]
@@ -1133,20 +1684,41 @@ class InstanceManager(QDialog):
             cfg["INSTANCES"][name]["PATH"]=path
             cfg["INSTANCES"][name]["SELECTED"]=False
             write_cfg(cfg, is_global=True)
-    
+            print(f"cloned {stats['files']} files ({format_size(stats['bytes'])}): "
+                  f"{stats['reflinked']} reflinked, {stats['linked']} hardlinked, "
+                  f"{stats['copied']} copied ({format_size(stats['copied_bytes'])})")
+            if stats["linked"]: print("note: hardlinked mod files are shared between both instances")
+            self.info.close()
             self._refresh_list() 
+
+        def on_failed(error):
+            self.info.close()
+            # the target was empty before, so whatever is there now is the partial clone
+            shutil.rmtree(path, ignore_errors=True)
+            if os.path.exists(path): print(f"warning: could not remove partial clone at {path}")
+            QMessageBox.critical(self, "Clone Error", f"Cloning the instance failed:\n{error}")
+
+        def on_progress(files, total_files, done_bytes, total_bytes):
+            self.info_label.setText(f"Cloning files {files}/{total_files} ({format_size(done_bytes)} / {format_size(total_bytes)})")
+            self.info_bar.setValue(int(100*done_bytes/total_bytes) if total_bytes else 100)
             
         self.info = QDialog(self)
         self.info.setWindowTitle("Processing")
         layout = QVBoxLayout(self.info)
-        layout.addWidget(QLabel("   Copying files (this may take a while)...   "))
+        self.info_label = QLabel("   Scanning instance files...   ")
+        self.info_bar = QProgressBar()
+        self.info_bar.setRange(0, 100)
+        layout.addWidget(self.info_label)
+        layout.addWidget(self.info_bar)
+        self.info.setMinimumWidth(420)
         self.info.setWindowModality(Qt.WindowModality.ApplicationModal)
         self.info.show()
 
         ensure_dir(path)
-        thread = QThread()
-        thread.run = lambda: copy_dirs()
-        thread.finished.connect(self.info.close)
+        thread = InstanceCloneThread(old_path, path, link_dirs)
+        thread.progress.connect(on_progress)
+        thread.done.connect(on_done)
+        thread.failed.connect(on_failed)
         thread.start()
         self.thread = thread  # keep reference
 
@@ -1414,14 +1986,14 @@ class InstanceEditor(QMainWindow):
                 if checkbox.isChecked(): 
                     if os.path.exists(path) and os.listdir(path)!=[]: QMessageBox.warning(self, 'Move Error',
                                   'Target path is non-empty (choose an empty directory)\nAlternatively, uncheck the move files box (creates a new instance)'); return
-                    for i in ["SOURCE_DIR","PRESET_DIR","LOAD_ORDER","INI_DIR"]: child_cfg[i]=child_cfg[i].replace(old_path,path)
+                    for i in ["SOURCE_DIR","STORE_DIR","PRESET_DIR","LOAD_ORDER","INI_DIR"]: child_cfg[i]=child_cfg[i].replace(old_path,path)
                     write_cfg(child_cfg, path=Path(old_path)/"config.yaml")
                     ensure_dir(path)
                     for item in os.listdir(old_path): shutil.move(os.path.join(old_path, item), os.path.join(path, item))
                     #shutil.move(old_path, path)
                 else: 
                     #if not os.path.exists(Path(path)/"config.yaml"):
-                    for i in ["SOURCE_DIR","PRESET_DIR","LOAD_ORDER","INI_DIR"]: child_cfg[i]=child_cfg[i].replace(old_path,path)
+                    for i in ["SOURCE_DIR","STORE_DIR","PRESET_DIR","LOAD_ORDER","INI_DIR"]: child_cfg[i]=child_cfg[i].replace(old_path,path)
                     write_cfg(child_cfg, path=Path(old_path)/"config.yaml")
                     ensure_dir(path); shutil.copy(Path(old_path)/"config.yaml",Path(path)/"config.yaml") # im too lazy to figure this one out
                 cfg["INSTANCES"][self.instance_name]["PATH"]=path
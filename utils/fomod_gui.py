@@ -1,6 +1,6 @@
 #!/usr/bin/python
 
-from pathlib import Path
+from collections import OrderedDict, deque
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QRadioButton, QCheckBox, QScrollArea, QWidget, QButtonGroup,
@@ -8,10 +8,57 @@ from PyQt6.QtWidgets import (
     QListWidget, QListWidgetItem, QStackedWidget, QGroupBox,
     QMessageBox
 )
-from PyQt6.QtCore import Qt, QSize, pyqtSignal
-from PyQt6.QtGui import QPixmap, QFont
+from PyQt6.QtCore import Qt, QSize, pyqtSignal, QThread, QMutex, QMutexLocker, QWaitCondition
+from PyQt6.QtGui import QPixmap, QFont, QImage
+
+try:    from utils.utils import build_path_index, resolve_path
+except: from utils import build_path_index, resolve_path
 
 DEBUG=False
+IMAGE_SIZE       = QSize(380, 280)
+IMAGE_CACHE_SIZE = 64 # scaled previews kept around while the dialog is open
+
+
+class ImageLoaderThread(QThread):
+    """Decodes and scales option images off the GUI thread. Hover requests jump the
+    queue and replace any older hover request, prefetches wait at the back."""
+    loaded = pyqtSignal(str, QImage)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mutex = QMutex()
+        self.condition = QWaitCondition()
+        self.hover = None
+        self.prefetch = deque()
+        self.running = True
+
+    def request(self, path, prefetch=False):
+        if not self.isRunning(): self.start() # started on first use, stopped when the dialog is done
+        with QMutexLocker(self.mutex):
+            if prefetch: self.prefetch.append(path)
+            else: self.hover = path # a newer hover makes the previous one stale
+            self.condition.wakeOne()
+
+    def stop(self):
+        if not self.isRunning(): return
+        with QMutexLocker(self.mutex):
+            self.running = False
+            self.prefetch.clear()
+            self.condition.wakeOne()
+        self.wait()
+
+    def run(self):
+        while True:
+            with QMutexLocker(self.mutex):
+                while self.running and self.hover is None and not self.prefetch: self.condition.wait(self.mutex)
+                if not self.running: return
+                if self.hover is not None: path, self.hover = self.hover, None
+                else: path = self.prefetch.popleft()
+            image = QImage(path)
+            if not image.isNull():
+                image = image.scaled(IMAGE_SIZE, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+            self.loaded.emit(path, image)
+
 
 class OptionListItem(QListWidgetItem):
     """Custom list item that stores plugin data"""
@@ -53,8 +100,15 @@ class FomodInstallerDialog(QDialog):
         self.mod_name = mod_name
         self.condition_flags = {}
         self.selected_files = []
+        self.selected_plugins = [] # (step, group, plugin) names, saved for replays
         self.user_cancelled = False
         self.extract_dir = None
+        self.path_index = None
+        self.image_cache = OrderedDict() # path -> scaled QPixmap, least recently used first
+        self.image_pending = set()
+        self.image_wanted = None
+        self.image_loader = ImageLoaderThread(self)
+        self.image_loader.loaded.connect(self._on_image_loaded)
         self.step_index=0
         
         # For dynamic step rebuilding
@@ -196,23 +250,46 @@ class FomodInstallerDialog(QDialog):
         description = plugin_data.get('description', '')
         self.detail_description.setText(description if description else "No description available.")
         
-        # Load image
-        image_path_str = plugin_data.get('image')
-        if image_path_str and self.extract_dir:
-            image_path = self._find_image_path(image_path_str, self.extract_dir)
-            if image_path and image_path.exists():
-                pixmap = QPixmap(str(image_path))
-                # Scale to fit
-                scaled = pixmap.scaled(
-                    380, 280,
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.detail_image.setPixmap(scaled)
-            else:
-                self.detail_image.clear()
+        # Load image (decoded in the background, shown once ready)
+        image_path = self._plugin_image(plugin_data)
+        self.image_wanted = image_path
+        if image_path is None: self.detail_image.clear()
+        elif image_path in self.image_cache:
+            self.image_cache.move_to_end(image_path)
+            self.detail_image.setPixmap(self.image_cache[image_path])
         else:
             self.detail_image.clear()
+            self.image_loader.request(image_path)
+    
+    def _plugin_image(self, plugin_data):
+        image_path_str = plugin_data.get('image')
+        if not image_path_str or not self.extract_dir: return None
+        image_path = self._find_image_path(image_path_str, self.extract_dir)
+        return str(image_path) if image_path else None
+    
+    def _on_image_loaded(self, path, image):
+        self.image_pending.discard(path)
+        pixmap = QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+        self.image_cache[path] = pixmap
+        self.image_cache.move_to_end(path)
+        while len(self.image_cache) > IMAGE_CACHE_SIZE: self.image_cache.popitem(last=False)
+        if path == self.image_wanted: # ignore results of hovers the user already moved on from
+            if pixmap.isNull(): self.detail_image.clear()
+            else: self.detail_image.setPixmap(pixmap)
+    
+    def _prefetch_images(self, step_index):
+        """Queue images of the shown step and the one after it"""
+        for step in self.steps_data[step_index:step_index+2]:
+            for group in step['groups']:
+                for plugin in group['plugins']:
+                    path = self._plugin_image(plugin)
+                    if path and path not in self.image_cache and path not in self.image_pending:
+                        self.image_pending.add(path)
+                        self.image_loader.request(path, prefetch=True)
+    
+    def done(self, result):
+        self.image_loader.stop()
+        super().done(result)
     
     def show_required_files(self, required_files):
         """Display required files that will be installed automatically"""
@@ -266,24 +343,21 @@ class FomodInstallerDialog(QDialog):
         if not self.fomod_data:
             return
         
-        ns = self.fomod_data.get('namespace', {})
-        
         # Clear current steps but preserve selections
         old_steps_data = self.steps_data.copy()
         self.steps_data = []
        
         for step in self.fomod_data['steps']:
             # Check step visibility
-            if step.get('visible_elem') is not None:
-                if not self._evaluate_visibility(step['visible_elem'], ns):
-                    continue
+            if not step['is_visible'](self.condition_flags):
+                continue
             
             # Filter visible groups and plugins
             visible_groups = []
             for group in step['groups']:
                 visible_plugins = []
                 for plugin in group['plugins']:
-                    if plugin.get('visible_elem') is None or self._evaluate_visibility(plugin['visible_elem'], ns):
+                    if plugin['is_visible'](self.condition_flags):
                         visible_plugins.append(plugin)
                 
                 if visible_plugins:
@@ -300,34 +374,6 @@ class FomodInstallerDialog(QDialog):
                     'extract_dir': self.extract_dir
                 })
     
-    def _evaluate_visibility(self, visible_elem, ns):
-        """Evaluate visibility conditions based on current flags."""
-        #if DEBUG: print("_evaluate_visibility")
-        if visible_elem is None: return True
-        
-        # Get dependencies element
-        deps_elem = visible_elem.find('.//dependencies', ns) if ns else visible_elem.find('.//dependencies')
-        if deps_elem is None: return True
-        
-        operator = deps_elem.get('operator', 'And')
-        
-        # Find all flag dependencies
-        flag_deps = deps_elem.findall('.//flagDependency', ns) if ns else deps_elem.findall('.//flagDependency')
-        if not flag_deps: return True
-        
-        results = []
-        for flag_dep in flag_deps:
-            flag_name = flag_dep.get('flag', '')
-            expected_value = flag_dep.get('value', 'On')
-            actual_value = self.condition_flags.get(flag_name, 'Off')
-            if DEBUG and actual_value=="Active": print(flag_name,'->',actual_value)
-            if expected_value=="": expected_value="Off"
-            results.append(actual_value == expected_value)
-        
-        if operator == 'And': return all(results)
-        elif operator == 'Or':return any(results)
-        else: return all(results)
-    
     def show_step(self, step_index):
         """Display a specific installation step"""
         if DEBUG: print("show_step")
@@ -353,6 +399,7 @@ class FomodInstallerDialog(QDialog):
             self._add_group_widget(group_data, step_index, group_idx)
         
         self.groups_layout.addStretch()
+        self._prefetch_images(step_index)
         
         # Update navigation
         self.back_button.setEnabled(step_index > 0)
@@ -484,28 +531,9 @@ class FomodInstallerDialog(QDialog):
     def _find_image_path(self, image_path, extract_dir):
         """Find image path case-insensitively"""
         if DEBUG: print("_find_image_path")
-        extract_path = Path(extract_dir)
-        image_parts = image_path.replace('\\', '/').split('/')
-        
-        current_path = extract_path
-        for part in image_parts:
-            if not current_path.is_dir():
-                return None
-            
-            found = False
-            try:
-                for item in current_path.iterdir():
-                    if item.name.lower() == part.lower():
-                        current_path = item
-                        found = True
-                        break
-            except (PermissionError, OSError):
-                return None
-            
-            if not found:
-                return None
-        
-        return current_path if current_path.is_file() else None
+        if self.path_index is None: self.path_index = build_path_index(extract_dir)
+        path = resolve_path(self.path_index, image_path)
+        return path if path is not None and path.is_file() else None
     
     def go_back(self):
         """Go to previous step"""
@@ -634,6 +662,7 @@ class FomodInstallerDialog(QDialog):
                         self.condition_flags[flag_name] = flag_value
                     
                     self.selected_files.extend(plugin.get('files', []))
+                    self.selected_plugins.append((step_data['name'], group_data['name'], plugin['name']))
     
     def cancel_installation(self):
         self.user_cancelled = True
@@ -644,7 +673,8 @@ class FomodInstallerDialog(QDialog):
         if DEBUG: print("get_results")
         return { 'cancelled': self.user_cancelled,
                  'condition_flags': self.condition_flags,
-                 'selected_files': self.selected_files }
+                 'selected_files': self.selected_files,
+                 'selected_plugins': self.selected_plugins }
 
 
 # Demo/test code
@@ -191,6 +191,19 @@ def write_plugins(compat_dir, backup_dir, plugins):
     force_symlink(compat_dir/pfile, backup_dir/pfile)
 
 
+def read_plugins(compat_dir, backup_dir, game):
+    # active plugins in the plugins file the game reads, None if there is none yet
+    pfile=Path(PLUGINS_FILE[game])
+    for path in (Path(compat_dir)/pfile, Path(backup_dir)/pfile):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f: lines=[l.strip() for l in f]
+        except OSError: continue
+        lines=[l for l in lines if l and not l.startswith("#")]
+        starred=any(l.startswith("*") for l in lines) # games that list inactive plugins without a star
+        return [l.lstrip("*") for l in lines if l.startswith("*") or not starred]
+    return None
+
+
 def switch_launcher(compat_dir, target_dir):
     game=determine_game(compat_dir)
     lbin=VANILLA_LAUNCHERS[game]
@@ -332,3 +345,9 @@ def get_game_bgs(cfg):
     return bg_paths
         
     
+
+
+def get_game_exe(compat_dir, target_dir):
+    game=determine_game(compat_dir)
+    if not isinstance(game, str) or not VANILLA_GAMES.get(game): return None
+    return Path(target_dir).parent/VANILLA_GAMES[game]
@@ -7,25 +7,27 @@ import platform
 import yaml
 import tempfile
 import random
+import multiprocessing
 from pathlib import Path
 from collections import OrderedDict
-from time import sleep
+from time import sleep, monotonic
 from copy import deepcopy
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QTreeWidget, QTreeWidgetItem, QTableWidget, QTableWidgetItem, 
+    QTreeWidget, QTreeWidgetItem, QTableView, 
     QPushButton, QSplitter, QLabel, QLineEdit, QMenu, QMessageBox, 
     QComboBox, QFileDialog, QInputDialog, QTextEdit, QToolButton, 
-    QSplashScreen, QToolTip, QStyledItemDelegate, QHeaderView
+    QSplashScreen, QToolTip, QStyledItemDelegate, QHeaderView, QTreeView,
+    QDialog, QProgressBar
 )
-from PyQt6.QtCore import ( Qt, QItemSelectionModel, QObject, QThread, 
+from PyQt6.QtCore import ( Qt, QObject, QThread, 
     QWaitCondition, pyqtSignal, QMutex, QMutexLocker, QTimer, QPoint, 
     QSize, QFile, QTextStream, QMetaObject, pyqtSlot, QItemSelection,
     QPointF, Qt, QCoreApplication
 )
 from PyQt6.QtGui import ( QIcon, QFont, QTextCursor, QCursor, QPixmap, 
-    QTextDocument, QPainter, QRadialGradient, QColor
+    QTextDocument, QPainter, QRadialGradient, QColor, QFileSystemModel
 )
 
 try:
@@ -42,8 +44,13 @@ os.environ["QT_QPA_PLATFORMTHEME"] = ""
 QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_DontUseNativeDialogs)
 SHOW_MSG_TIME    = 10000000
 DIALOGUE_WIDTH   = 60
+CONFLICT_DEBOUNCE_MS = 30
+EXPLORER_DEBOUNCE_MS = 150 # arrowing through the mod list only lists the mod it stops on
+SEARCH_DEBOUNCE_MS   = 150
 
 class ModLoaderUserInterface(QMainWindow):
+    load_order_changed=pyqtSignal(object,str,str,bool)
+
     def __init__(self):
         super().__init__()
         self.cfg = read_cfg(sync=False)
@@ -58,14 +65,23 @@ class ModLoaderUserInterface(QMainWindow):
         
         self._loading = True
         self._scale_factor = 1.0
-        self._separator_rows = {}
         self._is_sorted_alphabetically = False
         self._sort_ascending = True
+        self._sort_column = 2
         self.showing_fomod = False
         self._loading = False
         self._extracting = False
+        self._duplicate_choice = "copy"
         self.setAcceptDrops(True)
 
+        # one conflict thread for the window's lifetime, _init_ui runs again on preset, theme and scale changes
+        self.conflict_thread=ConflictThread(self)
+        self.conflict_thread.conflict_flags.connect(self.update_conflict_flags)
+        self.conflict_thread.conflict_data.connect(self.update_conflict_data)
+        self.conflict_thread.search_results.connect(self.on_search_results)
+        self.load_order_changed.connect(self.conflict_thread.request)
+        self.conflict_thread.start()
+
         # create ui and load data
         self._init_ui()
         self._setup_stdout_redirect()
@@ -85,8 +101,11 @@ class ModLoaderUserInterface(QMainWindow):
         # thread containers
         self.extract_threads=[]
         self.extract_status_threads=[]
+        self.install_context=None # FOMOD dependency index shared by one batch of installs
         self.link_status_threads=None
         self.exe_status_thread=None
+        self.deploy_thread=None
+        self.deploy_dialog=None
 
         QShortcut(QKeySequence("Escape"), self).activated.connect(self.close)
         QShortcut(QKeySequence("Ctrl+S"), self).activated.connect(self.auto_save_load_order)
@@ -182,11 +201,20 @@ class ModLoaderUserInterface(QMainWindow):
         self.explorer_label.setWordWrap(True)
         layout.addWidget(self.explorer_label)
         
-        self.file_explorer = QTreeWidget()
-        self.file_explorer.setHeaderLabel("Mod Files")
+        # directories are listed off the gui thread, and only once expanded
+        self.explorer_model = QFileSystemModel(self)
+        self.explorer_model.setFilter(QDir.Filter.AllEntries | QDir.Filter.NoDotAndDotDot | QDir.Filter.Hidden)
+        self.file_explorer = QTreeView()
         self.file_explorer.setHeaderHidden(True)
-        self.file_explorer.itemDoubleClicked.connect(self.on_file_explorer_double_click)
+        self.file_explorer.doubleClicked.connect(self.on_file_explorer_double_click)
+        self.file_explorer.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.file_explorer.customContextMenuRequested.connect(self.show_file_context_menu)
         layout.addWidget(self.file_explorer)
+        self.explorer_path = None
+        self.explorer_timer = QTimer(self)
+        self.explorer_timer.setSingleShot(True)
+        self.explorer_timer.setInterval(EXPLORER_DEBOUNCE_MS)
+        self.explorer_timer.timeout.connect(lambda: self.populate_file_explorer(self.explorer_path))
         
         return widget
 
@@ -332,29 +360,29 @@ class ModLoaderUserInterface(QMainWindow):
         table_layout.setContentsMargins(0, 0, 0, 0)
         table_layout.setSpacing(0)
 
-        self.mod_table = ModTable(self, 0, 4)
+        self.mod_table = ModTable(self)
         table_layout.addWidget(self.mod_table)
 
         #self.mod_table.setItemDelegateForColumn(2, RichTextDelegate(self))
         self.mod_table.setItemDelegateForColumn(2, RichTextDelegate(self))
-        self.mod_table.setItemDelegateForColumn(3, RichTextDelegate(self))
-        self.mod_table.setHorizontalHeaderLabels(["#", "", "Mod Name", "Conflicts" ])
-        self.mod_table.horizontalHeaderItem(0).setToolTip("Click to sort by priority")
-        self.mod_table.horizontalHeaderItem(2).setToolTip("Click to sort by name")
-        self.mod_table.horizontalHeaderItem(3).setToolTip("Overwritten and overriding mods")
+        self.mod_table.setItemDelegateForColumn(3, ConflictDelegate(self))
 
         self.mod_table.verticalHeader().setVisible(False)
-        self.mod_table.itemSelectionChanged.connect(self.on_mod_selected)
-        self.mod_table.selectionModel().selectionChanged.connect(self.on_item_deselect)
-        self.mod_table.itemChanged.connect(self.on_item_changed)
-        self.mod_table.cellClicked.connect(self.on_cell_clicked)
-        self.mod_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.mod_table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
+        # deferred, highlighting repaints rows and must not run inside the proxy's own filter update
+        self.selection_timer=QTimer(self)
+        self.selection_timer.setSingleShot(True)
+        self.selection_timer.setInterval(0)
+        self.selection_timer.timeout.connect(self.on_mod_selected)
+        self.selection_timer.timeout.connect(self.on_item_deselect)
+        self.mod_table.selectionModel().selectionChanged.connect(lambda *args: self.selection_timer.start())
+        self.mod_table.clicked.connect(lambda index: self.on_cell_clicked(self.mod_table.source_row(index), index.column()))
+        self.mod_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.mod_table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
         self.mod_table.setDragEnabled(True)
         self.mod_table.setAcceptDrops(True)
         self.mod_table.setDragDropOverwriteMode(False)
         self.mod_table.setDropIndicatorShown(True)
-        self.mod_table.setDragDropMode(QTableWidget.DragDropMode.InternalMove)
+        self.mod_table.setDragDropMode(QTableView.DragDropMode.InternalMove)
         self.mod_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.mod_table.customContextMenuRequested.connect(self.show_context_menu)
         self.mod_table.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
@@ -368,10 +396,17 @@ class ModLoaderUserInterface(QMainWindow):
         self.mod_table.overriders=dict()
         self.mod_table.overriddens=dict()
         self.mod_table.overriddens_full=dict()
-        self.mod_table.mod_files=dict()
-        self.conflict_thread=ConflictThread(self)
-        self.conflict_thread.conflict_update.connect(self.update_conflict_flag)
-        self.conflict_thread.start()
+        # any row or checkbox change restarts the timer, one snapshot per burst
+        self.conflict_timer=QTimer(self)
+        self.conflict_timer.setSingleShot(True)
+        self.conflict_timer.setInterval(CONFLICT_DEBOUNCE_MS)
+        self.conflict_timer.timeout.connect(self.emit_load_order_changed)
+        model=self.mod_table.table_model
+        model.rowsInserted.connect(lambda *args: self.conflict_timer.start())
+        model.rowsRemoved.connect(lambda *args: self.conflict_timer.start())
+        model.layoutChanged.connect(lambda *args: self.conflict_timer.start())
+        model.modelReset.connect(lambda *args: self.conflict_timer.start())
+        model.dataChanged.connect(self.on_table_data_changed)
 
         header = self.mod_table.horizontalHeader()
         header.setMinimumSectionSize(15)
@@ -382,6 +417,7 @@ class ModLoaderUserInterface(QMainWindow):
         self.mod_table.setColumnWidth(1, 25)
         self.mod_table.setColumnWidth(2, 530)
         self.mod_table.setColumnWidth(3, 80)
+        self.mod_table.setColumnWidth(4, 80)
 
         #return self.mod_table
         return container
@@ -390,7 +426,11 @@ class ModLoaderUserInterface(QMainWindow):
         self.search_box = QLineEdit()
         self.search_box.setPlaceholderText("Filter")
         self.search_box.textChanged.connect(self.filter_mods)
-        self.search_box.setToolTip("Filter items")
+        self.search_box.setToolTip(f"Filter items by name, or by staged file path from {SEARCH_MIN_CHARS} characters on")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
         return self.search_box
 
     def _create_button_layout(self):
@@ -445,16 +485,8 @@ class ModLoaderUserInterface(QMainWindow):
         return button_layout
 
     def _load_initial_data(self, reload=False):
-        mods = load_list()
-        for mod in mods:
-            if mod.startswith('>#') or mod.startswith('v#') or mod.startswith('#'):
-                self.add_separator(mod)
-            elif mod.startswith('*') or mod.startswith('~'):
-                self.add_mod(mod.lstrip("*~"), False)
-            else:
-                self.add_mod(mod, True)
-
-        self.reset_all_separator_state()
+        self.mod_table.table_model.load(load_list())
+        self.conflict_thread.reset()
         
         self.update_status()
         self.update_unload_button_state()
@@ -521,26 +553,22 @@ class ModLoaderUserInterface(QMainWindow):
             self.unload_button.setEnabled(False)
 
     def on_mod_selected(self):
-        selected_items = self.mod_table.selectedItems()
-        if not selected_items:
-            self.file_explorer.clear()
+        selected_rows = self.mod_table.selected_rows()
+        if not selected_rows:
+            self.clear_file_explorer()
             self.explorer_label.setText("Select a mod to view files")
             self.move_up_button.setEnabled(False)
             self.move_down_button.setEnabled(False)
             return
         
-        selected_rows = sorted(set(item.row() for item in selected_items))
         has_separator = any(self.is_separator_row(row) for row in selected_rows)
         row = selected_rows[0]
         
         if self.is_separator_row(row):
-            self.file_explorer.clear()
+            self.clear_file_explorer()
             self.explorer_label.setText("Select a mod to view files")
         
-        name_item = self.mod_table.item(row, 2)
-        if not name_item: return
-            
-        mod_name = name_item.text()
+        mod_name = self.mod_table.get_name(row)
         
         if self._is_sorted_alphabetically or has_separator:
             self.move_up_button.setEnabled(False)
@@ -551,10 +579,11 @@ class ModLoaderUserInterface(QMainWindow):
         
         if len(selected_rows) > 1:
             self.explorer_label.setText(f"{len(selected_rows)} mods selected")
-            self.file_explorer.clear()
+            self.clear_file_explorer()
         elif not self.is_separator_row(row):
             self.explorer_label.setText(mod_name)
-            self.populate_file_explorer(Path(self.cfg["SOURCE_DIR"]) / Path(mod_name))
+            self.explorer_path = Path(self.cfg["SOURCE_DIR"]) / Path(mod_name)
+            self.explorer_timer.start()
 
         try: self.highlight_conflicts(selected_rows)
         except: 
@@ -563,16 +592,15 @@ class ModLoaderUserInterface(QMainWindow):
 
     def highlight_conflicts(self, rows):
         if self._loading: QTimer.singleShot(1000,lambda: self.highlight_conflicts(rows)); return
-        self.mod_table.blockSignals(True)
-        for row in range(self.mod_table.rowCount()):
-            self.mod_table.highlight_row(row,None)
+        overriding=[]
+        overridden=[]
         for row in rows:
             if self.is_separator_row(row):
                 sep_rows=self.get_separator_children_rows(row)
                 er_rows=[]
                 en_rows=[]
                 for i in sep_rows:
-                    name=self.mod_table.item(i,2).text()
+                    name=self.mod_table.get_name(i)
                     try:    overriders=self.mod_table.overriders[name]
                     except: overriders=[]
                     try:    overriddens=self.mod_table.overriddens[name]
@@ -580,7 +608,7 @@ class ModLoaderUserInterface(QMainWindow):
                     er_rows+=[self.mod_table.get_row_from_name(name) for name in overriders]
                     en_rows+=[self.mod_table.get_row_from_name(name) for name in overriddens]
             else:
-                try: name=self.mod_table.item(row,2).text()
+                try: name=self.mod_table.get_name(row)
                 except: continue
                 try:    overriders=self.mod_table.overriders[name]
                 except: overriders=[]
@@ -589,100 +617,66 @@ class ModLoaderUserInterface(QMainWindow):
                 er_rows=[self.mod_table.get_row_from_name(name) for name in overriders]
                 en_rows=[self.mod_table.get_row_from_name(name) for name in overriddens]
             for i in er_rows: 
-                if self.mod_table.isRowHidden(i):
-                    sep_row=self.mod_table.get_item_separator_row(i)
-                    self.mod_table.highlight_row(sep_row,overriding=True)
-                else: self.mod_table.highlight_row(i,overriding=True)
+                if i is None: continue
+                if self.mod_table.is_row_hidden(i): overriding.append(self.mod_table.get_item_separator_row(i))
+                else: overriding.append(i)
             for i in en_rows: 
-                if self.mod_table.isRowHidden(i):
-                    sep_row=self.mod_table.get_item_separator_row(i)
-                    self.mod_table.highlight_row(sep_row,overridden=True)
-                else: self.mod_table.highlight_row(i,overridden=True)
-        self.mod_table.blockSignals(False)
+                if i is None: continue
+                if self.mod_table.is_row_hidden(i): overridden.append(self.mod_table.get_item_separator_row(i))
+                else: overridden.append(i)
+        # all rows in one repaint, overridden wins where both apply
+        self.mod_table.highlight_rows([i for i in overriding if i is not None], [i for i in overridden if i is not None])
         
+    def clear_file_explorer(self):
+        self.explorer_timer.stop()
+        self.explorer_path = None
+        self.file_explorer.setModel(None)
+
     def populate_file_explorer(self, path):
-        self.file_explorer.clear()
-        if not path.exists() or not path.is_dir(): return
-        self.add_directory_to_tree(path, self.file_explorer.invisibleRootItem())
-        self.file_explorer.expandAll()
-        self.file_explorer.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.file_explorer.customContextMenuRequested.connect(self.show_file_context_menu)
+        if path is None or not path.exists() or not path.is_dir(): self.clear_file_explorer(); return
+        # only the mod's top level is listed now, subdirectories when they are expanded
+        root = self.explorer_model.setRootPath(str(path))
+        self.explorer_model.sort(0, Qt.SortOrder.AscendingOrder)
+        if self.file_explorer.model() is None:
+            self.file_explorer.setModel(self.explorer_model)
+            for i in range(1, self.explorer_model.columnCount()): self.file_explorer.hideColumn(i)
+        self.file_explorer.setRootIndex(root)
+        self.file_explorer.collapseAll()
     
     def show_file_context_menu(self, pos):
-        item = self.file_explorer.itemAt(pos)
-        if item is None: return
+        index = self.file_explorer.indexAt(pos)
+        if not index.isValid(): return
         menu = QMenu()
         open_action = menu.addAction("Open")
         action = menu.exec(QCursor.pos())
         if action == open_action:
-            print(f"Opening {item.text(0).strip()}...")
-            self.on_file_explorer_double_click(item,0)
+            print(f"Opening {index.data().strip()}...")
+            self.on_file_explorer_double_click(index)
     
-    def add_directory_to_tree(self, directory, parent_item):
-        try:
-            items = sorted(directory.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
-            for item in items:
-                item_widget = QTreeWidgetItem(parent_item, [item.name])
-                if item.is_dir():
-                    self.add_directory_to_tree(item, item_widget)
-        except PermissionError:
-            QTreeWidgetItem(parent_item, ["[Permission Denied]"])
-        
     def add_mod(self, name, enabled, is_separator=False):
-        row = self.mod_table.rowCount()
-        self.mod_table.insertRow(row)
-       
-        if is_separator:
-            self.mod_table._create_separator_items(row, name)
-            self._separator_rows[row] = False
-        else:
-            priority = sum(1 for r in range(row) if not self.is_separator_row(r)) + 1
-            self.mod_table._create_mod_items(row, name, Qt.CheckState.Checked if enabled else Qt.CheckState.Unchecked)
-            self.mod_table.item(row, 0).setText(str(priority))
+        if not is_separator and not enabled: name="~"+name
+        self.mod_table.table_model.insert_entries(self.mod_table.rowCount(), [name])
             
     def add_separator(self, name="v#New Separator"):
         self.add_mod(name, False, is_separator=True)
 
     def is_separator_row(self, row):
-        name_item = self.mod_table.item(row, 2)
-        return name_item and name_item.data(Qt.ItemDataRole.UserRole) == "separator"
+        return self.mod_table.is_separator_row(row)
 
     def get_separator_name(self, row):
-        name_item = self.mod_table.item(row, 2)
-        return name_item.data(Qt.ItemDataRole.UserRole + 1) if name_item else ""
+        return self.mod_table.table_model.names[row] if self.is_separator_row(row) else ""
 
     def get_separator_from_mod(self,mod_row):
-        sep_row=-1
-        for r in range(mod_row,-1,-1):
-            if not self.is_separator_row(r): continue
-            sep_row=r
-            break
-        return sep_row
+        if self.is_separator_row(mod_row): return mod_row
+        return self.mod_table.table_model.owners[mod_row]
 
     def toggle_separator_collapse(self, row):
         if not self.is_separator_row(row): return
-        
-        next_separator = self.mod_table.rowCount()
-        for r in range(row + 1, self.mod_table.rowCount()):
-            if self.is_separator_row(r):
-                next_separator = r
-                break
-        
-        priority_item = self.mod_table.item(row, 0)
-        is_collapsed = priority_item.text() == "▶"
-        
-        priority_item.setText("▼" if is_collapsed else "▶")
-        for r in range(row + 1, next_separator):
-            self.mod_table.setRowHidden(r, not is_collapsed)
-
-    def reset_all_separator_state(self):
-        mods = load_list()
-        for r in range(self.mod_table.rowCount()):
-            if not self.is_separator_row(r): continue
-            # toggle twice to hide mods
-            self.toggle_separator_collapse(r);self.toggle_separator_collapse(r)
+        # children are hidden by the table's filter, not row by row
+        self.mod_table.table_model.set_collapsed(row, not self.mod_table.is_separator_collapsed(row))
 
     def load_mods(self):
+        if self.deploy_thread is not None: return
         try:
             self.link_status_thread=LinkingStatusThread(self.status_label, load=True)
             self.link_status_thread.start()
@@ -695,6 +689,7 @@ class ModLoaderUserInterface(QMainWindow):
             QMessageBox.warning(self, "Load Error", f"Failed to load mods:\n{str(e)}")
 
     def unload_mods(self):
+        if self.deploy_thread is not None: return
         try:
             self.link_status_thread=LinkingStatusThread(self.status_label, load=False)
             self.link_status_thread.start()
@@ -707,9 +702,9 @@ class ModLoaderUserInterface(QMainWindow):
             QMessageBox.warning(self, "Unload Error", f"Failed to unload mods:\n{str(e)}")
 
     def _set_all_mods_state(self, state):
-        for row in range(self.mod_table.rowCount()):
-            if not self.is_separator_row(row):
-                self.mod_table.item(row, 1).setCheckState(state)
+        self._loading = True
+        self.mod_table.table_model.set_enabled(range(self.mod_table.rowCount()), state == Qt.CheckState.Checked)
+        self._loading = False
         self.update_status()
         self.auto_save_load_order()
 
@@ -730,66 +725,49 @@ class ModLoaderUserInterface(QMainWindow):
             self._set_all_mods_state(Qt.CheckState.Unchecked)
 
     def _reselect_rows(self, rows):
-        self.mod_table.clearSelection()
-        selection_model = self.mod_table.selectionModel()
+        # moved rows stay in view, open the separator they landed under
         for row in rows:
-            for col in range(self.mod_table.columnCount()):
-                idx = self.mod_table.model().index(row, col)
-                selection_model.select(idx, QItemSelectionModel.SelectionFlag.Select)
+            if self.mod_table.is_row_hidden(row): self._expand_selected_separators(mod=row)
+        self.mod_table.select_rows(rows)
 
     def move_mod_up(self):
-        selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()))
+        selected_rows = self.mod_table.selected_rows()
         if not selected_rows or min(selected_rows) <= 0:
             return
-        for row in selected_rows:
-            self.move_row(row, row - 1)
+        self.move_rows([(row, row - 1) for row in selected_rows])
         self._reselect_rows([row - 1 for row in selected_rows])
-        self.update_priority_numbers()
         self.auto_save_load_order()
 
     def move_mod_down(self):
-        selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()))
+        selected_rows = self.mod_table.selected_rows()
         if not selected_rows or max(selected_rows) >= self.mod_table.rowCount() - 1:
             return
-        for row in reversed(selected_rows):
-            self.move_row(row, row + 1)
+        self.move_rows([(row, row + 1) for row in reversed(selected_rows)])
         self._reselect_rows([row + 1 for row in selected_rows])
-        self.update_priority_numbers()
         self.auto_save_load_order()
 
     def move_mod_top(self):
-        selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()))
+        selected_rows = self.mod_table.selected_rows()
         if not selected_rows or min(selected_rows) <= 0:
             return
-        nrow=0
-        nsrows=[]
-        for row in selected_rows:
-            self.move_row(row, nrow)
-            nrow+=1
-            nsrows.append(nrow-1)
-        self._reselect_rows(nsrows)
-        self.update_priority_numbers()
+        self.move_rows([(row, nrow) for nrow,row in enumerate(selected_rows)])
+        self._reselect_rows(range(len(selected_rows)))
         self.auto_save_load_order()
     
     def move_mod_bot(self):
-        selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()))
+        selected_rows = self.mod_table.selected_rows()
         if not selected_rows or max(selected_rows) >= self.mod_table.rowCount() - 1:
             return
         nr=self.mod_table.rowCount()-1
-        sr=[]
-        for row in reversed(selected_rows):
-            self.move_row(row, nr)
-            sr.append(nr)
-            nr-=1
-        self._reselect_rows(sr)
-        self.update_priority_numbers()
+        self.move_rows([(row, nr-i) for i,row in enumerate(reversed(selected_rows))])
+        self._reselect_rows(range(nr-len(selected_rows)+1, nr+1))
         self.auto_save_load_order()
 
     def move_mod_priority(self):
-        selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()))
+        selected_rows = self.mod_table.selected_rows()
         if not selected_rows: return
         if any(self.mod_table.is_separator_row(i) for i in selected_rows): print("error: cannot change separator priority"); return
-        top_row=int(self.mod_table.item(min(selected_rows),0).text())
+        top_row=self.mod_table.table_model.priorities[min(selected_rows)]
         last_row=max(self.mod_table.get_priorities())
         val, ok = QInputDialog.getInt(
             self, "Set Priority", "Priority #:"+' '*DIALOGUE_WIDTH,
@@ -797,115 +775,83 @@ class ModLoaderUserInterface(QMainWindow):
         if (not ok) or (not val): return
         val=self.mod_table.get_row_from_priority(val) 
 
+        moves=[]
         new_selected_rows=[]
         if val<min(selected_rows):
             for row in selected_rows:
-                self.move_row(row,val)
+                moves.append((row,val))
                 new_selected_rows.append(val)
                 val+=1
         else:
             for row in reversed(selected_rows):
-                self.move_row(row,val)
+                moves.append((row,val))
                 new_selected_rows.append(val)
                 val-=1
+        self.move_rows(moves)
         self._reselect_rows(new_selected_rows)
-        self.update_priority_numbers()
         self.auto_save_load_order()
 
     def move_mod_separator(self,separator):
-        selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()))
+        selected_rows = self.mod_table.selected_rows()
         if not selected_rows: return
         if any(self.mod_table.is_separator_row(i) for i in selected_rows): print("error: cannot move separator to separator"); return
         sep_row=self.mod_table.get_row_from_name(separator)
         # this is fucking stupid 
+        moves=[]
         new_selected_rows=[]
         children=self.mod_table.get_separator_children(sep_row)
         if sep_row<min(selected_rows):
-            if children: to_row=min(max(self.mod_table.get_separator_children(sep_row))+1,self.mod_table.rowCount()-1)
+            if children: to_row=min(max(children)+1,self.mod_table.rowCount()-1)
             else: to_row=min(sep_row+1,self.mod_table.rowCount()-1)
             for row in selected_rows:
-                self.move_row(row,to_row)
+                moves.append((row,to_row))
                 new_selected_rows.append(to_row)
                 to_row+=1
         else:
-            if children: to_row=min(max(self.mod_table.get_separator_children(sep_row)),self.mod_table.rowCount()-1)
+            if children: to_row=min(max(children),self.mod_table.rowCount()-1)
             else: to_row=min(sep_row,self.mod_table.rowCount()-1)
             for row in reversed(selected_rows):
-                self.move_row(row,to_row)
+                moves.append((row,to_row))
                 new_selected_rows.append(to_row)
                 to_row-=1
+        self.move_rows(moves)
         self._reselect_rows(new_selected_rows)
-        self.update_priority_numbers()
         self.auto_save_load_order()
 
     def get_separator_children_rows(self, separator_row):
-        children = []
-        for r in range(separator_row + 1, self.mod_table.rowCount()):
-            if self.is_separator_row(r):
-                break
-            children.append(r)
-        return children
-
-    def move_row(self, from_row, to_row, mod_name=""):
-        is_sep = self.is_separator_row(from_row)
-        if is_sep:
-            separator_name = self.get_separator_name(from_row)
-            collapse_state = self.mod_table.item(from_row, 0).text()
-            self.mod_table.removeRow(from_row)
-            self.mod_table.insertRow(to_row)
-            self.mod_table._create_separator_items(to_row, separator_name)
-        else:
-            checkbox_state = self.mod_table.item(from_row, 1).checkState()
-            if not mod_name: mod_name = self.mod_table.item(from_row, 2).text()
-            conflicts = self.mod_table.item(from_row, 3).text()
-            self.mod_table.removeRow(from_row)
-            self.mod_table.insertRow(to_row)
-            self.mod_table._create_mod_items(to_row, mod_name, checkbox_state, conflicts)
-        
-        self.update_priority_numbers()
+        return self.mod_table.get_separator_children(separator_row)
+
+    def move_rows(self, moves):
+        self.mod_table.move_rows(moves)
+
+    def move_row(self, from_row, to_row):
+        self.move_rows([(from_row, to_row)])
 
     def _collect_load_order(self):
-        """Collect current load order from table, handling sorted state"""
-        if self._is_sorted_alphabetically:
-            original_mods = load_list()
-            enabled_lookup = {
-                self.mod_table.item(row, 2).text(): 
-                self.mod_table.item(row, 1).checkState() == Qt.CheckState.Checked
-                for row in range(self.mod_table.rowCount())
-                if not self.is_separator_row(row)
-            }
-            mods = []
-            for mod in original_mods:
-                if mod.startswith('#') or mod.startswith('>#') or mod.startswith('v#'):
-                    mods.append(mod)
-                else:
-                    clean_name = mod.lstrip('*~')
-                    if clean_name in enabled_lookup:
-                        mods.append(clean_name if enabled_lookup[clean_name] else '~' + clean_name)
-                    else:
-                        mods.append(mod)
-        else:
-            mods = []
-            for row in range(self.mod_table.rowCount()):
-                if self.is_separator_row(row):
-                    collapse_state = self.mod_table.item(row, 0).text()
-                    if collapse_state=="▶": prefix=">#"
-                    else: prefix="v#"
-                    mods.append(prefix+self.get_separator_name(row).lstrip(">v#"))
-                else:
-                    if not self.mod_table.item(row,2): continue
-                    mod_name = self.mod_table.item(row, 2).text()
-                    is_enabled = self.mod_table.item(row, 1).checkState() == Qt.CheckState.Checked
-                    mods.append(mod_name if is_enabled else '~' + mod_name)
-        return mods
-
-    @pyqtSlot(int,str,str)
-    def update_conflict_flag(self,row,over_text,tooltip_text):
-        try:
-            conflict_item=self.mod_table.item(row,3)
-            conflict_item.setText(over_text)
-            conflict_item.setToolTip(tooltip_text)
-        except: pass
+        """Collect current load order from table, sorting only changes the view"""
+        return self.mod_table.table_model.load_order()
+
+    def on_table_data_changed(self, top_left, bottom_right, roles=[]):
+        if top_left.column()>=3 or roles==[SEARCH_ROLE]: return # conflict and search updates are ours
+        self.conflict_timer.start()
+        if Qt.ItemDataRole.CheckStateRole in roles: self.on_item_changed()
+
+    def emit_load_order_changed(self):
+        if self._loading or self._extracting: self.conflict_timer.start(); return
+        from bdsm import BACKUP_DIR
+        self.load_order_changed.emit(self._collect_load_order(), self.cfg["SOURCE_DIR"], str(BACKUP_DIR/"conflict_cache"), bool(self.cfg["CONTENT_CONFLICTS"]))
+
+    @pyqtSlot(object)
+    def update_conflict_data(self, data):
+        er,en,fu,idn=data
+        self.mod_table.overriders=er
+        self.mod_table.overriddens=en
+        self.mod_table.overriddens_full=fu
+        self.mod_table.table_model.set_conflict_tables(er,en,fu,idn)
+
+    @pyqtSlot(object)
+    def update_conflict_flags(self, batch):
+        self.mod_table.table_model.set_conflicts(batch)
 
     def auto_save_load_order(self,instant=False):
         global RELOAD_ON_INSTALL
@@ -932,14 +878,12 @@ class ModLoaderUserInterface(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Save Error", f"Failed to save load order:\n{str(e)}")
 
-    def on_item_changed(self, item):
-        if item and item.column() == 1:
-            self.update_status()
-            self.auto_save_load_order()
+    def on_item_changed(self):
+        self.update_status()
+        self.auto_save_load_order()
 
-    def on_item_deselect(self, item):
-        selected_items = self.mod_table.selectedItems()
-        if not selected_items: self.highlight_conflicts([])
+    def on_item_deselect(self, *args):
+        if not self.mod_table.selectionModel().hasSelection(): self.highlight_conflicts([])
 
     def on_cell_clicked(self, row, column):
         if column == 0 and self.is_separator_row(row):
@@ -949,53 +893,53 @@ class ModLoaderUserInterface(QMainWindow):
         if column != 1 or self.is_separator_row(row):
             return
         
-        selected_rows = set(item.row() for item in self.mod_table.selectedItems())
+        selected_rows = self.mod_table.selected_rows()
         
         if len(selected_rows) > 1 and row in selected_rows:
-            new_state = self.mod_table.item(row, 1).checkState()
             self._loading = True
-            for selected_row in selected_rows:
-                if selected_row != row and not self.is_separator_row(selected_row):
-                    self.mod_table.item(selected_row, 1).setCheckState(new_state)
+            self.mod_table.table_model.set_enabled(selected_rows, self.mod_table.table_model.is_enabled(row))
             self._loading = False
             self.update_status()
             self.auto_save_load_order()
 
     def update_status(self):
-        total = sum(1 for row in range(self.mod_table.rowCount()) if not self.is_separator_row(row))
-        enabled = sum(1 for row in range(self.mod_table.rowCount()) 
-                     if not self.is_separator_row(row) and 
-                     self.mod_table.item(row, 1).checkState() == Qt.CheckState.Checked)
+        flags = self.mod_table.table_model.row_flags
+        total = sum(1 for flag in flags if not flag & ROW_SEPARATOR)
+        enabled = sum(1 for flag in flags if flag & ROW_ENABLED)
         self.statusBar().showMessage(f"Mods: {enabled}/{total} enabled", SHOW_MSG_TIME)
 
     def filter_mods(self, text):
-        for row in range(self.mod_table.rowCount()):
-            mod_name = self.mod_table.item(row, 2).text()
-            self.mod_table.setRowHidden(row, text.lower() not in mod_name.lower())
         if text=="": 
             # expand seps if items selected under them
-            for item in self.mod_table.selectedItems():
-                self._expand_selected_separators(mod=item.row())
-            # set sep state
-            self.reset_all_separator_state()
-    
-    def update_priority_numbers(self):
-        priority = 1
-        mods=[]
-        for row in range(self.mod_table.rowCount()):
-            if self.is_separator_row(row): continue
-            priority_item = self.mod_table.item(row, 0)
-            if priority_item:
-                priority_item.setText(str(priority))
-                priority += 1
-            mods.append(priority_item.text())
+            for row in self.mod_table.selected_rows():
+                self._expand_selected_separators(mod=row)
+            self.search_timer.stop()
+            self.mod_table.table_model.set_search_hits({})
+            self.mod_table.proxy.set_filter_text(text)
+        else: self.search_timer.start()
+
+    def run_search(self):
+        text = self.search_box.text()
+        query = text.lower()
+        # earlier file matches that still match stay up until the worker answers
+        hits = {mod:path for mod,path in self.mod_table.table_model.search_hits.items() if query in path.lower()}
+        self.mod_table.table_model.set_search_hits(hits)
+        self.mod_table.proxy.set_filter_text(text)
+        if len(text)>=SEARCH_MIN_CHARS: self.conflict_thread.search(text)
+
+    @pyqtSlot(str,object)
+    def on_search_results(self, query, hits):
+        if query!=self.search_box.text(): return # typed on since
+        self.mod_table.table_model.set_search_hits(hits)
+        self.mod_table.proxy.invalidateFilter()
 
     def on_header_clicked(self, logical_index):
         if logical_index == 0:
             if self._is_sorted_alphabetically:
                 self.restore_priority_order()
-        elif logical_index == 2:
-            self._sort_ascending = not self._sort_ascending if self._is_sorted_alphabetically else True
+        elif logical_index in (2, 4):
+            self._sort_ascending = not self._sort_ascending if self._is_sorted_alphabetically and self._sort_column==logical_index else True
+            self._sort_column = logical_index
             self.sort_alphabetically()
 
     def sort_alphabetically(self):
@@ -1005,54 +949,33 @@ class ModLoaderUserInterface(QMainWindow):
         self.move_up_button.setEnabled(False)
         self.move_down_button.setEnabled(False)
         
-        mods_data = []
-        for row in range(self.mod_table.rowCount()): 
-            mods_data.append(list(self.mod_table.collect_row_data(row).values()))
-                
-        mods_data.sort(key=lambda x: x[2].lower(), reverse=not self._sort_ascending)
-    
-        self.mod_table.setRowCount(0)
-        for priority_num, is_sep, name, checkbox_state, hidden, conflicts, tooltip in mods_data:
-            row = self.mod_table.rowCount()
-            self.mod_table.insertRow(row)
-            
-            if is_sep:
-                self.mod_table._create_separator_items(row, name)
-            else:
-                self.mod_table._create_mod_items(row, name, checkbox_state, conflicts, tooltip)
-                self.mod_table.item(row, 0).setText(priority_num)
+        # the proxy sorts the view, the load order underneath keeps its priorities
+        order = Qt.SortOrder.AscendingOrder if self._sort_ascending else Qt.SortOrder.DescendingOrder
+        self.mod_table.proxy.sort(self._sort_column, order)
+        self.mod_table.proxy.invalidateFilter()
         
         arrow = "↑" if self._sort_ascending else "↓"
-        self.mod_table.setHorizontalHeaderLabels(["#", "", f"Mod Name {arrow}"])
+        labels = list(MOD_TABLE_HEADERS)
+        labels[self._sort_column] += f" {arrow}"
+        self.mod_table.table_model.set_headers(labels)
         direction = "ascending" if self._sort_ascending else "descending"
-        self.statusBar().showMessage(f"Sorted alphabetically {direction} (reordering disabled)", SHOW_MSG_TIME)
+        order = "by deployed files" if self._sort_column == 4 else "alphabetically"
+        self.statusBar().showMessage(f"Sorted {order} {direction} (reordering disabled)", SHOW_MSG_TIME)
 
     def restore_priority_order(self):
         self._is_sorted_alphabetically = False
         self.mod_table.setDragEnabled(True)
         self.mod_table.setAcceptDrops(True)
-        self.mod_table.setRowCount(0)
-        self._separator_rows = {}
-        
-        self._loading = True
-        mods = load_list()
-        for mod in mods:
-            if mod.startswith('>#') or mod.startswith('v#') or mod.startswith('#'):
-                self.add_separator(mod)
-            elif mod.startswith('*') or mod.startswith('~'):
-                self.add_mod(mod.lstrip("*~"), False)
-            else:
-                self.add_mod(mod, True)
-        self._loading = False
+        self.mod_table.proxy.sort(-1)
+        self.mod_table.proxy.invalidateFilter()
         
-        self.mod_table.setHorizontalHeaderLabels(["#", "", "Mod Name"])
+        self.mod_table.table_model.set_headers(MOD_TABLE_HEADERS)
         self.statusBar().showMessage("Restored priority order (reordering enabled)", SHOW_MSG_TIME)
-        self.reset_all_separator_state()
 
     def show_context_menu(self, position):
         menu = QMenu()
         index = self.mod_table.indexAt(position)
-        clicked_row = index.row() if index.isValid() else -1
+        clicked_row = self.mod_table.source_row(index) if index.isValid() else -1
         is_on_separator = clicked_row >= 0 and self.is_separator_row(clicked_row)
         
         if is_on_separator:
@@ -1076,7 +999,7 @@ class ModLoaderUserInterface(QMainWindow):
             elif action == collapse_all_action:  self.collapse_all_seps()
             elif action == expand_all_action:    self.expand_all_seps()
         else:
-            if not self.mod_table.selectedItems():
+            if not self.mod_table.selectionModel().hasSelection():
                 add_mod_action = menu.addAction("Install Mod")
                 add_sep_action = menu.addAction("Add Separator")
                 action = menu.exec(self.mod_table.viewport().mapToGlobal(position))
@@ -1210,9 +1133,7 @@ class ModLoaderUserInterface(QMainWindow):
             self, "Add Separator", "Separator name:"+' '*DIALOGUE_WIDTH,
             QLineEdit.EchoMode.Normal, "New Separator")
         if ok and name:
-            self.mod_table.insertRow(row)
-            self.mod_table._create_separator_items(row, name)
-            self.update_priority_numbers()
+            self.mod_table.table_model.insert_entries(row, ["v#"+name])
             self.auto_save_load_order()
 
     def rename_separator(self, row):
@@ -1224,9 +1145,7 @@ class ModLoaderUserInterface(QMainWindow):
             QLineEdit.EchoMode.Normal, old_name.lstrip('*~#v>'))
         if ok and new_name:
             if not Qt.mightBeRichText(new_name): new_name=f"<b><u>{new_name}</u></b>"
-            name_item = self.mod_table.item(row, 2)
-            name_item.setText(new_name)
-            name_item.setData(Qt.ItemDataRole.UserRole + 1, new_name)
+            self.mod_table.table_model.set_name(row, new_name)
             self.auto_save_load_order()
 
     def collapse_all_seps(self):
@@ -1241,9 +1160,9 @@ class ModLoaderUserInterface(QMainWindow):
 
     def _set_selected_mods_state(self, state):
         """Set checkbox state for all selected mods"""
-        for item in self.mod_table.selectedItems():
-            if item.column() == 2:
-                self.mod_table.item(item.row(), 1).setCheckState(state)
+        self._loading = True
+        self.mod_table.table_model.set_enabled(self.mod_table.selected_rows(), state == Qt.CheckState.Checked)
+        self._loading = False
         self.update_status()
         self.auto_save_load_order()
 
@@ -1251,15 +1170,13 @@ class ModLoaderUserInterface(QMainWindow):
         if mod:
             row=self.get_separator_from_mod(mod)
             if row==-1: return
-        priority_item = self.mod_table.item(row, 0)
-        if priority_item.text() == "▼": self.toggle_separator_collapse(row)
+        if self.mod_table.is_separator_collapsed(row) is False: self.toggle_separator_collapse(row)
     
     def _expand_selected_separators(self, row=None, mod=None):
         if mod:
             row=self.get_separator_from_mod(mod)
             if row==-1: return
-        priority_item = self.mod_table.item(row, 0)
-        if priority_item.text() == "▶": self.toggle_separator_collapse(row)
+        if self.mod_table.is_separator_collapsed(row): self.toggle_separator_collapse(row)
 
     def enable_selected_mods(self):
         self._set_selected_mods_state(Qt.CheckState.Checked)
@@ -1268,30 +1185,33 @@ class ModLoaderUserInterface(QMainWindow):
         self._set_selected_mods_state(Qt.CheckState.Unchecked)
 
     def table_key_press_event(self, event):
-        try: row=self.mod_table.selectedItems()[0].row()
+        try: row=self.mod_table.selected_rows()[0]
         except: row=None
         if event.key() == Qt.Key.Key_F2:
+            if row is None: return
             if self.mod_table.is_separator_row(row): self.rename_separator(row)
             else: self.rename_selected_mod()
         elif event.key() in (Qt.Key.Key_Space, Qt.Key.Key_Return, Qt.Key.Key_Enter):
             self.toggle_selected_mods()
         elif event.key() == Qt.Key.Key_Delete: self.delete_selected_items()
-        elif event.key() == Qt.Key.Key_Left:   self._collapse_selected_separators(row)
-        elif event.key() == Qt.Key.Key_Right:  self._expand_selected_separators(row)
+        elif event.key() == Qt.Key.Key_Left:   
+            if row is not None: self._collapse_selected_separators(row)
+        elif event.key() == Qt.Key.Key_Right:  
+            if row is not None: self._expand_selected_separators(row)
         elif (event.key() == Qt.Key.Key_A and \
         event.modifiers() == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier)):
             self.mod_table.clearSelection()
             self.highlight_conflicts([])
         elif (event.key() == Qt.Key.Key_N and \
         event.modifiers() == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier)):
-            selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()), reverse=True)
+            selected_rows = self.mod_table.selected_rows()
             if selected_rows: row=min(selected_rows)
             else: row=self.mod_table.rowCount()
             self.add_separator_at(row)
-        else: QTableWidget.keyPressEvent(self.mod_table, event)
+        else: QTableView.keyPressEvent(self.mod_table, event)
 
     def delete_selected_items(self):
-        selected_rows = sorted(set(item.row() for item in self.mod_table.selectedItems()), reverse=True)
+        selected_rows = self.mod_table.selected_rows()[::-1]
         if not selected_rows:
             return
         
@@ -1299,7 +1219,7 @@ class ModLoaderUserInterface(QMainWindow):
         has_separator = any(self.is_separator_row(row) for row in selected_rows)
         has_mod = any(not self.is_separator_row(row) for row in selected_rows)
 
-        names=[self.mod_table.collect_row_data(row)["name"].lstrip("~#v>") for row in selected_rows]
+        names=[self.mod_table.table_model.names[row].lstrip("~#v>") for row in selected_rows]
         if len(names)>10: names=names[:10]+[f"... (+{len(names)-10} more)"]
         if has_separator and has_mod:
             msg = f"Remove selected mods and separators from load order?\n\n{'\n'.join(names)}"
@@ -1315,18 +1235,14 @@ class ModLoaderUserInterface(QMainWindow):
             self._loading=True
             mods=[]
             for row in selected_rows:
-                if self.is_separator_row(row):
-                    children = self.get_separator_children_rows(row)
-                    for child_row in children:
-                        self.mod_table.setRowHidden(child_row, False)
-                mod_name = self.mod_table.collect_row_data(row)["name"]
+                mod_name = self.mod_table.table_model.names[row]
                 mods.append(mods)
-                if not self.is_separator_row(row): delete_mod(mod_name, gui=True, write=False)
+                if not self.is_separator_row(row): delete_mod(mod_name, gui=True, write=False, prune=False)
                 else: print(f"deleted seperator {mod_name}!")
-                self.mod_table.removeRow(row)
+            self.mod_table.table_model.remove_rows(selected_rows)
             if mods: delete_mod_write(mods)
+            if has_mod and os.path.isdir(self.cfg["STORE_DIR"]): prune_store(self.cfg["STORE_DIR"])
             self._loading=False 
-            self.update_priority_numbers()
             self.update_status()
             self.auto_save_load_order()
 
@@ -1334,28 +1250,22 @@ class ModLoaderUserInterface(QMainWindow):
             if self.cfg["RELOAD_ON_INSTALL"]: self.load_mods()
 
     def toggle_selected_mods(self):
-        selected_rows = set(item.row() for item in self.mod_table.selectedItems())
+        selected_rows = self.mod_table.selected_rows()
         if not selected_rows: return
         
-        enabled_count = sum(1 for row in selected_rows 
-                          if self.mod_table.item(row, 1).checkState() == Qt.CheckState.Checked)
-        new_state = Qt.CheckState.Unchecked if enabled_count > len(selected_rows) / 2 else Qt.CheckState.Checked
-        
-        for row in selected_rows:
-            row_data = self.mod_table.collect_row_data(row)
-            if row_data["is_separator"]: continue
-            self.mod_table.item(row, 1).setCheckState(new_state)
+        enabled_count = sum(1 for row in selected_rows if self.mod_table.table_model.is_enabled(row))
+        self.mod_table.table_model.set_enabled(selected_rows, enabled_count <= len(selected_rows) / 2)
         
         self.update_status()
         self.cfg=read_cfg(sync=False) # check for update
         if self.cfg["RELOAD_ON_INSTALL"]: self.load_mods()
 
     def rename_selected_mod(self):
-        selected_items = self.mod_table.selectedItems()
-        if not selected_items: return
+        selected_rows = self.mod_table.selected_rows()
+        if not selected_rows: return
         
-        row = selected_items[0].row()
-        old_name = self.mod_table.item(row, 2).text()
+        row = selected_rows[0]
+        old_name = self.mod_table.get_name(row)
         
         new_name, ok = QInputDialog.getText(
             self, "Rename Mod", "New name:"+' '*DIALOGUE_WIDTH,
@@ -1364,18 +1274,17 @@ class ModLoaderUserInterface(QMainWindow):
         if ok and new_name and new_name != old_name:
             #try:
             rename_mod(old_name, new_name)
-            self.move_row(row,row,new_name)
+            self.mod_table.table_model.set_name(row, new_name)
             self.auto_save_load_order()
             self.statusBar().showMessage(f"Renamed '{old_name}' to '{new_name}'", SHOW_MSG_TIME)
             #except Exception as e:
             #    QMessageBox.warning(self, "Rename Error", f"Failed to rename mod:\n{str(e)}")
 
     def open_mod_folder(self):
-        selected_items = self.mod_table.selectedItems()
-        if not selected_items: return
+        selected_rows = self.mod_table.selected_rows()
+        if not selected_rows: return
         
-        row = selected_items[0].row()
-        mod_name = self.mod_table.item(row, 2).text()
+        mod_name = self.mod_table.get_name(selected_rows[0])
         mod_path = Path(self.cfg["SOURCE_DIR"]) / Path(mod_name)
         
         if not mod_path.exists():
@@ -1384,19 +1293,9 @@ class ModLoaderUserInterface(QMainWindow):
         
         self._open_path(mod_path)
 
-    def on_file_explorer_double_click(self, item, column):
-        path_parts = [item.text(0)]
-        parent = item.parent()
-        while parent:
-            path_parts.insert(0, parent.text(0))
-            parent = parent.parent()
-        
-        selected_items = self.mod_table.selectedItems()
-        if not selected_items: return
-        
-        row = selected_items[0].row()
-        mod_name = self.mod_table.item(row, 2).text()
-        full_path = Path(self.cfg["SOURCE_DIR"]) / mod_name / Path(*path_parts)
+    def on_file_explorer_double_click(self, index):
+        if not index.isValid(): return
+        full_path = Path(self.explorer_model.filePath(index))
         
         if not full_path.exists():
             QMessageBox.warning(self, "Error", f"Path not found:\n{full_path}")
@@ -1468,6 +1367,9 @@ class ModLoaderUserInterface(QMainWindow):
         else: event.ignore()
 
     def handle_file_drop(self, event):
+        if self.deploy_thread is not None:
+            self.statusBar().showMessage("Wait for linking to finish before installing", SHOW_MSG_TIME)
+            event.ignore(); return
         valid_extensions = {'.7z', '.zip', '.rar',''}
         installed_count = 0
         
@@ -1478,6 +1380,7 @@ class ModLoaderUserInterface(QMainWindow):
             or os.path.isdir(Path(url.toLocalFile()))
         ] 
         file_paths.sort(key=lambda p: p.stat().st_mtime)
+        self.install_context=fomod_context()
          
         extract_thread=ExtractorThread(file_paths, self.cfg["SOURCE_DIR"], self) 
         extract_status_thread=ExtractionStatusThread(self.status_label,Path(file_paths[0]))
@@ -1494,11 +1397,13 @@ class ModLoaderUserInterface(QMainWindow):
         event.acceptProposedAction()
 
     def add_mod_dialog(self):
+        if self.deploy_thread is not None: return
         file_paths, _ = QFileDialog.getOpenFileNames(
             self, "Select Mod Archive(s)", "",
             "Mod Archives (*.7z *.zip *.rar);;All Files (*)")
         if not file_paths: return
         file_paths.sort(key=lambda p: Path(p).stat().st_mtime)
+        self.install_context=fomod_context()
         
         extract_thread=ExtractorThread(file_paths, self.cfg["SOURCE_DIR"], self) 
         extract_status_thread=ExtractionStatusThread(self.status_label,Path(file_paths[0]))
@@ -1511,15 +1416,35 @@ class ModLoaderUserInterface(QMainWindow):
         extract_thread.start()
         extract_status_thread.start()
  
-    def handle_mod_install(self, temp_dir, archive_path):
+    def resolve_duplicate_install(self, archive_path, mod_name, identical):
+        # called (blocking) from the extractor thread before an archive is extracted
+        box = QMessageBox(self)
+        box.setWindowTitle("Already Installed")
+        if identical: box.setText(f"{Path(archive_path).name} is already installed as <b>{mod_name}</b>.")
+        else: box.setText(f"{Path(archive_path).name} looks like a different version of <b>{mod_name}</b>.")
+        box.setInformativeText("Replace removes the installed files first, Update installs over them.")
+        buttons = {
+            box.addButton("Skip", QMessageBox.ButtonRole.RejectRole): "skip",
+            box.addButton("Replace", QMessageBox.ButtonRole.DestructiveRole): "replace",
+            box.addButton("Update", QMessageBox.ButtonRole.AcceptRole): "update",
+            box.addButton("Install Copy", QMessageBox.ButtonRole.ActionRole): "copy",
+        }
+        box.exec()
+        self._duplicate_choice = buttons.get(box.clickedButton(), "skip")
+
+    def handle_mod_install(self, temp_dir, archive_path, digest="", mod_name="", mode="copy"):
         if not temp_dir:
             QMessageBox.warning(self,
                         "Installation Error",
                         f"Encountered exception during mod extraction for archive:\n{Path(archive_path).name}")
             return
         
-        name=install_mod(archive_path=archive_path, temp_dir=temp_dir, gui=True, parent=self)
-        if name: 
+        name=install_mod(archive_path=archive_path, temp_dir=temp_dir, gui=True, parent=self, digest=digest, mod_name=mod_name, mode=mode, context=self.install_context)
+        if name and mode in ("replace", "update"):
+            self.conflict_thread.invalidate(name)
+            self.conflict_timer.start()
+            self.statusBar().showMessage(f"Successfully {mode}d {name}", SHOW_MSG_TIME)
+        elif name: 
             self.add_mod(name, enabled=True)
             self.mod_table.scrollToBottom()
             self.statusBar().showMessage(f"Successfully installed {name}", SHOW_MSG_TIME)
@@ -1617,6 +1542,10 @@ class ModLoaderUserInterface(QMainWindow):
     def closeEvent(self, event):
         print("saving load order...")
         if self.cfg["UPDATE_ON_CLOSE"]: self.auto_save_load_order(instant=True)
+        if self.deploy_thread is not None: # stop linking, the manifests still get written
+            self.deploy_thread.cancel()
+            self.deploy_thread.wait()
+        self.conflict_thread.stop()
         event.accept()
 
     def on_play(self):
@@ -1634,16 +1563,76 @@ class ModLoaderUserInterface(QMainWindow):
             if reply!=QMessageBox.StandardButton.Yes: return
         self.cfg=read_cfg(sync=False)
         if self.cfg["LINK_ON_LAUNCH"]: 
-            self.link_status_thread=LinkingStatusThread(self.status_label, load=True)
-            self.link_status_thread.start()
             self.auto_save_load_order(instant=True)
-            perform_copy()
-            self.link_status_thread.stopped=True
+            self.deploy_and_launch()
+        else: self.launch()
+
+    def launch(self):
         proc=launch_game(self.cfg, self.current_exe) 
         self.exe_status_thread=ExeStatusThread(self.status_label,proc)
         self.exe_status_thread.start()
 
+    def set_linking_enabled(self, enabled):
+        # everything that links, unlinks or installs is off while a deploy thread runs
+        for button in (self.play_button, self.load_button, self.unload_button, self.add_button): button.setEnabled(enabled)
+        if enabled: self.update_unload_button_state()
+
+    def deploy_and_launch(self):
+        # linking runs off the gui thread, the game starts only once it completed
+        if self.deploy_thread is not None and self.deploy_thread.isRunning(): return
+        if self.executor.pending(perform_copy, restore) or self._extracting:
+            self.statusBar().showMessage("Mods are being linked or installed, try again once done", SHOW_MSG_TIME)
+            return
+        self.set_linking_enabled(False)
+        thread = DeployThread()
+        started = monotonic()
+
+        def on_progress(files, total_files):
+            if self.deploy_dialog is None:
+                self.deploy_dialog = QDialog(self)
+                self.deploy_dialog.setWindowTitle("Linking")
+                layout = QVBoxLayout(self.deploy_dialog)
+                self.deploy_label = QLabel("   Linking mod files...   ")
+                self.deploy_bar = QProgressBar()
+                self.deploy_bar.setRange(0, 100)
+                cancel_button = QPushButton("Cancel")
+                cancel_button.clicked.connect(thread.cancel)
+                cancel_button.clicked.connect(lambda: self.deploy_label.setText("   Cancelling...   "))
+                self.deploy_dialog.rejected.connect(thread.cancel) # escape or closing the window
+                layout.addWidget(self.deploy_label)
+                layout.addWidget(self.deploy_bar)
+                layout.addWidget(cancel_button, alignment=Qt.AlignmentFlag.AlignRight)
+                self.deploy_dialog.setMinimumWidth(420)
+                self.deploy_dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+                self.deploy_dialog.show()
+            if thread.cancelled: return
+            elapsed = monotonic()-started
+            eta = f", {int(elapsed*(total_files-files)/files)}s left" if files and elapsed>1 else ""
+            self.deploy_label.setText(f"Linking files {files}/{total_files}{eta}")
+            self.deploy_bar.setValue(int(100*files/total_files) if total_files else 100)
+
+        def on_done(ok):
+            self.deploy_thread = None
+            if self.deploy_dialog is not None: 
+                self.deploy_dialog.blockSignals(True)
+                self.deploy_dialog.close()
+                self.deploy_dialog = None
+            self.set_linking_enabled(True)
+            self.load_plugins_list()
+            if not ok: 
+                self.status_label.setText("Launch cancelled")
+                return
+            self.status_label.setText("Mods up to date" if thread.up_to_date else "Linking complete!")
+            self.launch()
+
+        thread.progress.connect(on_progress)
+        thread.done.connect(on_done)
+        self.status_label.setText("Checking mod files...")
+        self.deploy_thread = thread
+        thread.start()
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # the frozen binary's spawned conflict worker must not start the gui
     cfg=read_cfg(gui=True)
     app = QApplication(sys.argv)
     window = ModLoaderUserInterface()
@@ -9,20 +9,21 @@ import xml.etree.ElementTree as ET
 from pathlib import Path
 import argparse
 import subprocess
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from PyQt6.QtWidgets import QApplication, QMessageBox
-
+import yaml
 import patoolib
 
-try:
-    from fomod_gui import FomodInstallerDialog
-    from utils import * 
-except:
-    from utils.fomod_gui import FomodInstallerDialog
-    from utils.utils import * 
+try:    from utils.utils import *
+except: from utils import * 
 
 
 DEBUG=False
+INSTALL_WORKERS = min(8, os.cpu_count() or 1)
+FOMOD_MODEL_VERSION = 1 # bump when the compiled model layout changes
 
 def extract_archive(archive_path, extract_path):
     archive_path=Path(archive_path)
@@ -54,37 +55,54 @@ def find_fomod_config(extract_dir):
     return None
 
 
-def find_mod_base_dir(mod_path):
-    mod_path = Path(mod_path)
-    data_indicators = [
-        '.esp', '.esm', '.esl', '.bsa', '.ba2',
-        'meshes', 'textures', 'scripts', 'sounds',
-        'interface', 'music', 'video', 'strings',
-        'skse', 'fose', 'f4se', 'nvse', 'seq',
-        'fomod'
-    ]
-    def is_data_directory(path):
+DATA_DIR_INDICATORS = {
+    'meshes', 'textures', 'scripts', 'sounds',
+    'interface', 'music', 'video', 'strings',
+    'skse', 'fose', 'f4se', 'nvse', 'seq',
+    'fomod'
+}
+DATA_FILE_INDICATORS = ('.esp', '.esm', '.esl', '.bsa', '.ba2')
+MAX_DATA_DEPTH = 8 # mods are never nested deeper than this in an archive
+
+
+def scan_tree(mod_path, max_depth=MAX_DATA_DEPTH):
+    # breadth first listing {rel_dir: (subdirs, files)} with lowercase names
+    tree = {}
+    queue = [("", 0)]
+    for rel, depth in queue: # queue grows while iterating
+        dirs, files = [], []
         try:
-            items = list(path.iterdir())
-        except (PermissionError, OSError):
-            return False
-        for item in items:
-            item_lower = item.name.lower()
-            for indicator in data_indicators:
-                if (indicator.startswith('.') and item_lower.endswith(indicator)) or \
-                   (not indicator.startswith('.') and item_lower == indicator and item.is_dir()):
-                    return True
-        return False
-    for root in mod_path.rglob('*'):
-        if root.is_dir() and root.name.lower() == 'data' and is_data_directory(root):
-            return root
-    for root in mod_path.rglob('*'):
-        if root.is_dir() and 'fomod' in [d.name.lower() for d in root.iterdir() if d.is_dir()] and is_data_directory(root):
-            return root
-    for root in [mod_path] + [p for p in mod_path.rglob('*') if p.is_dir()]:
-        if is_data_directory(root):
-            return root
-    return mod_path
+            with os.scandir(os.path.join(mod_path, rel)) as it:
+                for entry in sorted(it, key=lambda e: e.name):
+                    try: is_dir = entry.is_dir()
+                    except OSError: continue
+                    if is_dir:
+                        dirs.append(entry.name.lower())
+                        if depth<max_depth: queue.append((os.path.join(rel, entry.name), depth+1))
+                    else: files.append(entry.name.lower())
+        except (PermissionError, OSError): pass
+        tree[rel] = (dirs, files)
+    return tree
+
+
+def pick_data_root(tree):
+    # tree is scan_tree's listing, any listing of that shape (e.g. built from archive member names) works too
+    # score every dir in one pass, shallowest match wins per category:
+    # a 'data' dir with mod content, a dir next to a fomod folder, any dir with mod content
+    data_dir = fomod_dir = content_dir = None
+    for rel, (dirs, files) in tree.items():
+        is_data = any(d in DATA_DIR_INDICATORS for d in dirs) or any(f.endswith(DATA_FILE_INDICATORS) for f in files)
+        if not is_data: continue
+        if content_dir is None: content_dir = rel
+        if not rel: continue # the root itself only counts as generic content
+        if data_dir is None and os.path.basename(rel.replace('/', os.sep)).lower()=='data': data_dir = rel; break
+        if fomod_dir is None and 'fomod' in dirs: fomod_dir = rel
+    return next((d for d in (data_dir, fomod_dir, content_dir) if d is not None), "")
+
+
+def find_mod_base_dir(mod_path, max_depth=MAX_DATA_DEPTH):
+    mod_path = Path(mod_path)
+    return mod_path / pick_data_root(scan_tree(mod_path, max_depth))
 
 
 def read_fomod(xml_path):
@@ -152,7 +170,7 @@ def parse_fomod_structure(fomod_path, extract_dir):
             # Legacy format: create a single step with all groups
             steps_data = [{ 'name': 'Installation Options',
                             'groups': parse_groups(optional_groups, ns),
-                            'visible_elem': None }]
+                            'visible': None }]
             return { 'mod_name': mod_name,
                      'required_files': required_files,
                      'steps': steps_data,
@@ -171,15 +189,15 @@ def parse_fomod_structure(fomod_path, extract_dir):
     # Process each install step (modern format)
     for step in install_steps.findall('.//installStep', ns) if ns else install_steps.findall('.//installStep'):
         step_name = step.get('name', 'Installation Step')
-        # Store visibility conditions for later evaluation
-        visible_elem = step.find('.//visible', ns) if ns else step.find('.//visible')
+        # Compile visibility conditions for later evaluation
+        visible_elem = step.find('visible', ns) if ns else step.find('visible')
         # Process optional file groups
         groups = step.find('.//optionalFileGroups', ns) if ns else step.find('.//optionalFileGroups')
         groups_data = parse_groups(groups, ns) if groups is not None else []
         
         steps_data.append({'name': step_name,
                            'groups': groups_data,
-                           'visible_elem': visible_elem })
+                           'visible': compile_visible(visible_elem) })
     
     return { 'mod_name': mod_name,
              'required_files': required_files,
@@ -205,7 +223,7 @@ def parse_conditional_installs(root, ns):
         
         if deps_elem is not None and files_elem is not None:
             files = extract_files_info(files_elem, ns)
-            conditional_installs.append({'dependencies_elem': deps_elem, 'files': files})
+            conditional_installs.append({'dependencies': compile_dependencies(deps_elem), 'files': files})
     
     return conditional_installs
 
@@ -252,16 +270,12 @@ def parse_groups(groups_elem, ns):
             # Get visibility conditions
             visible_elem = plugin.find('.//visible', ns) if ns else plugin.find('.//visible')
             
-            # Get typeDescriptor for dependency checking
-            type_desc_elem = plugin.find('.//typeDescriptor', ns) if ns else plugin.find('.//typeDescriptor')
-            
             plugins_data.append({'name': plugin_name,
                                  'description': description,
                                  'image': image_path,
                                  'flags': flags,
                                  'files': files,
-                                 'visible_elem': visible_elem,
-                                 'type_desc_elem': type_desc_elem})
+                                 'visible': compile_visible(visible_elem)})
         
         groups_data.append({'name': group_name,
                             'type': group_type,
@@ -270,47 +284,170 @@ def parse_groups(groups_elem, ns):
     return groups_data
 
 
-def evaluate_conditional_installs(conditional_installs, condition_flags, ns):
+def evaluate_conditional_installs(conditional_installs, condition_flags, ns=None):
     """Evaluate conditional file installs and return matching files."""
     files = []
     for pattern in conditional_installs:
-        deps_elem = pattern['dependencies_elem']
-        if evaluate_dependencies_element(deps_elem, condition_flags, ns):
+        if pattern['matches'](condition_flags):
             files.extend(pattern['files'])
             # Only first matching pattern applies (FOMOD spec)
             #break
     return files
 
 
-def evaluate_dependencies_element(deps_elem, condition_flags, ns):
-    """Evaluate a dependencies element directly."""
-    if deps_elem is None: return True
-    operator = deps_elem.get('operator', 'And')
-    # Find all flag dependencies
-    flag_deps = deps_elem.findall('.//flagDependency', ns) if ns else deps_elem.findall('.//flagDependency')
-    
-    if not flag_deps: return True
-    
-    results = [] # user choice combo active/off
-    options = []   # available choice combo names
-    choice = condition_flags.keys() # user choice names
-    for flag_dep in flag_deps:
-        flag_name = flag_dep.get('flag', '')
-        options.append(flag_name)
-        expected_value = flag_dep.get('value', 'On')
-        actual_value = condition_flags.get(flag_name, 'Off')
-        if expected_value=="": expected_value="Off"
-        results.append(actual_value == expected_value)
-    if operator == 'And':  return all(results)
-    elif operator == 'Or': return any(results)
-    else: return all(results)
-
-def evaluate_conditions(visible_elem, condition_flags, ns):
-    """Evaluate visibility conditions based on current flags."""
-    # Get dependencies element
-    deps_elem = visible_elem.find('.//dependencies', ns) if ns else visible_elem.find('.//dependencies')
-    if deps_elem is None: return True
-    return evaluate_dependencies_element(deps_elem, condition_flags, ns)
+def local_tag(elem):
+    return elem.tag.split('}')[-1]
+
+def compile_dependencies(deps_elem):
+    """Compile a dependencies element into nested ['And'|'Or', [conditions]] lists."""
+    if deps_elem is None: return None
+    operator = 'Or' if deps_elem.get('operator', 'And')=='Or' else 'And'
+    conditions = []
+    for child in deps_elem:
+        tag = local_tag(child)
+        if tag == 'flagDependency':
+            conditions.append(['flag', child.get('flag', ''), child.get('value', 'On') or 'Off'])
+        elif tag == 'dependencies':
+            conditions.append(compile_dependencies(child))
+        elif tag == 'fileDependency':
+            conditions.append(['file', child.get('file', ''), child.get('state', 'Active')])
+        elif tag in ('gameDependency', 'fommDependency', 'foseDependency'):
+            conditions.append([tag[:-len('Dependency')], child.get('version', '')])
+    return [operator, conditions]
+
+def compile_visible(visible_elem):
+    """Compile a visible element, which either wraps a dependencies element or is one itself."""
+    if visible_elem is None: return None
+    deps_elem = next((c for c in visible_elem if local_tag(c)=='dependencies'), visible_elem)
+    return compile_dependencies(deps_elem)
+
+class DependencyContext:
+    """Answers file/game dependency conditions from an index of the enabled mods' files
+    and the plugin list, built lazily once per install session."""
+    PLUGIN_EXTS = ('.esp', '.esm', '.esl')
+
+    def __init__(self, mod_dirs=(), data_dir=None, default_plugins=(), game_exe=None, game_version=None, active_plugins=None):
+        self.mod_dirs = [Path(d) for d in mod_dirs]
+        self.data_dir = Path(data_dir) if data_dir else None
+        self.default_plugins = {p.casefold() for p in default_plugins}
+        # from the plugins file the game reads, without one every plugin of an enabled mod counts as active
+        self.listed_plugins = None if active_plugins is None else {p.casefold() for p in active_plugins}
+        self.game_exe = game_exe
+        self._game_version = game_version
+        self._files = None
+        self._active_plugins = None
+        self._probed = {}
+        self._lock = threading.Lock() # shared by parallel installs
+
+    def _index(self, mod_dir, plugins_active=True):
+        for root, _, fs in os.walk(mod_dir):
+            rel = os.path.relpath(root, mod_dir)
+            rel = "" if rel=="." else rel.replace(os.sep, '/').casefold()+'/'
+            for f in fs:
+                key = rel+f.casefold()
+                self._files.add(key)
+                if plugins_active and not rel and key.endswith(self.PLUGIN_EXTS): self._active_plugins.add(key)
+
+    def _build(self):
+        self._files = set()
+        self._active_plugins = set(self.default_plugins)
+        if self.listed_plugins is not None: self._active_plugins |= self.listed_plugins
+        for mod_dir in self.mod_dirs: self._index(mod_dir, self.listed_plugins is None)
+        # vanilla content, deployed links belong to mods and are covered (or disabled) above
+        if self.data_dir and os.path.isdir(self.data_dir):
+            for entry in os.scandir(self.data_dir):
+                if entry.is_symlink(): continue
+                key = entry.name.casefold()
+                self._files.add(key)
+                if key.endswith('.esm'): self._active_plugins.add(key) # masters always load
+
+    def add_mod_dir(self, mod_dir):
+        # a mod installed earlier in the same session, its plugins are activated on the next deploy
+        with self._lock:
+            self.mod_dirs.append(Path(mod_dir))
+            if self._files is not None: self._index(mod_dir)
+
+    def file_state(self, path):
+        with self._lock:
+            if self._files is None: self._build()
+        key = '/'.join(p for p in path.replace('\\', '/').split('/') if p).casefold()
+        if key not in self._files:
+            if not self.data_dir or '/' not in key: return 'Missing'
+            if key not in self._probed: # loose game files are not indexed, look once
+                self._probed[key] = os.path.lexists(fix_path_case(self.data_dir/key))
+            if not self._probed[key]: return 'Missing'
+        if '/' not in key and key.endswith(self.PLUGIN_EXTS) and key not in self._active_plugins: return 'Inactive'
+        return 'Active'
+
+    def game_version(self):
+        if self._game_version is None and self.game_exe:
+            self._game_version = get_exe_version(self.game_exe) if os.path.exists(self.game_exe) else ()
+            if self._game_version is None: self._game_version = ()
+        return self._game_version or ()
+
+
+def parse_version(text):
+    return tuple(int(p) for p in re.findall(r'\d+', text or ''))
+
+def condition_predicate(condition, context=None):
+    """Turn a compiled condition into a predicate over the condition flag dict.
+    File and game conditions need a DependencyContext and are left out without one,
+    fomm (mod manager version) conditions are always met."""
+    if condition is None: return lambda flags: True
+    kind = condition[0]
+    if kind == 'flag':
+        _, name, value = condition
+        return lambda flags: flags.get(name, 'Off') == value
+    if kind == 'file' and context is not None:
+        _, name, state = condition
+        return lambda flags: context.file_state(name) == state
+    if kind == 'game' and context is not None:
+        required = parse_version(condition[1])
+        # an unreadable game version is assumed to be recent enough
+        return lambda flags: not context.game_version() or context.game_version() >= required
+    if kind == 'fomm': return lambda flags: True
+    if kind in ('And', 'Or'):
+        preds = [p for p in (condition_predicate(c, context) for c in condition[1]) if p is not None]
+        if not preds: return lambda flags: True
+        if len(preds) == 1: return preds[0]
+        if kind == 'Or': return lambda flags: any(p(flags) for p in preds)
+        return lambda flags: all(p(flags) for p in preds)
+    return None
+
+def attach_predicates(fomod_data, context=None):
+    """Add callables for every compiled condition, done after (de)serialization."""
+    for step in fomod_data['steps']:
+        step['is_visible'] = condition_predicate(step.get('visible'), context)
+        for group in step['groups']:
+            for plugin in group['plugins']:
+                plugin['is_visible'] = condition_predicate(plugin.get('visible'), context)
+    for pattern in fomod_data['conditional_installs']:
+        pattern['matches'] = condition_predicate(pattern.get('dependencies'), context)
+    return fomod_data
+
+def load_fomod_model(fomod_path, extract_dir, cache_dir=None, context=None):
+    """Parse and compile a FOMOD config, reusing a cached model for an identical config."""
+    cache_file = None
+    if cache_dir:
+        cache_file = Path(cache_dir)/f"{hash_file(fomod_path)}-v{FOMOD_MODEL_VERSION}.json"
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f: fomod_data = json.load(f)
+            fomod_data['required_files'] = [tuple(f) for f in fomod_data['required_files']]
+            for step in fomod_data['steps']:
+                for group in step['groups']:
+                    for plugin in group['plugins']: plugin['files'] = [tuple(f) for f in plugin['files']]
+            for pattern in fomod_data['conditional_installs']: pattern['files'] = [tuple(f) for f in pattern['files']]
+            print(f"loaded compiled FOMOD from cache: {cache_file.name}")
+            return attach_predicates(fomod_data, context)
+        except FileNotFoundError: pass
+        except Exception as e: print(f"warning: ignoring unreadable FOMOD cache {cache_file} ({e})")
+    fomod_data = parse_fomod_structure(fomod_path, extract_dir)
+    if cache_file:
+        try:
+            ensure_dir(cache_file.parent)
+            with open(cache_file, 'w', encoding='utf-8') as f: json.dump(fomod_data, f)
+        except (OSError, TypeError) as e: print(f"warning: could not write FOMOD cache ({e})")
+    return attach_predicates(fomod_data, context)
 
 def extract_files_info(files_elem, ns):
     """Extract file and folder information from XML."""
@@ -334,12 +471,83 @@ def extract_files_info(files_elem, ns):
             file_list.append(('folder', source, destination))
     return file_list
 
-def process_fomod(archive_path, extract_dir, output_dir, parent=None):
-    """Process FOMOD configuration using GUI with dynamic step evaluation"""
+def save_fomod_choices(choices_file, archive_path, fomod_path, results):
+    """Record the user's FOMOD choices so the install can be replayed headless."""
+    choices = {'ARCHIVE': Path(archive_path).name if os.path.isdir(archive_path) else Path(archive_path).stem,
+               'CONFIG_HASH': hash_file(fomod_path),
+               'SELECTED': [list(p) for p in results['selected_plugins']],
+               'FLAGS': dict(results['condition_flags'])}
+    ensure_dir(Path(choices_file).parent)
+    with open(choices_file, 'w', encoding='utf-8') as f:
+        yaml.dump(choices, f, sort_keys=False, default_flow_style=False)
+
+def load_fomod_choices(choices_file):
+    with open(choices_file, 'r', encoding='utf-8') as f: return yaml.safe_load(f)
+
+def index_fomod_choices(choices_dir):
+    """Archive name -> saved choices, read once per batch of installs."""
+    index = {}
+    if not choices_dir or not os.path.isdir(choices_dir): return index
+    for name in sorted(os.listdir(choices_dir)):
+        try: choices = load_fomod_choices(Path(choices_dir)/name)
+        except Exception: continue
+        if choices and choices.get('ARCHIVE'): index.setdefault(choices['ARCHIVE'], choices)
+    return index
+
+def find_fomod_choices(choices_dir, archive_path, mod_name=None, index=None):
+    """Saved choices for an archive, matched by archive name first and mod name second."""
+    if not choices_dir or not os.path.isdir(choices_dir): return None
+    if index is None: index = index_fomod_choices(choices_dir)
+    archive_name = Path(archive_path).name if os.path.isdir(archive_path) else Path(archive_path).stem
+    if archive_name in index: return index[archive_name]
+    for name in (mod_name, archive_name):
+        if name and os.path.exists(Path(choices_dir)/f"{name}.yaml"): return load_fomod_choices(Path(choices_dir)/f"{name}.yaml")
+    return None
+
+def replay_fomod_choices(fomod_data, choices):
+    """Files to install for saved choices, without any dialog."""
+    wanted = {tuple(p) for p in choices.get('SELECTED', [])}
+    selected_files = []
+    found = set()
+    for step in fomod_data['steps']:
+        for group in step['groups']:
+            for plugin in group['plugins']:
+                key = (step['name'], group['name'], plugin['name'])
+                if key in wanted:
+                    selected_files.extend(plugin['files'])
+                    found.add(key)
+    for key in wanted-found: print(f"warning: saved choice {' > '.join(key)} no longer exists in this installer")
+    conditional_files = evaluate_conditional_installs(fomod_data['conditional_installs'], choices.get('FLAGS', {}))
+    return fomod_data['required_files'] + selected_files + conditional_files
+
+def fomod_dialog_class():
+    # Qt is only pulled in when a dialog is actually shown, replays run without it
+    try:    from fomod_gui import FomodInstallerDialog
+    except: from utils.fomod_gui import FomodInstallerDialog
+    return FomodInstallerDialog
+
+def process_fomod(archive_path, extract_dir, output_dir, parent=None, mod_name=None, cache_dir=None, context=None,
+                  choices_dir=None, choices=None, headless=False):
+    """Process FOMOD configuration using GUI with dynamic step evaluation,
+    or replay saved choices (headless installs never open a dialog)"""
     fomod_path=find_fomod_config(extract_dir)
     print(f"found FOMOD config at: {fomod_path}")
     # Parse FOMOD structure
-    fomod_data = parse_fomod_structure(fomod_path, extract_dir)
+    fomod_data = load_fomod_model(fomod_path, extract_dir, cache_dir, context)
+    path_index = build_path_index(extract_dir) # shared by dialog images and file installs
+
+    if headless and choices is None and not fomod_data['steps']: choices = {} # nothing to choose
+    if choices is not None:
+        if choices.get('CONFIG_HASH') not in (None, hash_file(fomod_path)):
+            print(f"warning: {Path(archive_path).name} has a different FOMOD config than when its choices were saved")
+        print(f"replaying saved FOMOD choices for {fomod_data['mod_name']}")
+        return install_fomod_files(archive_path, replay_fomod_choices(fomod_data, choices), extract_dir, output_dir, mod_name, path_index)
+    if headless:
+        print(f"error: no saved FOMOD choices for {Path(archive_path).name}, install it interactively once first")
+        return None
+
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    FomodInstallerDialog = fomod_dialog_class()
     
     # Check if there are any steps/options
     if not fomod_data['steps'] and not fomod_data['required_files']:
@@ -362,6 +570,7 @@ def process_fomod(archive_path, extract_dir, output_dir, parent=None):
     # Store fomod_data in dialog for dynamic step building
     dialog.fomod_data = fomod_data
     dialog.extract_dir = extract_dir
+    dialog.path_index = path_index
     dialog.condition_flags = {}
     
     # If no steps, just show required files and install
@@ -369,7 +578,7 @@ def process_fomod(archive_path, extract_dir, output_dir, parent=None):
         if fomod_data['required_files']:
             result = dialog.exec()
             if result and not dialog.user_cancelled:
-                mod_name = install_fomod_files(fomod_data['required_files'], extract_dir, output_dir)
+                mod_name = install_fomod_files(archive_path, fomod_data['required_files'], extract_dir, output_dir, mod_name, path_index)
                 #return fomod_data['required_files']
                 return mod_name
         return None
@@ -384,7 +593,7 @@ def process_fomod(archive_path, extract_dir, output_dir, parent=None):
         if fomod_data['required_files']:
             result = dialog.exec()
             if result and not dialog.user_cancelled:
-                mod_name = install_fomod_files(fomod_data['required_files'], extract_dir, output_dir)
+                mod_name = install_fomod_files(archive_path, fomod_data['required_files'], extract_dir, output_dir, mod_name, path_index)
                 #return fomod_data['required_files']
                 return mod_name
         return None
@@ -402,86 +611,97 @@ def process_fomod(archive_path, extract_dir, output_dir, parent=None):
         # Install files
         all_files = fomod_data['required_files'] + results['selected_files'] + conditional_files
         if all_files:
-            mod_name = install_fomod_files(archive_path, all_files, extract_dir, output_dir)
+            mod_name = install_fomod_files(archive_path, all_files, extract_dir, output_dir, mod_name, path_index)
         else:
-            mod_name = install_fomod_files(archive_path, fomod_data['required_files'], extract_dir, output_dir)
+            mod_name = install_fomod_files(archive_path, fomod_data['required_files'], extract_dir, output_dir, mod_name, path_index)
         #return results['selected_files']+conditional_files # idk about this one
+        if mod_name and choices_dir: save_fomod_choices(Path(choices_dir)/f"{mod_name}.yaml", archive_path, fomod_path, results)
         return mod_name
     return None  # User cancelled
 
-def install_fomod_files(archive_path, file_list, extract_dir, output_dir):
-    """Copy selected files to output directory."""
+def install_fomod_files(archive_path, file_list, extract_dir, output_dir, mod_name=None, path_index=None):
+    """Copy selected files to output directory (into mod_name if given, even if it exists)."""
     extract_dir = Path(extract_dir)
-    if os.path.isdir(archive_path): mod_name=Path(archive_path).name
-    else: mod_name = Path(archive_path).stem
-    output_dir = Path(output_dir)/mod_name
-    if os.path.isdir(output_dir): output_dir, mod_name=fix_dirname_used(output_dir)
+    if mod_name: output_dir = Path(output_dir)/mod_name
+    else:
+        if os.path.isdir(archive_path): mod_name=Path(archive_path).name
+        else: mod_name = Path(archive_path).stem
+        output_dir, mod_name = reserve_dirname(Path(output_dir)/mod_name)
     output_dir.mkdir(parents=True, exist_ok=True)
+    os.chmod(output_dir, FULL_PERMS)
 
     print("\n" + "="*80)
     print("Installing files...")
     print("="*80 + "\n")
     
+    if path_index is None: path_index = build_path_index(extract_dir)
+    plan = {} # dest -> source, later entries overwrite earlier ones like a sequential copy would
     for file_type, source, destination in file_list:
-        # Try to find source case-insensitively
-        source_parts = source.replace('\\', '/').split('/')
-        current_path = extract_dir
-        
-        for part in source_parts:
-            found = False
-            if not current_path.is_dir(): continue
-            for item in current_path.iterdir():
-                if item.name.lower() == part.lower():
-                    current_path = item
-                    found = True
-                    break
-            if not found:
-                print(f"warning: Could not find {source}")
-                break
-        else:
-            dest_path = output_dir / destination
-            if file_type == 'file' and current_path.is_file():
-                dest_path.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(current_path, dest_path)
-                print(f"installed: {current_path} to {destination}")
-            elif file_type == 'folder' and current_path.is_dir():
-                shutil.copytree(current_path, dest_path, dirs_exist_ok=True)
-                #print(f"installed folder: {current_path} to {destination}")
-    set_full_perms_dir(output_dir)
-    print(f"\ninstallation complete! files installed to: {output_dir}")
+        current_path = resolve_path(path_index, source)
+        if current_path is None:
+            print(f"warning: Could not find {source}")
+            continue
+        dest_path = output_dir / destination
+        if file_type == 'file' and current_path.is_file():
+            plan[dest_path] = current_path
+        elif file_type == 'folder' and current_path.is_dir():
+            plan.update(plan_tree(current_path, dest_path))
+    install_files(plan)
+    print(f"\ninstallation complete! {len(plan)} files installed to: {output_dir}")
     return mod_name
 
-def install_mod_files(archive_path, temp_dir, output_dir):
+def install_mod_files(archive_path, temp_dir, output_dir, mod_name=None):
     print("copying files from non-FOMOD archive...")
     # Copy everything from temp to output
-    mod_name = Path(archive_path).stem
-    output_dir=Path(output_dir)/mod_name
-    if os.path.isdir(output_dir): output_dir,mod_name=fix_dirname_used(output_dir)
+    if mod_name: output_dir=Path(output_dir)/mod_name # install over existing mod
+    else:
+        mod_name = Path(archive_path).stem
+        output_dir,mod_name=reserve_dirname(Path(output_dir)/mod_name)
     output_dir.mkdir(parents=True, exist_ok=True)
-    temp_path = Path(temp_dir)
-    for item in temp_path.iterdir():
-        dest = output_dir / item.name
-        if item.is_file():
-            shutil.copy2(item, dest)
-            print(f"copied: {item.name}")
-        elif item.is_dir():
-            if dest.exists():
-                shutil.rmtree(dest)
-            shutil.copytree(item, dest)
-            print(f"copied folder: {item.name}")
-    set_full_perms_dir(output_dir)
-    print(f"\nall files copied to: {output_dir}")
+    os.chmod(output_dir, FULL_PERMS)
+    plan = plan_tree(Path(temp_dir), output_dir)
+    install_files(plan)
+    print(f"\nall {len(plan)} files copied to: {output_dir}")
     return mod_name
 
-def installer_run(archive_path=None, output_dir=None, temp_dir=None, gui=False, parent=None):
+def plan_tree(src, dst):
+    # dest -> source for every file below src, empty dirs are kept as None
+    plan = {}
+    for root, dirs, fs in os.walk(src):
+        out_root = Path(dst)/os.path.relpath(root, src)
+        if not dirs and not fs: plan[out_root] = None
+        for f in fs: plan[out_root/f] = Path(root)/f
+    return plan
+
+def install_files(plan):
+    # dirs are created up front so the pool only ever places files
+    dirs = {dest if src is None else dest.parent for dest, src in plan.items()}
+    for d in sorted(dirs, key=lambda d: len(d.parts)):
+        if not d.is_dir():
+            d.mkdir(parents=True, exist_ok=True)
+            os.chmod(d, FULL_PERMS)
+    files = [(src, dest) for dest, src in plan.items() if src is not None]
+    if len(files)<2*INSTALL_WORKERS:
+        for src, dest in files: link_file_full_perms(src, dest)
+        return
+    with ThreadPoolExecutor(max_workers=INSTALL_WORKERS) as pool:
+        list(pool.map(lambda f: link_file_full_perms(*f), files)) # list() to raise worker exceptions
+
+def installer_run(archive_path=None, output_dir=None, temp_dir=None, gui=False, parent=None, store_dir=None, mod_name=None, cache_dir=None, context=None,
+                  choices_dir=None, choices=None, headless=False):
     
 
     temp_dir = find_mod_base_dir(Path(temp_dir))
     is_fomod = find_fomod_config(temp_dir)
     if is_fomod:
-        mod_name = process_fomod(archive_path, temp_dir, output_dir, parent)
+        mod_name = process_fomod(archive_path, temp_dir, output_dir, parent, mod_name, cache_dir, context, choices_dir, choices, headless)
     else:
-        mod_name = install_mod_files(archive_path, temp_dir, output_dir)
+        mod_name = install_mod_files(archive_path, temp_dir, output_dir, mod_name)
+    try: remove_tree(temp_dir); print("removed tmp extract dir")
+    except: print("warning: could not remove tmp extract dir")
+    if mod_name and store_dir: # hardlink staged files into content store, once the extract dir no longer links to them
+        files, reclaimed = dedupe_dir(Path(output_dir)/mod_name, store_dir)
+        print(f"deduplicated {files} files, reclaimed {format_size(reclaimed)}")
 
     #try:
     #    temp_dir = find_mod_base_dir(Path(temp_dir))
@@ -497,8 +717,6 @@ def installer_run(archive_path=None, output_dir=None, temp_dir=None, gui=False,
     #                    f"Encountered exception during mod installation! \n\nException:\n"+str(e))
     #    print("error: encountered exception: "+str(e)+" when installing mod, giving up")
     #    return None
-    try: shutil.rmtree(temp_dir); print("removed tmp extract dir")
-    except: print("warning: could not remove tmp extract dir")
     return mod_name
 
 
@@ -513,9 +731,11 @@ if __name__ == '__main__':
                         default=None)
     parser.add_argument('--gui', action='store_true',
                         help='Use GUI installer instead of CLI')
+    parser.add_argument('--replay', metavar='CHOICES',
+                        help='Replay saved FOMOD choices (yaml) without any dialog or Qt')
     args = parser.parse_args()
     if not os.path.exists(args.archive):
-        print(f"error: Archive not found: {args.archive}")
+        print(f"error: Archive not found: {args.archive}"); sys.exit(1)
     archive_path=args.archive
 
     # Get output directory
@@ -523,4 +743,8 @@ if __name__ == '__main__':
     if args.output: output_dir = Path(args.output)
     else: output_dir = Path.cwd()
 
-    installer_run(archive_path, output_dir, gui=args.gui)
+    choices = load_fomod_choices(args.replay) if args.replay else None
+    temp_dir = Path(tempfile.mkdtemp())
+    if os.path.isdir(archive_path): shutil.copytree(archive_path, temp_dir, dirs_exist_ok=True)
+    elif not extract_archive(archive_path, temp_dir): sys.exit(1)
+    installer_run(archive_path, output_dir, temp_dir, gui=args.gui, choices=choices, headless=bool(args.replay))
@@ -5,10 +5,17 @@ import os
 import re
 import sys
 import stat
+import shutil
+import pickle
+import zlib
+import bisect
+import hashlib
 import urllib.request
 import traceback
 import subprocess
+from array import array
 from collections import defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 
 FAILED_URLS=[]
@@ -44,6 +51,21 @@ def fix_path_case(path):
         cur = os.path.join(cur, part)
     return os.path.join(drive, *fixed) if drive else os.sep + os.path.join(*fixed)
 
+def build_path_index(root):
+    # case-folded relative path -> real path for everything below root,
+    # built once per install so fomod sources resolve in O(1)
+    root = Path(root)
+    index = {"": root}
+    for cur, dirs, fs in os.walk(root):
+        rel = os.path.relpath(cur, root)
+        rel = "" if rel=="." else rel.replace(os.sep, '/').casefold()+'/'
+        for name in dirs+fs: index[rel+name.casefold()] = Path(cur)/name
+    return index
+
+def resolve_path(index, path):
+    # fomod paths use either slash and any case
+    return index.get('/'.join(p for p in path.replace('\\', '/').split('/') if p not in ('', '.')).casefold())
+
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
     return path
@@ -56,6 +78,16 @@ def fix_dirname_used(output_dir):
     name = str(Path(output_dir).name)
     return output_dir, name
 
+def reserve_dirname(output_dir):
+    # like fix_dirname_used but creates the dir in the same step,
+    # mkdir fails on an existing name so parallel installs never share one
+    output_dir = Path(output_dir)
+    for i in range(10**9):
+        p = output_dir.parent / f"{output_dir.name}{'' if i == 0 else f'_{i}'}"
+        try: p.mkdir(parents=True)
+        except FileExistsError: continue
+        return p, p.name
+
 def set_full_perms_dir(d):
     d = Path(d)
     mode = stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO
@@ -66,6 +98,45 @@ def set_full_perms_dir(d):
         except Exception as e: print(f"{str(e)} when setting permissions on {str(item)}")
     return d
 
+FULL_PERMS = stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO
+
+def copy_file_full_perms(src, dst):
+    # copy2 keeps the archive's mode bits, only touch them when they differ
+    try: os.unlink(dst) # never write through an existing (possibly hardlinked) file
+    except FileNotFoundError: pass
+    shutil.copy2(src, dst)
+    if stat.S_IMODE(os.stat(dst).st_mode)!=FULL_PERMS: os.chmod(dst, FULL_PERMS)
+    return dst
+
+def link_file_full_perms(src, dst):
+    # hardlink out of the extraction dir when on the same drive, copy otherwise
+    try: os.unlink(dst)
+    except FileNotFoundError: pass
+    try: os.link(src, dst)
+    except OSError: return copy_file_full_perms(src, dst)
+    if stat.S_IMODE(os.stat(dst).st_mode)!=FULL_PERMS: os.chmod(dst, FULL_PERMS)
+    return dst
+
+def copy_tree_full_perms(src, dst):
+    # copytree that hands out full permissions as it writes, so no chmod pass is needed afterwards
+    ensure_dir(dst)
+    if stat.S_IMODE(os.stat(dst).st_mode)!=FULL_PERMS: os.chmod(dst, FULL_PERMS)
+    for root, dirs, fs in os.walk(src):
+        out_root = os.path.join(dst, os.path.relpath(root, src))
+        for d in dirs:
+            out = os.path.join(out_root, d)
+            ensure_dir(out)
+            os.chmod(out, FULL_PERMS)
+        for f in fs: copy_file_full_perms(os.path.join(root, f), os.path.join(out_root, f))
+    return dst
+
+def remove_tree(d):
+    # only fix up permissions if they actually get in the way
+    try: shutil.rmtree(d)
+    except PermissionError:
+        set_full_perms_dir(d)
+        shutil.rmtree(d)
+
 def set_full_perms_file(f):
     f = Path(f)
     mode = stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO
@@ -80,61 +151,808 @@ def set_readonly_file(f):
     except Exception as e: print(f"{str(e)} when setting permissions on {str(f)}")
     return f
 
-def scan_mod_overrides(src_dir, loadorder, prev_overriders=None, prev_overriddens=None, prev_overriddens_full=None, prev_mod_files=None, change_idxs=None):
-    overriders=dict()
-    overriddens=dict()
-    overriddens_full=dict()
-    ignore_files = {b"meta.ini", b"readme.txt"}
-
-    # slim down search
-    if change_idxs: loadorder=loadorder[min(change_idxs):max(change_idxs)+1]
-
-    mod_files = OrderedDict()
-    file_set  = set()
-    # build file table
-    for mod in loadorder[::-1]:
-        path = src_dir + os.sep + mod
-        if not os.path.isdir(path): continue
-        mod_files[mod]=set()
-        path_name_len = len(path) + 1
-        for root, _, files in os.walk(path): # fast
-            if not files: continue
-            path_name = root[len(path)+1:]
-            for file in files:
-                if file.encode().lower() in ignore_files: continue # TODO: maybe could avoid this
-                mod_data = path_name + os.sep + file if path_name else file
-                mod_files[mod].add(mod_data)
-    # iterating bottom up, check overrides
-    for mod1,files1 in mod_files.items():
-        # get keys after key were currently looking at
-        tmp_mod_files=after = OrderedDict(list(mod_files.items())[list(mod_files.keys()).index(mod1) + 1:])
-        for mod2,files2 in tmp_mod_files.items():
-            # overriders and overriddens
-            if len(files1 & files2)>0: # file set intersection
-                overriders.setdefault(mod1,[]).append(mod2) # overrider: overriddens
-                overriddens.setdefault(mod2,[]).append(mod1) # overriden: overridders
-            # full overrides
-            if files1==files2: # file set equivalent
-                overriddens_full.setdefault(mod2,[]).append(mod1) # overridden: overriders
-    # update previous dicts with new entries
-    if prev_overriders: 
-        [prev_overriders.pop(k, None) for k in loadorder] # del for update
-        prev_overriders.update(overriders)
-        overriders=prev_overriders
-    if prev_overriddens: 
-        [prev_overriddens.pop(k, None) for k in loadorder]
-        prev_overriddens.update(overriddens) 
-        overriddens=prev_overriddens
-    if prev_overriddens_full: 
-        [prev_overriddens_full.pop(k, None) for k in loadorder]
-        prev_overriddens.update(overriddens_full) 
-        overriddens_full=prev_overriddens_full
-    if prev_mod_files: 
-        [prev_mod_files.pop(k, None) for k in loadorder]
-        prev_mod_files.update(mod_files) 
-        mod_files=prev_mod_files
-          
-    return overriders, overriddens, overriddens_full, mod_files
+def hash_file(path, chunk_size=1<<20):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''): h.update(chunk)
+    return h.hexdigest()
+
+def hash_archive(path):
+    # fingerprint of an incoming mod, a single sequential read for archives,
+    # relative paths plus contents for directory installs
+    if not os.path.isdir(path): return hash_file(path)
+    h = hashlib.blake2b(digest_size=20)
+    for root, dirs, fs in os.walk(path):
+        dirs.sort()
+        for f in sorted(fs):
+            full = os.path.join(root, f)
+            h.update(os.path.relpath(full, path).replace(os.sep, '/').encode("utf-8"))
+            h.update(bytes.fromhex(hash_file(full)))
+    return h.hexdigest()
+
+def store_file(path, store_dir):
+    # replace a staged file with a hardlink to its blob in the content store,
+    # returns the bytes freed, a copy with more hardlinks is freed along with its last one.
+    # the blob and its staged copies share one inode, mode bits and in place writes show up
+    # in every mod using that content, so staged files are replaced (see copy_file_full_perms)
+    st = os.lstat(path)
+    if not stat.S_ISREG(st.st_mode) or st.st_size==0: return 0
+    digest = hash_file(path)
+    blob = os.path.join(store_dir, digest[:2], digest)
+    if not os.path.exists(blob):
+        ensure_dir(os.path.dirname(blob))
+        os.link(path, blob) # first copy of this content becomes the blob
+        return 0
+    if os.path.samefile(blob, path): return 0 # already deduplicated
+    tmp = path+".bdsm_link"
+    os.link(blob, tmp)
+    last = os.lstat(path).st_nlink==1 # other links keep the old copy's bytes
+    os.replace(tmp, path)
+    return st.st_size if last else 0
+
+def dedupe_dir(src_dir, store_dir):
+    # convert a staging directory (or a single mod) to hardlinks into the store
+    files=0
+    reclaimed=0
+    ensure_dir(store_dir)
+    for root, _, fs in os.walk(src_dir):
+        for f in fs:
+            path = os.path.join(root, f)
+            try: reclaimed += store_file(path, store_dir); files += 1
+            except OSError as e: print(f"warning: could not dedupe {path} ({e})")
+    return files, reclaimed
+
+def prune_store(store_dir):
+    # drop blobs no staged file links to anymore
+    freed=0
+    if not os.path.isdir(store_dir): return freed
+    for root, _, fs in os.walk(store_dir):
+        for f in fs:
+            path = os.path.join(root, f)
+            try:
+                st = os.lstat(path)
+                if st.st_nlink>1: continue
+                os.unlink(path)
+                freed += st.st_size
+            except OSError as e: print(f"warning: could not prune {path} ({e})")
+    remove_empty_dirs_rec(str(store_dir))
+    return freed
+
+FICLONE = 0x40049409 # linux ioctl for copy-on-write file clones (btrfs, xfs, bcachefs...)
+
+def reflink_file(src, dst):
+    if not sys.platform.startswith("linux"): return False
+    import fcntl
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d: fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        try: os.unlink(dst)
+        except OSError: pass
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+def clone_tree(src, dst, link_dirs=(), progress=None):
+    # clone an instance dir, reflinking where the filesystem allows it,
+    # hardlinking immutable staged files (link_dirs, relative to src) otherwise
+    # and only really copying mutable state (configs, load orders, manifests)
+    stats = {"files":0, "bytes":0, "reflinked":0, "linked":0, "copied":0, "copied_bytes":0}
+    todo = []
+    for root, dirs, fs in os.walk(src):
+        for d in dirs: ensure_dir(os.path.join(dst, os.path.relpath(os.path.join(root, d), src)))
+        for f in fs:
+            path = os.path.join(root, f)
+            try: todo.append((path, os.stat(path).st_size))
+            except OSError as e: print(f"warning: skipping {path} ({e})")
+    total_bytes = sum(size for _, size in todo)
+    link_dirs = {os.path.normpath(d) for d in link_dirs}
+    can_reflink = True
+    can_link = True
+    for path, size in todo:
+        rel = os.path.relpath(path, src)
+        out = os.path.join(dst, rel)
+        if can_reflink and reflink_file(path, out): stats["reflinked"]+=1
+        else:
+            can_reflink = can_reflink and stats["reflinked"]>0 # unsupported, stop trying
+            immutable = any(rel==d or rel.startswith(d+os.sep) for d in link_dirs)
+            linked = False
+            if immutable and can_link:
+                try: os.link(path, out); linked = True; stats["linked"]+=1
+                except OSError: can_link = False # most likely a different drive
+            if not linked:
+                shutil.copy2(path, out)
+                stats["copied"]+=1
+                stats["copied_bytes"]+=size
+        stats["files"]+=1
+        stats["bytes"]+=size
+        if progress: progress(stats["files"], len(todo), stats["bytes"], total_bytes)
+    return stats
+
+def get_exe_version(exe_path):
+    # file version from the VS_FIXEDFILEINFO block of a windows executable, None if unknown
+    import mmap, struct
+    try:
+        with open(exe_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            i = m.rfind(b"\xbd\x04\xef\xfe") # resources live at the end of the file
+            if i==-1: return None
+            ms, ls = struct.unpack_from("<II", m, i+8)
+    except (OSError, ValueError, struct.error): return None
+    return (ms>>16, ms&0xffff, ls>>16, ls&0xffff)
+
+def format_size(num):
+    for unit in ["B","KB","MB","GB"]:
+        if abs(num)<1024: return f"{num:.1f} {unit}" if unit!="B" else f"{num} {unit}"
+        num/=1024
+    return f"{num:.1f} TB"
+
+CONFLICT_IGNORE_FILES={"meta.ini", "readme.txt"}
+CONFLICT_SCAN_WORKERS=min(4, os.cpu_count() or 1)
+CONFLICT_POOL_MIN=64 # fewer uncached mods than this are scanned in process
+CONFLICT_CACHE_VERSION=1
+CONFLICT_HASH_BATCH=256
+CONFLICT_POLL_MS=50 # how often the GUI side checks for finished content comparisons
+SEARCH_MIN_CHARS=3 # shorter queries only match mod names
+SEARCH_NAME_START=4 # file name starts kept up to this length, a query whose part after the last "/" starts no name skips that scan
+SEARCH_DIR_ROWS=10000 # rows under matching dirs checked one by one, above this the names or each mod's dirs are scanned
+
+def scan_mod_files(path, dirs=None):
+    # relative paths of every file under a mod dir, os.walk semantics
+    # dirs collects (relative dir, mtime before listing) for cache validation
+    mod_files=set()
+    stack=[(path, "")]
+    while stack:
+        root, rel=stack.pop()
+        try:
+            if dirs is not None: dirs.append((rel, os.stat(root).st_mtime_ns))
+            entries=os.scandir(root)
+        except OSError: continue
+        with entries:
+            for entry in entries:
+                name=rel+os.sep+entry.name if rel else entry.name
+                try: is_dir=entry.is_dir()
+                except OSError: is_dir=False
+                if is_dir:
+                    if not entry.is_symlink(): stack.append((entry.path, name))
+                elif entry.name.lower() not in CONFLICT_IGNORE_FILES: mod_files.add(name)
+    return mod_files
+
+def dir_signature(path, dirs):
+    # newest mtime of a mod's dirs, adding, removing or renaming a file touches its dir
+    try: return max(os.stat(path+os.sep+d if d else path).st_mtime_ns for d in dirs)
+    except (OSError, ValueError): return None
+
+def scan_mods_batch(src_dir, mods):
+    # pool worker, each path is sent back once per batch and mods as arrays of path ids
+    paths=[]
+    path_ids=dict()
+    mod_ids=[]
+    mod_dirs=[]
+    for mod in mods:
+        ids=array('I')
+        dirs=[]
+        for path in scan_mod_files(src_dir+os.sep+mod, dirs):
+            i=path_ids.get(path)
+            if i is None: i=path_ids[path]=len(paths); paths.append(path)
+            ids.append(i)
+        mod_ids.append(ids)
+        mod_dirs.append((tuple(d for d,_ in dirs), max((m for _,m in dirs), default=None)))
+    return mods, paths, mod_ids, mod_dirs
+
+def hash_file_fast(path, chunk_size=1<<20):
+    # crc32 only tells overlapping copies apart, see hash_file for content addressing
+    crc=0
+    with open(path, 'rb') as f:
+        while chunk:=f.read(chunk_size): crc=zlib.crc32(chunk, crc)
+    return crc
+
+def hash_files_batch(jobs):
+    # pool worker, jobs are (path, size, mtime_ns)
+    hashed=[]
+    for path, size, mtime in jobs:
+        try: hashed.append((path, size, mtime, hash_file_fast(path)))
+        except OSError: pass
+    return hashed
+
+def build_file_index(mod_files):
+    # file -> providing mods, highest priority first
+    file_index=dict()
+    for mod,files in mod_files.items():
+        for file in files:
+            providers=file_index.get(file)
+            if providers is None: file_index[file]=[mod]
+            else: providers.append(mod)
+    return file_index
+
+class PathSearch:
+    # substring index over the staged paths of a set of mods. every path is split into
+    # its dir and file name. the names are joined into one blob, with a row per file
+    # grouped by mod, so a query is a few finds that skip to the next mod on a hit.
+    # dirs are shared by many files and mods, they are kept once and looked up
+    # through the folder names in them
+    def __init__(self, mod_files, paths):
+        self.mod_files=mod_files
+        self.mods=sorted(mod_files)
+        self.paths=paths
+        self.rows=array('i')          # row -> path id, grouped by mod
+        self.row_mods=array('i')      # row -> mod position
+        self.row_dirs=array('i')      # row -> dir id
+        self.mod_rows=array('i', [0]) # mod position -> its first row
+        self.mod_dirs=[]              # mod position -> dir ids it uses
+        self.name_offsets=array('q')  # row -> the newline before its name
+        self.name_starts=set()        # name starts up to SEARCH_NAME_START chars
+        self.dirs=[]                  # dir id -> lowercase dir with a trailing "/", "" for the root
+        self.dir_rows=[]              # dir id -> rows under it
+        self.dir_first=[]             # dir id -> {mod position: first row under it}
+        dir_ids=dict()
+        names=[]
+        offset=0
+        for k, mod in enumerate(self.mods):
+            mod_dirs=[]
+            for i in sorted(mod_files[mod], key=paths.__getitem__):
+                d, _, name=paths[i].lower().replace(os.sep, "/").rpartition("/")
+                d=d+"/" if d else ""
+                if d not in dir_ids:
+                    dir_ids[d]=len(self.dirs)
+                    self.dirs.append(d)
+                    self.dir_rows.append(array('i'))
+                    self.dir_first.append(dict())
+                d=dir_ids[d]
+                row=len(self.rows)
+                self.rows.append(i)
+                self.row_mods.append(k)
+                self.row_dirs.append(d)
+                self.dir_rows[d].append(row)
+                if k not in self.dir_first[d]:
+                    self.dir_first[d][k]=row
+                    mod_dirs.append(d)
+                self.name_offsets.append(offset)
+                offset+=len(name)+1
+                names.append(name)
+                self.name_starts.add(name[:SEARCH_NAME_START])
+            self.mod_rows.append(len(self.rows))
+            self.mod_dirs.append(mod_dirs)
+        self.name_offsets.append(offset)
+        self.names="\n"+"\n".join(names)
+        for start in list(self.name_starts):
+            for i in range(1, len(start)): self.name_starts.add(start[:i])
+        self.dir_bits=[]              # dir id -> bitset of the mod positions using it
+        self.folder_ids=dict()        # folder name -> folder id
+        self.folder_dirs=[]           # folder id -> dirs containing it
+        self.folder_last=[]           # folder id -> dirs ending in it
+        self.folder_first=[]          # folder id -> {mod position: a row under it}
+        for d, path in enumerate(self.dirs):
+            bits=0
+            for k in self.dir_first[d]: bits|=1<<k
+            self.dir_bits.append(bits)
+            if not path: continue
+            for folder in path[:-1].split("/"):
+                f=self.folder_ids.get(folder)
+                if f is None:
+                    f=self.folder_ids[folder]=len(self.folder_dirs)
+                    self.folder_dirs.append([])
+                    self.folder_last.append([])
+                    self.folder_first.append(dict())
+                self.folder_dirs[f].append(d)
+                self.folder_first[f].update(self.dir_first[d])
+            self.folder_last[f].append(d)
+        self.folders="\n"+"\n".join(self.folder_ids)+"\n"
+        self.folder_offsets=array('q')  # folder id -> the newline before its name
+        offset=0
+        for folder in self.folder_ids:
+            self.folder_offsets.append(offset)
+            offset+=len(folder)+1
+        self.folder_offsets.append(offset) # the closing newline
+
+    def find_folders(self, text):
+        # ids of the folder names containing text, a leading or trailing newline anchors it
+        found=[]
+        pos=self.folders.find(text)
+        while pos>=0:
+            f=bisect.bisect_right(self.folder_offsets, pos)-1
+            if f>=len(self.folder_dirs): break # the closing newline
+            found.append(f)
+            pos=self.folders.find(text, self.folder_offsets[f+1])
+        return found
+
+    def dirs_of(self, lists, folders):
+        dirs=set()
+        for f in folders: dirs.update(lists[f])
+        return dirs
+
+    def find_names(self, text, hits, dirs=None):
+        # first row per mod with text in its file name, only under dirs if given
+        pos=0
+        while (i:=self.names.find(text, pos))>=0:
+            row=bisect.bisect_right(self.name_offsets, i)-1
+            k=self.row_mods[row]
+            if dirs is None or self.row_dirs[row] in dirs:
+                hits.setdefault(k, row)
+                pos=self.name_offsets[self.mod_rows[k+1]]
+            else: pos=i+1
+
+    def find_across(self, query, pieces, hits):
+        # a dir ending in everything before the last "/" and a file name starting with the rest
+        head, start=query[:query.rfind("/")+1], "\n"+pieces[-1]
+        if len(pieces)>2:
+            last=self.folder_ids.get(pieces[-2])
+            ends=[d for d in self.folder_last[last] if self.dirs[d].endswith(head)] if last is not None else []
+        else: ends=self.dirs_of(self.folder_last, self.find_folders(pieces[0]+"\n"))
+        if sum(len(self.dir_rows[d]) for d in ends)>SEARCH_DIR_ROWS: # common dirs, look for the file name first
+            self.find_names(start, hits, set(ends))
+            return
+        for d in ends:
+            for row in self.dir_rows[d]:
+                if self.names.startswith(start, self.name_offsets[row]): hits.setdefault(self.row_mods[row], row)
+
+    def dirs_containing(self, query, pieces):
+        # dirs with a folder ending in the first piece, one starting with the last
+        # and the ones in between, checked against the whole query at the end
+        candidates=[]
+        for p in pieces[1:-1]:
+            if p: candidates.append(set(self.folder_dirs[self.folder_ids[p]]) if p in self.folder_ids else set())
+        if pieces[0]: candidates.append(self.dirs_of(self.folder_dirs, self.find_folders(pieces[0]+"\n")))
+        if pieces[-1]: candidates.append(self.dirs_of(self.folder_dirs, self.find_folders("\n"+pieces[-1])))
+        if not candidates: return []
+        return [d for d in set.intersection(*candidates) if query in self.dirs[d]]
+
+    def add_dir_hits(self, dirs, hits):
+        # a row per mod using one of dirs, every file under them matches
+        if sum(len(self.dir_first[d]) for d in dirs)<=SEARCH_DIR_ROWS:
+            for d in dirs: hits.update(self.dir_first[d])
+            return
+        # dirs shared by many mods, look up each mod not hit yet once
+        bits=0
+        for d in dirs: bits|=self.dir_bits[d]
+        dirs=set(dirs)
+        for k in range(len(self.mods)):
+            if k in hits or not bits>>k&1: continue
+            for d in self.mod_dirs[k]:
+                if d in dirs:
+                    hits[k]=self.dir_first[d][k]
+                    break
+
+    def search(self, query):
+        # mod -> a staged path containing query
+        hits=dict() # mod position -> row
+        if "/" not in query:
+            self.find_names(query, hits)
+            for f in self.find_folders(query): hits.update(self.folder_first[f])
+        elif query.count("/")==1 and query.endswith("/"): # the end of a folder name
+            for f in self.find_folders(query[:-1]+"\n"): hits.update(self.folder_first[f])
+        else:
+            pieces=query.split("/")
+            if pieces[-1][:SEARCH_NAME_START] in self.name_starts: self.find_across(query, pieces, hits)
+            self.add_dir_hits(self.dirs_containing(query, pieces), hits)
+        return {self.mods[k]: self.paths[self.rows[row]].replace(os.sep, "/") for k, row in hits.items()}
+
+
+class ConflictIndex:
+    # conflict state kept in memory and patched as the load order changes
+    def __init__(self, src_dir):
+        self.src_dir=src_dir
+        self.mod_files=OrderedDict() # enabled mods, highest priority first
+        self.file_cache=dict()       # mod -> frozenset of path ids, kept while disabled
+        self.paths=[]                # path id -> relative path
+        self.path_ids=dict()         # relative path -> path id
+        self.pool=None               # optional ProcessPoolExecutor for scanning
+        self.signatures=dict()       # mod -> (scanned dirs, newest dir mtime)
+        self.cache_changed=False
+        self.content=False           # overlaps with identical bytes count as benign
+        self.hashes=dict()           # abs path -> (size, mtime_ns, crc32)
+        self.hashes_changed=False
+        self.differ=dict()           # mod -> mods sharing a file with different bytes, symmetric
+        self.pending=set()           # overlapping path ids not compared yet
+        self.unsettled=set()         # providers of pending files, plain conflicts until settled
+        self.file_index=dict()       # file -> providers, highest priority first, winner at [0]
+        self.rank=dict()
+        self.beats=dict()
+        self.beaten_by=dict()
+        self.won=dict()              # files the mod actually deploys
+        self.loose=dict()            # of those, files no other mod provides
+        self.stale=set()
+        self.overriders=dict()
+        self.overriddens=dict()
+        self.overriddens_full=dict()
+        self.path_search=None        # PathSearch over the mods of the last search
+
+    def invalidate(self, mod):
+        # mod contents changed on disk, rescan on next update
+        self.stale.add(mod)
+
+    def files(self, mod):
+        if mod not in self.file_cache: self.load_files([mod])
+        return self.file_cache[mod]
+
+    def load_files(self, mods):
+        # scan uncached mods, split across the pool by mod when there are enough of them
+        mods=[m for m in mods if m not in self.file_cache]
+        if not mods: return
+        if self.pool is None or len(mods)<CONFLICT_POOL_MIN: batches=[scan_mods_batch(self.src_dir, mods)]
+        else:
+            chunks=[mods[k::CONFLICT_SCAN_WORKERS] for k in range(CONFLICT_SCAN_WORKERS)]
+            batches=self.pool.map(scan_mods_batch, [self.src_dir]*len(chunks), chunks)
+        for names, paths, mod_ids, mod_dirs in batches:
+            remap=self._intern(paths)
+            for mod, ids, dirs in zip(names, mod_ids, mod_dirs):
+                self.file_cache[mod]=frozenset(map(remap.__getitem__, ids))
+                self.signatures[mod]=dirs
+        self.cache_changed=True
+
+    def _intern(self, paths):
+        remap=array('I')
+        for path in paths:
+            i=self.path_ids.get(path)
+            if i is None: i=self.path_ids[path]=len(self.paths); self.paths.append(path)
+            remap.append(i)
+        return remap
+
+    def load_cache(self, cache_file):
+        # reuse file sets of mods whose dirs are untouched since they were scanned
+        try:
+            with open(cache_file, 'rb') as f: cache=pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError): return
+        if cache.get("version")!=CONFLICT_CACHE_VERSION or cache.get("src_dir")!=self.src_dir: return
+        remap=self._intern(cache["paths"])
+        for mod,(ids,dirs,mtime) in cache["mods"].items():
+            if mtime is None or dir_signature(self.src_dir+os.sep+mod, dirs)!=mtime: continue
+            self.file_cache[mod]=frozenset(map(remap.__getitem__, ids))
+            self.signatures[mod]=(dirs, mtime)
+
+    def save_cache(self, cache_file):
+        # only paths still referenced, renumbered
+        paths=[]
+        path_ids=dict()
+        mods=dict()
+        for mod,files in self.file_cache.items():
+            ids=array('I')
+            for i in files:
+                j=path_ids.get(i)
+                if j is None: j=path_ids[i]=len(paths); paths.append(self.paths[i])
+                ids.append(j)
+            mods[mod]=(ids,)+tuple(self.signatures.get(mod, ((), None)))
+        ensure_dir(Path(cache_file).parent)
+        tmp_file=str(cache_file)+".tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({"version":CONFLICT_CACHE_VERSION, "src_dir":self.src_dir, "paths":paths, "mods":mods}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+        self.cache_changed=False
+
+    def pack(self, loadorder, dirty):
+        # dirty entries as load order positions in flat arrays, see ConflictThread.unpack
+        pos={m.removeprefix("~"):k for k,m in enumerate(loadorder)}
+        ids=array('i')
+        overriders=[]
+        overriddens=[]
+        identical=[]
+        full=bytearray()
+        counts=array('i')
+        for mod in dirty:
+            if mod not in pos: continue
+            ids.append(pos[mod])
+            overriders.append(array('i', [pos[m] for m in self.overriders.get(mod, ())]))
+            overriddens.append(array('i', [pos[m] for m in self.overriddens.get(mod, ())]))
+            identical.append(array('i', [pos[m] for m in self.identical(mod)]))
+            full.append(mod in self.overriddens_full)
+            counts.extend(self.effective_files(mod) or (-1, -1, -1))
+        return ids, overriders, overriddens, identical, bytes(full), counts
+
+    def identical(self, mod):
+        # overlapping mods whose shared files are all byte identical
+        if not self.content or mod not in self.mod_files or mod in self.unsettled: return []
+        return [m for m in self.overriddens.get(mod, [])+self.overriders.get(mod, []) if m not in self.differ[mod] and m not in self.unsettled]
+
+    def set_content(self, content):
+        # returns the mods whose classification flips
+        if content==self.content: return set()
+        self.content=content
+        for mod in self.differ: self.differ[mod]=set()
+        self.pending=set()
+        if content: self.pending={f for f,providers in self.file_index.items() if len(providers)>1}
+        self._unsettle()
+        return set(self.mod_files)
+
+    def _unsettle(self):
+        dirty=set()
+        self.unsettled=set()
+        for file in self.pending: self.unsettled.update(self.file_index.get(file, ()))
+        for mod in self.unsettled: dirty|={mod}|self.beats[mod]|self.beaten_by[mod]
+        return dirty
+
+    def content_jobs(self):
+        # pending overlapping copies without a cached hash for their current size and mtime
+        jobs=[]
+        for file in self.pending:
+            for mod in self.file_index.get(file, ()):
+                path=self.src_dir+os.sep+mod+os.sep+self.paths[file]
+                try: st=os.stat(path)
+                except OSError: continue
+                cached=self.hashes.get(path)
+                if cached is None or cached[:2]!=(st.st_size, st.st_mtime_ns): jobs.append((path, st.st_size, st.st_mtime_ns))
+        return jobs
+
+    def apply_hashes(self, hashed):
+        for path, size, mtime, crc in hashed: self.hashes[path]=(size, mtime, crc)
+        if hashed: self.hashes_changed=True
+
+    def settle(self):
+        # compare pending files once every copy is hashed, returns the mods whose entries changed
+        for file in self.pending:
+            providers=self.file_index.get(file)
+            if not providers or len(providers)<2: continue
+            keys=[]
+            for mod in providers:
+                cached=self.hashes.get(self.src_dir+os.sep+mod+os.sep+self.paths[file])
+                keys.append((cached[0], cached[2]) if cached else object()) # unreadable copies never match
+            for i in range(len(providers)):
+                for j in range(i+1, len(providers)):
+                    if keys[i]!=keys[j]:
+                        self.differ[providers[i]].add(providers[j])
+                        self.differ[providers[j]].add(providers[i])
+        dirty=set()
+        for mod in self.unsettled: dirty|={mod}|self.beats[mod]|self.beaten_by[mod]
+        self.pending=set()
+        self.unsettled=set()
+        return dirty
+
+    def load_hashes(self, hash_file):
+        try:
+            with open(hash_file, 'rb') as f: cache=pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError): return
+        if cache.get("version")==CONFLICT_CACHE_VERSION: self.hashes.update(cache["hashes"])
+
+    def prune_hashes(self):
+        # drop hashes of files no longer staged, uninstalled and renamed mods leave theirs behind
+        prefix=self.src_dir+os.sep
+        installed=dict() # mod not scanned -> its dir still exists
+        kept=dict()
+        for path, entry in self.hashes.items():
+            if not path.startswith(prefix): continue
+            mod, _, rel=path[len(prefix):].partition(os.sep)
+            if mod in self.file_cache: keep=self.path_ids.get(rel) in self.file_cache[mod]
+            else:
+                if mod not in installed: installed[mod]=os.path.isdir(prefix+mod)
+                keep=installed[mod]
+            if keep: kept[path]=entry
+        self.hashes=kept
+
+    def save_hashes(self, hash_file):
+        self.prune_hashes()
+        ensure_dir(Path(hash_file).parent)
+        with open(str(hash_file)+".tmp", 'wb') as f:
+            pickle.dump({"version":CONFLICT_CACHE_VERSION, "hashes":self.hashes}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(hash_file)+".tmp", hash_file)
+        self.hashes_changed=False
+
+    def search(self, query, loadorder):
+        # mod -> a staged path containing query, disabled mods are scanned on their first search
+        query=query.lower().replace("\\", "/").replace("\n", "")
+        if len(query)<SEARCH_MIN_CHARS: return dict()
+        mods=[m.removeprefix("~") for m in loadorder if not m.startswith(("v#", ">#", "#"))]
+        self.load_files([m for m in mods if m not in self.file_cache and os.path.isdir(self.src_dir+os.sep+m)])
+        mod_files={m: self.file_cache[m] for m in mods if m in self.file_cache}
+        index=self.path_search
+        if index is None or index.mod_files.keys()!=mod_files.keys() \
+        or any(index.mod_files[m] is not files for m, files in mod_files.items()):
+            index=self.path_search=PathSearch(mod_files, self.paths) # rebuilt when mods are added or rescanned
+        hits=index.search(query)
+        return {m: hits[m] for m in mod_files if m in hits}
+
+    def effective_files(self, mod):
+        # (winning, loose, shadowed) file counts, None for disabled mods
+        if mod not in self.mod_files: return None
+        return self.won[mod], self.loose[mod], len(self.mod_files[mod])-self.won[mod]
+
+    def update(self, loadorder):
+        # returns the mods whose conflict entries changed
+        stale, self.stale=self.stale, set()
+        names=set(loadorder)
+        for mod in [m for m in self.file_cache if m in stale or (m not in names and "~"+m not in names)]:
+            del self.file_cache[mod]
+            self.signatures.pop(mod, None)
+            self.cache_changed=True
+            if self.hashes: self.hashes_changed=True # pruned on the next save
+
+        new=[m for m in loadorder[::-1] if m in self.file_cache or os.path.isdir(self.src_dir+os.sep+m)]
+        self.load_files(new)
+        if not self.mod_files: return self._rebuild(new)
+        old=list(self.mod_files)
+        old_set, new_set=set(old)-stale, set(new)
+        dirty=set()
+        for mod in old:
+            if mod not in new_set or mod in stale: dirty|=self._remove(mod)
+
+        # common mods that changed relative order lie between the first and last mismatch
+        a=[m for m in old if m in new_set and m in old_set]
+        b=[m for m in new if m in old_set]
+        i=0
+        while i<len(a) and a[i]==b[i]: i+=1
+        j=len(a)-1
+        while j>=i and a[j]==b[j]: j-=1
+
+        self.rank={m:k for k,m in enumerate(new)}
+        self.mod_files=OrderedDict((m, self.files(m)) for m in new)
+        if i<=j: dirty|=self._reorder(set(b[i:j+1]))
+        for mod in new:
+            if mod not in old_set: dirty|=self._add(mod)
+        if self.content: dirty|=self._unsettle()
+        self._publish(dirty)
+        return dirty
+
+    def _rebuild(self, new):
+        self.rank={m:k for k,m in enumerate(new)}
+        self.mod_files=OrderedDict((m, self.files(m)) for m in new)
+        self.file_index=build_file_index(self.mod_files)
+        self.beats={m:set() for m in new}
+        self.beaten_by={m:set() for m in new}
+        self.won=dict.fromkeys(new, 0)
+        self.loose=dict.fromkeys(new, 0)
+        self.differ={m:set() for m in new}
+        # collapse files sharing the same providers, usually orders of magnitude fewer
+        groups=defaultdict(int)
+        for providers in self.file_index.values():
+            if len(providers)>1: groups[tuple(providers)]+=1
+            else: self.loose[providers[0]]+=1
+        if self.content: self.pending={f for f,providers in self.file_index.items() if len(providers)>1}
+        for mod in new: self.won[mod]=self.loose[mod]
+        for providers,count in groups.items():
+            self.won[providers[0]]+=count
+            for k in range(len(providers)-1):
+                self.beats[providers[k]].update(providers[k+1:])
+                for mod in providers[k+1:]: self.beaten_by[mod].add(providers[k])
+        self.overriders.clear(); self.overriddens.clear(); self.overriddens_full.clear()
+        if self.content: self._unsettle()
+        self._publish(set(new))
+        return set(new)
+
+    def _remove(self, mod):
+        dirty={mod}
+        for file in self.mod_files.pop(mod):
+            providers=self.file_index[file]
+            if providers[0]==mod and len(providers)>1:
+                # next in line takes over the file
+                self.won[providers[1]]+=1
+                if len(providers)==2: self.loose[providers[1]]+=1
+                dirty.add(providers[1])
+            elif len(providers)==2:
+                self.loose[providers[0]]+=1
+                dirty.add(providers[0])
+            providers.remove(mod)
+            if not providers: del self.file_index[file]
+        dirty|=self.beats[mod]|self.beaten_by[mod]
+        for other in self.beats.pop(mod): self.beaten_by[other].discard(mod)
+        for other in self.beaten_by.pop(mod): self.beats[other].discard(mod)
+        for other in self.differ.pop(mod): self.differ[other].discard(mod)
+        del self.won[mod], self.loose[mod]
+        for table in (self.overriders, self.overriddens, self.overriddens_full): table.pop(mod, None)
+        return dirty
+
+    def _add(self, mod):
+        rank=self.rank[mod]
+        beats=self.beats[mod]=set()
+        beaten_by=self.beaten_by[mod]=set()
+        self.won[mod]=self.loose[mod]=0
+        self.differ[mod]=set()
+        dirty={mod}
+        for file in self.mod_files[mod]:
+            providers=self.file_index.get(file)
+            if providers is None:
+                self.file_index[file]=[mod]
+                self.won[mod]+=1; self.loose[mod]+=1
+                continue
+            head=providers[0]
+            if len(providers)==1: self.loose[head]-=1; dirty.add(head)
+            bisect.insort(providers, mod, key=self.rank.__getitem__)
+            if providers[0]==mod: self.won[mod]+=1; self.won[head]-=1; dirty.add(head)
+            if self.content: self.pending.add(file)
+            for other in providers:
+                if other==mod: continue
+                if self.rank[other]<rank: beaten_by.add(other); self.beats[other].add(mod)
+                else: beats.add(other); self.beaten_by[other].add(mod)
+        return dirty|beats|beaten_by
+
+    def _reorder(self, moved):
+        # only pairs inside the moved range can swap sides
+        files=set()
+        for mod in moved: files|=self.mod_files[mod]
+        dirty=set(moved)
+        for file in files:
+            providers=self.file_index[file]
+            head=providers[0]
+            providers.sort(key=self.rank.__getitem__)
+            if providers[0]!=head:
+                self.won[head]-=1; self.won[providers[0]]+=1
+                dirty.add(head); dirty.add(providers[0])
+        for mod in moved:
+            self.beats[mod]-=moved
+            self.beaten_by[mod]-=moved
+        for mod in moved:
+            rank=self.rank[mod]
+            for file in self.mod_files[mod]:
+                for other in self.file_index[file]:
+                    if other in moved and self.rank[other]>rank:
+                        self.beats[mod].add(other); self.beaten_by[other].add(mod)
+        for mod in moved: dirty|=self.beats[mod]|self.beaten_by[mod]
+        return dirty
+
+    def _publish(self, dirty):
+        rank=self.rank.__getitem__
+        for mod in dirty:
+            if mod not in self.mod_files: continue
+            for table,mods in ((self.overriders, self.beats[mod]), (self.overriddens, self.beaten_by[mod])):
+                if mods: table[mod]=sorted(mods, key=rank)
+                else: table.pop(mod, None)
+            # every file shadowed by some higher priority mod
+            if self.mod_files[mod] and not self.won[mod]: self.overriddens_full[mod]=self.overriddens[mod]
+            else: self.overriddens_full.pop(mod, None)
+
+def scan_mod_overrides(src_dir, loadorder):
+    index=ConflictIndex(src_dir)
+    index.update(loadorder)
+    mod_files=OrderedDict((mod, {index.paths[i] for i in files}) for mod,files in index.mod_files.items())
+    return index.overriders, index.overriddens, index.overriddens_full, mod_files
+
+def conflict_worker(conn):
+    # separate process owning the conflict index so scans never hold the GUI's GIL
+    index=None
+    loadorder=[]
+    msg=None
+    def search(seq, query):
+        # answered between updates and while hashing, a search never cancels content comparison
+        try: hits=index.search(query, loadorder) if index is not None else dict()
+        except Exception as e:
+            hits=dict()
+            print(f"warning: search failed: {e}")
+        conn.send(("search", seq, hits))
+    with ProcessPoolExecutor(max_workers=CONFLICT_SCAN_WORKERS) as pool:
+        while True:
+            if msg is None:
+                try: msg=conn.recv()
+                except (EOFError, OSError): return
+            if msg[0]=="stop": return
+            if msg[0]=="search":
+                search(*msg[1:])
+                msg=None
+                continue
+            _, seq, src_dir, loadorder, stale, cache_dir, content=msg
+            msg=None
+            try:
+                if index is None or index.src_dir!=src_dir:
+                    index=ConflictIndex(src_dir)
+                    index.pool=pool
+                    if cache_dir: index.load_cache(Path(cache_dir)/"files.pkl")
+                if content and cache_dir and not index.hashes: index.load_hashes(Path(cache_dir)/"hashes.pkl")
+                for mod in stale: index.invalidate(mod)
+                flipped=index.set_content(content)
+                dirty=index.update(loadorder)|flipped
+                conn.send(("result", seq, (index.pack(loadorder, dirty), bool(index.pending))))
+            except Exception as e:
+                index=None
+                conn.send(("error", seq, str(e)))
+                continue
+            # after replying, the GUI already has its markers
+            if cache_dir and index.cache_changed:
+                try: index.save_cache(Path(cache_dir)/"files.pkl")
+                except OSError as e: print(f"warning: could not write conflict cache: {e}")
+            if not index.pending: continue
+
+            # hash overlapping copies in the pool, a new request cancels whatever has not started
+            jobs=index.content_jobs()
+            remaining={pool.submit(hash_files_batch, jobs[k:k+CONFLICT_HASH_BATCH]) for k in range(0, len(jobs), CONFLICT_HASH_BATCH)}
+            while remaining:
+                if conn.poll():
+                    try: msg=conn.recv()
+                    except (EOFError, OSError): return
+                    if msg[0]!="search": break # handled at the top of the loop
+                    search(*msg[1:])
+                    msg=None
+                done, remaining=wait(remaining, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done: index.apply_hashes(future.result())
+            for future in remaining: future.cancel()
+            if not remaining:
+                conn.send(("content", seq, index.pack(loadorder, index.settle())))
+            if cache_dir and index.hashes_changed:
+                try: index.save_hashes(Path(cache_dir)/"hashes.pkl")
+                except OSError as e: print(f"warning: could not write conflict cache: {e}")
 
 def count_files(directory):
     count = 0